@@ -1,14 +1,22 @@
 import streamlit as st
-import openai
 import os
+import sys
 import time
 from dotenv import load_dotenv
 
+from contract_generator import (
+    GENERATION_MODES, example_prompts, parse_structured_response,
+    get_generation_cache, get_cached_generation, store_generation
+)
+# Shared helpers (instrumentation, static checks) live next to the explainer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Security Insights on SmartContracts"))
+from instrumentation import span, trace
+from contract_facts import extract_facts, format_fact_sheet, RISKY_PATTERNS
+
 
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
-openai.api_key = api_key
 
 
 # page configuration
@@ -19,81 +27,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Helper function for OpenAI API 
-def generate_contract_with_openai(prompt, api_key):
-    try:
-        code_prompt = f"""You are an expert Solidity developer tasked with creating secure, minimal smart contracts.
-        
-Generate Solidity code based on this requirement: "{prompt}"
-
-Follow these guidelines:
-1. Use Solidity ^0.8.0 or higher and prioritize gas efficiency  
-2. Avoid unsafe patterns like `tx.origin`, `call.value`, `delegatecall`, and `selfdestruct`  
-3. Leverage OpenZeppelin contracts (e.g., Ownable, ReentrancyGuard, ERC20) where applicable  
-4. Implement strong access control and input validation  
-5. Emit events for key state changes and guard against reentrancy in Ether transfers  
-6. Return only the complete, minimal, well-commented contract — no extra text or markdown
-
-
-Return ONLY the complete Solidity code without explanations.
-"""
-
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": (
-                        "You are an expert Solidity developer. You write secure, gas-efficient, and production-ready smart contracts "
-                        "that follow best practices, including input validation, access control, events for key state changes, and "
-                        "clear, maintainable structure. Your code adheres to the latest Solidity version, uses OpenZeppelin contracts where appropriate, "
-                        "and includes inline comments for clarity."
-                        "You only write safe, production-ready contracts and avoid any insecure or deprecated practices."
-                        
-                        )},
-                {"role": "user", "content": code_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=2000
-        )
-        
-        solidity_code = response.choices[0].message.content.strip()
-        
-        # Then, generate security considerations
-        security_prompt = f"""You are a blockchain security auditor. Examine this Solidity code and provide EXACTLY 5 key security considerations that were addressed in the implementation.
-
-{solidity_code}
-
-Format your response as a numbered list of 5 brief bullet points (1-2 sentences each), focusing ONLY on security aspects that were properly handled in the code (not suggestions for improvement).
-"""
-
-        security_response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert blockchain security auditor."},
-                {"role": "user", "content": security_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=1000
-        )
-        
-        security_considerations = security_response.choices[0].message.content.strip()
-        
-        return solidity_code, security_considerations
-        
-    except Exception as e:
-        st.error(f"Error generating code: {str(e)}")
-        return None, None
-
-# Example prompts
-example_prompts = [
-    "Create an ERC-20 token with minting restricted to addresses in an allowlist",
-    "Build a simple NFT marketplace where creators receive royalties on secondary sales",
-    "Create a multi-signature wallet that requires approval from two out of three owners",
-    "Develop a staking contract where users earn rewards based on time staked",
-    "Make a decentralized voting system where users can delegate their votes"
-]
-
 # Main application
 def main():
     st.markdown("""
@@ -149,10 +82,32 @@ def main():
         - OpenZeppelin integration
         """)
         
+        generation_mode = st.radio(
+            "Generation mode",
+            list(GENERATION_MODES),
+            help="Fast mode returns the code and security notes from one completion; "
+                 "audit mode reviews the finished code in a second call."
+        )
+        stream_output = st.checkbox("Stream output as it is generated", value=True)
+        show_timings = st.checkbox("Show timing breakdown", value=False)
+        
         st.header("Example Prompts")
         for example in example_prompts:
             if st.button(f"📝 {example}"):
                 st.session_state.user_input = example
+                # Prewarmed examples are shown straight away, without pressing Generate
+                cached = get_cached_generation(example, generation_mode)
+                if cached:
+                    show_generation(cached["code"], cached["security"], cached_generation_info(cached, 0.0))
+
+        if st.session_state.get("mode_latencies"):
+            st.header("Latency by Mode")
+            for mode, latencies in st.session_state.mode_latencies.items():
+                st.caption(f"{mode}: last {latencies[-1]:.1f}s · avg {sum(latencies) / len(latencies):.1f}s over {len(latencies)} runs")
+
+        st.header("Generation Cache")
+        stats = get_generation_cache().stats()
+        st.caption(f"{stats['entries']} cached contracts · {stats['hits']} hits · {stats['misses']} misses")
                 
         
     
@@ -195,23 +150,70 @@ def main():
             st.error("OpenAI API key is required. Please enter your API key in the field above.")
         else:
             with st.spinner("Generating secure smart contract..."):
+                generate, stream = GENERATION_MODES[generation_mode]
+                started = time.perf_counter()
+                cached = get_cached_generation(user_input, generation_mode)
                 # Call OpenAI API with the provided API key
-                solidity_code, security_considerations = generate_contract_with_openai(user_input, api_key)
+                with trace("generate") as current:
+                    try:
+                        if cached:
+                            solidity_code, security_considerations = cached["code"], cached["security"]
+                        elif stream_output:
+                            solidity_code, security_considerations = render_contract_stream(
+                                stream(user_input, api_key)
+                            )
+                        else:
+                            solidity_code, security_considerations = generate(user_input, api_key)
+                    except Exception as e:
+                        st.error(f"Error generating code: {str(e)}")
+                        solidity_code, security_considerations = None, None
+                elapsed = time.perf_counter() - started
+                st.session_state.generation_timings = current.summary()
+                
+                if solidity_code and security_considerations and not cached:
+                    store_generation(user_input, generation_mode, solidity_code, security_considerations, elapsed)
                 
                 if solidity_code and security_considerations:
-                    st.session_state.solidity_code = solidity_code
-                    st.session_state.security_considerations = security_considerations
+                    if cached:
+                        info = cached_generation_info(cached, elapsed)
+                    else:
+                        info = f"Generated in {elapsed:.1f}s ({generation_mode})"
+                        st.session_state.setdefault("mode_latencies", {}).setdefault(generation_mode, []).append(elapsed)
+                    show_generation(solidity_code, security_considerations, info)
                 else:
                     st.error("Failed to generate code. Please check your API key and try again with a different prompt.")
     
     if 'solidity_code' in st.session_state and 'security_considerations' in st.session_state:
         st.markdown('<div class="sub-header">Generated Smart Contract</div>', unsafe_allow_html=True)
+        if 'generation_info' in st.session_state:
+            st.caption(st.session_state.generation_info)
+        if show_timings and st.session_state.get("generation_timings"):
+            with st.expander("Timing breakdown"):
+                timings = st.session_state.generation_timings
+                st.table([
+                    {"stage": name, "calls": stage["count"], "total ms": stage["total_ms"]}
+                    for name, stage in timings["stages"].items()
+                ])
+                if timings["counters"]:
+                    st.caption(" · ".join(f"{name}: {value}" for name, value in sorted(timings["counters"].items())))
         
         code_tab, security_tab = st.tabs(["Solidity Code", "Security Considerations"])
         
         with code_tab:
+            facts = st.session_state.get("contract_facts")
+            if facts:
+                for risk in facts["risks"]:
+                    location = ".".join(part for part in (risk["contract"], risk["function"]) if part)
+                    st.warning(f"Static check: {risk['pattern']} in {location} (line {risk['line']})")
+                if not facts["risks"]:
+                    st.success(f"Static check: no {', '.join(RISKY_PATTERNS)}")
+            
             st.code(st.session_state.solidity_code, language="solidity")
             
+            if facts and facts["contracts"]:
+                with st.expander("Contract structure"):
+                    st.code(format_fact_sheet(facts), language="text")
+            
             st.download_button(
                 label="⬇️ Download Solidity Code",
                 data=st.session_state.solidity_code,
@@ -238,5 +240,53 @@ def main():
         4. Consider a professional **security audit** for high-value contracts
         """)
 
+def show_generation(solidity_code, security_considerations, info):
+    """Keep a finished generation in the session, with its local static check."""
+    # Check the result locally for the patterns the prompt bans
+    with span("generate.static_check"):
+        st.session_state.contract_facts = extract_facts({"": solidity_code})
+    st.session_state.solidity_code = solidity_code
+    st.session_state.security_considerations = security_considerations
+    st.session_state.generation_info = info
+
+def cached_generation_info(cached, elapsed):
+    return (
+        f"Served from cache in {elapsed * 1000:.0f} ms ({cached['mode']}; "
+        f"originally generated in {cached['elapsed_seconds']:.1f}s)"
+    )
+
+def render_contract_stream(events):
+    """Render streamed code and security fragments live; returns the final (code, considerations)."""
+    code_placeholder = st.empty()
+    security_placeholder = st.empty()
+    sections = {"code": "", "security": "", "raw": ""}
+    last_render = 0.0
+    for section, delta in events:
+        if section == "raw":
+            # Single-pass output: re-split the accumulated text on every render
+            sections["raw"] += delta
+            if time.monotonic() - last_render > 0.05:
+                code, security = parse_structured_response(sections["raw"])
+                code_placeholder.code(code or "", language="solidity")
+                security_placeholder.markdown(security or "")
+                last_render = time.monotonic()
+            continue
+        if section == "security" and not sections["security"]:
+            # Show the finished contract before the security notes start streaming
+            code_placeholder.code(sections["code"], language="solidity")
+        sections[section] += delta
+        # Throttle re-renders to keep websocket traffic reasonable
+        if time.monotonic() - last_render > 0.05:
+            if section == "code":
+                code_placeholder.code(sections["code"], language="solidity")
+            else:
+                security_placeholder.markdown(sections["security"])
+            last_render = time.monotonic()
+    code_placeholder.empty()
+    security_placeholder.empty()
+    if sections["raw"]:
+        return parse_structured_response(sections["raw"])
+    return sections["code"].strip() or None, sections["security"].strip() or None
+
 if __name__ == "__main__":
     main()
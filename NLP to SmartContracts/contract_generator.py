@@ -0,0 +1,302 @@
+"""
+Contract generation without the UI: prompts, model routing, OpenAI calls and
+the generation cache.
+
+Shared by the Streamlit app (app.py), prewarm_cache.py and the HTTP API
+(../Security Insights on SmartContracts/api_server.py). Nothing here touches
+Streamlit; failed generations raise and each caller reports them its own way.
+"""
+import os
+import re
+import sys
+import json
+import time
+
+import openai
+from dotenv import load_dotenv
+
+# Shared helpers (instrumentation, caching, routing) live next to the explainer
+SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Security Insights on SmartContracts")
+if SHARED_DIR not in sys.path:
+    sys.path.insert(0, SHARED_DIR)
+from instrumentation import span, observe, record  # noqa: E402
+from explanation_cache import get_cache, make_cache_key  # noqa: E402
+from model_router import ModelRouter, observe_route  # noqa: E402
+from rate_limiter import get_limiter, call_with_retries  # noqa: E402
+
+
+load_dotenv()
+
+CODE_SYSTEM_MESSAGE = (
+    "You are an expert Solidity developer. You write secure, gas-efficient, and production-ready smart contracts "
+    "that follow best practices, including input validation, access control, events for key state changes, and "
+    "clear, maintainable structure. Your code adheres to the latest Solidity version, uses OpenZeppelin contracts where appropriate, "
+    "and includes inline comments for clarity."
+    "You only write safe, production-ready contracts and avoid any insecure or deprecated practices."
+)
+SECURITY_SYSTEM_MESSAGE = "You are an expert blockchain security auditor."
+
+GENERATION_MODEL = "gpt-4"
+# Requests whose prompt plus answer overflow GPT-4's 8k window go to a long-context model
+# (see model_router.parse_routes); cached generations are keyed on this table
+GENERATION_MODEL_ROUTES = os.getenv("GENERATION_MODEL_ROUTES", f"{GENERATION_MODEL},gpt-4-turbo")
+generation_router = ModelRouter("generator", GENERATION_MODEL_ROUTES)
+GENERATION_TEMPERATURE = 0.2
+CODE_MAX_TOKENS = 2000
+SECURITY_MAX_TOKENS = 1000
+SINGLE_PASS_MAX_TOKENS = 3000
+# Bump when the prompts change so cached generations are not reused
+GENERATION_PROMPT_VERSION = "1"
+GENERATION_CACHE_PATH = os.getenv(
+    "GENERATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".generation_cache.sqlite3")
+)
+
+def build_code_prompt(prompt):
+    return f"""You are an expert Solidity developer tasked with creating secure, minimal smart contracts.
+        
+Generate Solidity code based on this requirement: "{prompt}"
+
+Follow these guidelines:
+1. Use Solidity ^0.8.0 or higher and prioritize gas efficiency  
+2. Avoid unsafe patterns like `tx.origin`, `call.value`, `delegatecall`, and `selfdestruct`  
+3. Leverage OpenZeppelin contracts (e.g., Ownable, ReentrancyGuard, ERC20) where applicable  
+4. Implement strong access control and input validation  
+5. Emit events for key state changes and guard against reentrancy in Ether transfers  
+6. Return only the complete, minimal, well-commented contract — no extra text or markdown
+
+
+Return ONLY the complete Solidity code without explanations.
+"""
+
+def build_security_prompt(solidity_code):
+    return f"""You are a blockchain security auditor. Examine this Solidity code and provide EXACTLY 5 key security considerations that were addressed in the implementation.
+
+{solidity_code}
+
+Format your response as a numbered list of 5 brief bullet points (1-2 sentences each), focusing ONLY on security aspects that were properly handled in the code (not suggestions for improvement).
+"""
+
+SOLIDITY_MARKER = "===SOLIDITY==="
+SECURITY_MARKER = "===SECURITY==="
+
+def build_single_pass_prompt(prompt):
+    return build_code_prompt(prompt).replace(
+        "Return ONLY the complete Solidity code without explanations.\n",
+        f"""Respond in exactly this format and nothing else:
+{SOLIDITY_MARKER}
+<the complete Solidity code, without markdown fences>
+{SECURITY_MARKER}
+<a numbered list of EXACTLY 5 brief bullet points (1-2 sentences each) describing the key security considerations that were addressed in the code above (not suggestions for improvement)>
+"""
+    )
+
+def parse_structured_response(text):
+    """
+    Split a single-pass response into (solidity_code, security_considerations).
+
+    Prefers the explicit section markers, tolerating markdown decoration around
+    them; falls back to the first fenced code block (or the text up to the first
+    numbered list) when the model ignores the format.
+    """
+    text = text.strip()
+    marker = re.compile(
+        r"^[#*=\t ]*(SOLIDITY|SECURITY)(?:[\t ]+(?:CODE|CONSIDERATIONS|NOTES))?[*:=\t ]*$",
+        re.IGNORECASE | re.MULTILINE
+    )
+    sections = {}
+    matches = list(marker.finditer(text))
+    for match, following in zip(matches, matches[1:] + [None]):
+        end = following.start() if following else len(text)
+        sections[match.group(1).upper()] = text[match.end():end].strip()
+
+    code = sections.get("SOLIDITY")
+    security = sections.get("SECURITY")
+    if code is None:
+        fenced = re.search(r"```(?:solidity)?\s*\n(.*?)```", text, re.DOTALL)
+        if fenced:
+            code = fenced.group(1)
+            security = security or text[fenced.end():]
+        else:
+            numbered = re.search(r"^\s*1[.)]\s", text, re.MULTILINE)
+            split_at = numbered.start() if numbered else len(text)
+            code = text[:split_at]
+            security = security or text[split_at:]
+
+    # Strip any markdown fences the model wrapped around the code anyway
+    code = re.sub(r"^```(?:solidity)?\s*\n|\n?```\s*$", "", code.strip()).strip()
+    return code or None, (security or "").strip() or None
+
+_openai_clients = {}
+
+def routed_request(system_message, prompt, max_tokens, **options):
+    """
+    Return (route, create() arguments) for one generation call, with the
+    model and max_tokens chosen by generation_router. Raises
+    PromptTooLargeError before anything is sent if no model can take it.
+    """
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": prompt}
+    ]
+    route = generation_router.route(messages, max_tokens)
+    request = dict(model=route.model, messages=messages, temperature=GENERATION_TEMPERATURE,
+                   max_tokens=route.max_tokens, **options)
+    return route, request
+
+def get_openai_client(api_key):
+    """Reuse one OpenAI client (and its connection pool) per API key."""
+    if api_key not in _openai_clients:
+        # OPENAI_BASE_URL, if set, is picked up by the client itself; retries are
+        # left to call_with_retries so they share the process-wide limiter
+        _openai_clients[api_key] = openai.OpenAI(api_key=api_key, max_retries=0)
+    return _openai_clients[api_key]
+
+def create_completion(api_key, route, request):
+    """
+    Send one chat completion under the shared OpenAI rate limiter, retrying
+    retryable failures (for streams, only opening the stream is retried).
+    """
+    return call_with_retries(
+        get_limiter("openai"),
+        lambda: get_openai_client(api_key).chat.completions.create(**request),
+        # OpenAI reserves max_tokens against the TPM limit when the request is accepted
+        tokens=route.prompt_tokens + route.max_tokens
+    )
+
+def generate_contract_with_openai(prompt, api_key):
+    """
+    Generate the contract, then review it for security considerations in a
+    second call. Returns (solidity_code, security_considerations); API
+    errors and PromptTooLargeError propagate to the caller.
+    """
+    route, request = routed_request(CODE_SYSTEM_MESSAGE, build_code_prompt(prompt), CODE_MAX_TOKENS)
+    started = time.perf_counter()
+    with span("generate.code"):
+        response = create_completion(api_key, route, request)
+    observe_route(route, time.perf_counter() - started)
+    _record_usage(response)
+
+    solidity_code = response.choices[0].message.content.strip()
+
+    # Then, generate security considerations
+    route, request = routed_request(SECURITY_SYSTEM_MESSAGE, build_security_prompt(solidity_code),
+                                    SECURITY_MAX_TOKENS)
+    started = time.perf_counter()
+    with span("generate.security"):
+        security_response = create_completion(api_key, route, request)
+    observe_route(route, time.perf_counter() - started)
+    _record_usage(security_response)
+
+    security_considerations = security_response.choices[0].message.content.strip()
+
+    return solidity_code, security_considerations
+
+def stream_contract_with_openai(prompt, api_key):
+    """
+    Streaming variant of generate_contract_with_openai.
+
+    Yields ("code", text) fragments while the contract is generated, then
+    ("security", text) fragments for the security considerations.
+    """
+    code_parts = []
+    route, request = routed_request(CODE_SYSTEM_MESSAGE, build_code_prompt(prompt), CODE_MAX_TOKENS, stream=True)
+    started = time.perf_counter()
+    response = create_completion(api_key, route, request)
+    for delta in _stream_deltas(response, "generate.code", started, route):
+        code_parts.append(delta)
+        yield "code", delta
+
+    solidity_code = "".join(code_parts).strip()
+
+    route, request = routed_request(SECURITY_SYSTEM_MESSAGE, build_security_prompt(solidity_code),
+                                    SECURITY_MAX_TOKENS, stream=True)
+    started = time.perf_counter()
+    security_response = create_completion(api_key, route, request)
+    for delta in _stream_deltas(security_response, "generate.security", started, route):
+        yield "security", delta
+
+def generate_contract_single_pass(prompt, api_key):
+    """Generate the contract and its security considerations in one structured completion."""
+    route, request = routed_request(CODE_SYSTEM_MESSAGE, build_single_pass_prompt(prompt), SINGLE_PASS_MAX_TOKENS)
+    started = time.perf_counter()
+    with span("generate.single_pass"):
+        response = create_completion(api_key, route, request)
+    observe_route(route, time.perf_counter() - started)
+    _record_usage(response)
+    return parse_structured_response(response.choices[0].message.content)
+
+def stream_contract_single_pass(prompt, api_key):
+    """Streaming variant of generate_contract_single_pass; yields ("raw", text) fragments."""
+    route, request = routed_request(CODE_SYSTEM_MESSAGE, build_single_pass_prompt(prompt), SINGLE_PASS_MAX_TOKENS,
+                                    stream=True)
+    started = time.perf_counter()
+    response = create_completion(api_key, route, request)
+    for delta in _stream_deltas(response, "generate.single_pass", started, route):
+        yield "raw", delta
+
+def _stream_deltas(response, stage, started, route):
+    # Spans cannot straddle a yield, so streamed stages are timed by hand
+    characters = 0
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        delta = getattr(chunk.choices[0].delta, "content", None)
+        if delta:
+            if not characters:
+                observe(f"{stage}.first_token", time.perf_counter() - started)
+            characters += len(delta)
+            yield delta
+    observe(stage, time.perf_counter() - started)
+    observe_route(route, time.perf_counter() - started)
+    # Streamed responses carry no usage block; estimate at ~4 characters per token
+    record("openai.completion_tokens_estimated", characters // 4)
+
+def _record_usage(response):
+    if response.usage:
+        record("openai.prompt_tokens", response.usage.prompt_tokens)
+        record("openai.completion_tokens", response.usage.completion_tokens)
+
+def get_generation_cache():
+    """Persistent cache of finished generations, shared by every session and the prewarm script."""
+    return get_cache(GENERATION_CACHE_PATH)
+
+def generation_cache_key(prompt, mode):
+    # Case and whitespace differences in the request do not change the contract
+    normalized = " ".join(prompt.split()).casefold()
+    return make_cache_key(
+        f"{mode}\0{GENERATION_TEMPERATURE}\0{normalized}", GENERATION_MODEL_ROUTES, GENERATION_PROMPT_VERSION
+    )
+
+def get_cached_generation(prompt, mode):
+    """Return the cached {code, security, ...metadata} for prompt and mode, or None."""
+    cached = get_generation_cache().get(generation_cache_key(prompt, mode))
+    return json.loads(cached) if cached else None
+
+def store_generation(prompt, mode, solidity_code, security_considerations, elapsed):
+    get_generation_cache().set(generation_cache_key(prompt, mode), json.dumps({
+        "code": solidity_code,
+        "security": security_considerations,
+        "prompt": prompt,
+        "mode": mode,
+        "model": GENERATION_MODEL_ROUTES,
+        "temperature": GENERATION_TEMPERATURE,
+        "prompt_version": GENERATION_PROMPT_VERSION,
+        "elapsed_seconds": round(elapsed, 2),
+        "generated_at": time.time(),
+    }))
+
+GENERATION_MODES = {
+    "Fast (single pass)": (generate_contract_single_pass, stream_contract_single_pass),
+    "Audit (two passes)": (generate_contract_with_openai, stream_contract_with_openai),
+}
+
+# Example prompts
+example_prompts = [
+    "Create an ERC-20 token with minting restricted to addresses in an allowlist",
+    "Build a simple NFT marketplace where creators receive royalties on secondary sales",
+    "Create a multi-signature wallet that requires approval from two out of three owners",
+    "Develop a staking contract where users earn rewards based on time staked",
+    "Make a decentralized voting system where users can delegate their votes"
+]
+
@@ -0,0 +1,61 @@
+"""
+Populate the generation cache for the sidebar example prompts.
+
+Run at deploy time so that clicking an example returns instantly:
+
+    python prewarm_cache.py
+    python prewarm_cache.py --modes "Fast (single pass)" --workers 2
+    python prewarm_cache.py --force
+
+Uses OPENAI_API_KEY (and OPENAI_BASE_URL, if set) like the app itself.
+"""
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import contract_generator as generator
+
+
+def prewarm(prompt, mode, api_key, force=False):
+    """Generate and cache one (prompt, mode) pair; returns a status line."""
+    if not force and generator.get_cached_generation(prompt, mode):
+        return f"cached   {mode}: {prompt}"
+    generate, _ = generator.GENERATION_MODES[mode]
+    started = time.perf_counter()
+    try:
+        solidity_code, security_considerations = generate(prompt, api_key)
+    except Exception as e:
+        return f"FAILED   {mode}: {prompt} ({e})"
+    elapsed = time.perf_counter() - started
+    if not (solidity_code and security_considerations):
+        return f"FAILED   {mode}: {prompt}"
+    generator.store_generation(prompt, mode, solidity_code, security_considerations, elapsed)
+    return f"{elapsed:5.1f}s   {mode}: {prompt}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prewarm the contract generation cache")
+    parser.add_argument("--modes", nargs="+", choices=list(generator.GENERATION_MODES), default=list(generator.GENERATION_MODES),
+                        help="Generation modes to prewarm (default: all)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent generations")
+    parser.add_argument("--force", action="store_true", help="Regenerate entries that are already cached")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY is not set")
+        sys.exit(1)
+
+    jobs = [(prompt, mode) for prompt in generator.example_prompts for mode in args.modes]
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(lambda job: prewarm(*job, api_key, force=args.force), jobs))
+    for line in results:
+        print(line)
+    if any(line.startswith("FAILED") for line in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
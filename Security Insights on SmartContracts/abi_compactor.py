@@ -0,0 +1,88 @@
+import json
+
+
+# Order in which entry kinds are listed in the compact form
+ABI_KIND_ORDER = ("constructor", "receive", "fallback", "function", "event", "error")
+
+# State-changing functions are listed before read-only ones
+MUTABILITY_ORDER = {"payable": 0, "nonpayable": 1, "view": 2, "pure": 3}
+
+
+def format_type(param):
+    """Render a parameter type, expanding tuples into their named components."""
+    kind = param.get("type", "")
+    if kind.startswith("tuple"):
+        components = ",".join(format_param(component) for component in param.get("components", []))
+        return f"({components}){kind[len('tuple'):]}"
+    return kind
+
+
+def format_param(param, indexed=False):
+    parts = [format_type(param)]
+    if indexed and param.get("indexed"):
+        parts.append("indexed")
+    if param.get("name"):
+        parts.append(param["name"])
+    return " ".join(parts)
+
+
+def state_mutability(entry):
+    """stateMutability, derived from the pre-0.5 'constant'/'payable' flags when missing."""
+    if entry.get("stateMutability"):
+        return entry["stateMutability"]
+    if entry.get("constant"):
+        return "view"
+    return "payable" if entry.get("payable") else "nonpayable"
+
+
+def format_entry(entry):
+    """Render one ABI entry as a single Solidity-like signature line."""
+    kind = entry.get("type", "function")
+    inputs = entry.get("inputs", [])
+
+    if kind == "event":
+        params = ",".join(format_param(param, indexed=True) for param in inputs)
+        return f"event {entry.get('name', '')}({params})" + (" anonymous" if entry.get("anonymous") else "")
+    if kind == "error":
+        return f"error {entry.get('name', '')}({','.join(format_param(param) for param in inputs)})"
+    if kind in ("constructor", "receive", "fallback"):
+        return f"{kind}({','.join(format_param(param) for param in inputs)}) {state_mutability(entry)}"
+    if kind == "function":
+        line = f"function {entry.get('name', '')}({','.join(format_param(param) for param in inputs)}) {state_mutability(entry)}"
+        outputs = entry.get("outputs") or []
+        if outputs:
+            line += f" returns ({','.join(format_param(param) for param in outputs)})"
+        return line
+    # Unknown entry kinds are passed through rather than dropped
+    return json.dumps(entry, separators=(",", ":"))
+
+
+def _sort_key(entry):
+    kind = entry.get("type", "function")
+    rank = ABI_KIND_ORDER.index(kind) if kind in ABI_KIND_ORDER else len(ABI_KIND_ORDER)
+    mutability = MUTABILITY_ORDER.get(state_mutability(entry), 0) if kind == "function" else 0
+    return rank, mutability
+
+
+def compact_abi(abi):
+    """
+    Render an ABI as one signature per line, grouped by kind.
+
+    Functions come state-changing first, then view/pure; overloads of a name
+    are kept next to each other and exact duplicates (common in ABIs merged
+    from proxies and implementations) are listed once.
+    """
+    first_seen = {}
+    for position, entry in enumerate(abi):
+        first_seen.setdefault((entry.get("type"), entry.get("name")), position)
+
+    ordered = sorted(
+        enumerate(abi),
+        key=lambda item: (_sort_key(item[1]), first_seen[(item[1].get("type"), item[1].get("name"))], item[0])
+    )
+    lines = []
+    for _, entry in ordered:
+        line = format_entry(entry)
+        if line not in lines:
+            lines.append(line)
+    return "\n".join(lines)
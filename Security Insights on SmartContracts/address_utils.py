@@ -0,0 +1,88 @@
+import re
+
+
+# Keccak-f[1600] round constants and rotation offsets
+_ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+_ROTATIONS = [
+    [0, 36, 3, 41, 18],
+    [1, 44, 10, 45, 2],
+    [62, 6, 43, 15, 61],
+    [28, 55, 25, 21, 56],
+    [27, 20, 39, 8, 14],
+]
+_MASK = (1 << 64) - 1
+_RATE = 136  # bytes, for a 256-bit output
+
+HEX_ADDRESS_PATTERN = re.compile(r"(0x)?[0-9a-fA-F]{40}")
+
+
+def _rotl(value, shift):
+    return ((value << shift) | (value >> (64 - shift))) & _MASK if shift else value
+
+
+def _keccak_f(lanes):
+    for round_constant in _ROUND_CONSTANTS:
+        # Theta
+        c = [lanes[x][0] ^ lanes[x][1] ^ lanes[x][2] ^ lanes[x][3] ^ lanes[x][4] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl(c[(x + 1) % 5], 1) for x in range(5)]
+        lanes = [[lanes[x][y] ^ d[x] for y in range(5)] for x in range(5)]
+        # Rho and pi
+        b = [[0] * 5 for _ in range(5)]
+        for x in range(5):
+            for y in range(5):
+                b[y][(2 * x + 3 * y) % 5] = _rotl(lanes[x][y], _ROTATIONS[x][y])
+        # Chi
+        lanes = [[b[x][y] ^ (~b[(x + 1) % 5][y] & b[(x + 2) % 5][y]) for y in range(5)] for x in range(5)]
+        # Iota
+        lanes[0][0] ^= round_constant
+    return lanes
+
+
+def keccak256(data):
+    """Ethereum's Keccak-256 (original Keccak padding, not NIST SHA3-256)."""
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % _RATE))
+    padded[-1] |= 0x80
+
+    lanes = [[0] * 5 for _ in range(5)]
+    for offset in range(0, len(padded), _RATE):
+        block = padded[offset:offset + _RATE]
+        for i in range(_RATE // 8):
+            lanes[i % 5][i // 5] ^= int.from_bytes(block[i * 8:i * 8 + 8], "little")
+        lanes = _keccak_f(lanes)
+
+    output = b"".join(lanes[i % 5][i // 5].to_bytes(8, "little") for i in range(4))
+    return output
+
+
+def to_checksum_address(address):
+    """Return the EIP-55 mixed-case checksum form of a hex address."""
+    hex_address = address.lower().replace("0x", "", 1)
+    digest = keccak256(hex_address.encode("ascii")).hex()
+    return "0x" + "".join(
+        char.upper() if int(digest[i], 16) >= 8 else char
+        for i, char in enumerate(hex_address)
+    )
+
+
+def is_address(value):
+    """
+    Validate an Ethereum address without importing web3.
+
+    Mirrors web3's Web3.is_address: 40 hex digits with an optional 0x prefix,
+    where mixed-case addresses must carry a valid EIP-55 checksum.
+    """
+    if not isinstance(value, str) or not HEX_ADDRESS_PATTERN.fullmatch(value):
+        return False
+    hex_digits = value[2:] if value.startswith("0x") else value
+    if hex_digits == hex_digits.lower() or hex_digits == hex_digits.upper():
+        return True
+    return to_checksum_address(hex_digits)[2:] == hex_digits
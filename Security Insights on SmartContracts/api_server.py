@@ -0,0 +1,489 @@
+"""
+Headless HTTP API for the explainer and the contract generator.
+
+    python api_server.py --port 8080
+
+    POST /v1/analyze/address  {"address": "0x...", "stream": false}
+    POST /v1/analyze/source   {"source": "pragma solidity ...", "incremental": false, "sectioned": false,
+                              "stream": false}
+    POST /v1/analyze/abi      {"abi": [...], "address": null, "stream": false}
+    POST /v1/generate         {"prompt": "An ERC-20 token ...", "mode": "fast" | "audit", "stream": false}
+    GET  /healthz
+    GET  /metrics
+
+Blocking requests answer JSON; with "stream": true analyses stream Markdown
+text and generations stream NDJSON {"stage", "text"} lines.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+from aiohttp import web
+
+import smart_contract_explainer as explainer
+from rate_limiter import get_limiter, acall_with_retries
+from model_router import PromptTooLargeError, observe_route
+from instrumentation import trace, record, observe, METRICS
+
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+# Requests served at once; each analysis holds a worker thread, later requests wait for a slot
+MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "256"))
+# Seconds from arrival to the end of the response, waiting for a slot included
+REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "300"))
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+GENERATOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "NLP to SmartContracts")
+GENERATION_MODES = {"fast": "Fast (single pass)", "audit": "Audit (two passes)"}
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+
+class RequestError(Exception):
+    """A request that cannot be served, answered with status and a JSON error message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class UpstreamError(Exception):
+    """An HTTP error answer from OpenAI; status_code and retry_after drive call_with_retries."""
+
+    def __init__(self, status_code, message, retry_after=None):
+        super().__init__(f"OpenAI returned {status_code}: {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ExplainerService:
+    """
+    Request handlers sharing one worker pool, one concurrency budget and one upstream HTTP session.
+
+    Analyses reuse the explainer's functions, with their caches, rate
+    limiters and single-flight coalescing, on a bounded thread pool; the event
+    loop only parses requests, enforces deadlines and streams output.
+    Contract generation calls the OpenAI REST API asynchronously over the
+    same aiohttp stack the server runs on.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, request_timeout=REQUEST_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api")
+        self._http = None
+        self._generator = None
+        self._in_flight = 0
+
+    def routes(self):
+        return [
+            web.post("/v1/analyze/address", self.analyze_address),
+            web.post("/v1/analyze/source", self.analyze_source),
+            web.post("/v1/analyze/abi", self.analyze_abi),
+            web.post("/v1/generate", self.generate),
+            web.get("/healthz", self.health),
+            web.get("/metrics", self.metrics),
+        ]
+
+    async def close(self, app=None):
+        if self._http is not None:
+            await self._http.close()
+        self._executor.shutdown(wait=False)
+
+    # Analyses
+
+    async def analyze_address(self, request):
+        body = await _read_json(request)
+        address = body.get("address")
+        if not isinstance(address, str) or not explainer.is_valid_address(address):
+            raise RequestError(400, "'address' must be a valid Ethereum address")
+        return await self._analyze(request, "address", explainer.analyze_contract_from_address, address,
+                                   stream=bool(body.get("stream")))
+
+    async def analyze_source(self, request):
+        body = await _read_json(request)
+        source = body.get("source")
+        if not isinstance(source, str) or not source.strip():
+            raise RequestError(400, "'source' must be non-empty Solidity source")
+        return await self._analyze(request, "source", explainer.analyze_contract_from_source, source,
+                                   stream=bool(body.get("stream")), incremental=body.get("incremental"),
+                                   sectioned=body.get("sectioned"))
+
+    async def analyze_abi(self, request):
+        body = await _read_json(request)
+        abi = body.get("abi")
+        if isinstance(abi, str):
+            try:
+                abi = json.loads(abi)
+            except json.JSONDecodeError:
+                raise RequestError(400, "'abi' is not valid JSON")
+        if not isinstance(abi, list) or not abi:
+            raise RequestError(400, "'abi' must be a non-empty ABI array")
+        return await self._analyze(request, "abi", explainer.analyze_contract_from_abi, abi, body.get("address"),
+                                   stream=bool(body.get("stream")))
+
+    async def _analyze(self, request, name, fn, *args, stream=False, **kwargs):
+        deadline = time.monotonic() + self.request_timeout
+        async with self._slot(name, deadline) as hold_until:
+            if stream:
+                response = await _start_stream(request, "text/markdown; charset=utf-8")
+                await self._stream_fragments(response, name, fn, args, dict(kwargs, stream=True), deadline,
+                                             hold_until)
+                return response
+            loop = asyncio.get_running_loop()
+            started = time.perf_counter()
+            work = loop.run_in_executor(self._executor, _run_analysis, name, fn, args, kwargs)
+            hold_until(work)
+            try:
+                # Shielded: cancelling the wrapper would not stop the worker thread, only hide it
+                result = await asyncio.wait_for(asyncio.shield(work), _remaining(deadline))
+            except asyncio.TimeoutError:
+                raise RequestError(504, f"analysis did not finish within {self.request_timeout:g}s")
+        status = 200
+        # Sectioned and map-reduce analyses embed failed parts in the text, so look anywhere in it
+        if result.startswith("Could not fetch contract"):
+            status = 404
+        elif "Error generating explanation: Prompt of about" in result:
+            # Rejected by the model router's preflight, before any upstream call
+            status = 413
+        elif "Error generating explanation:" in result:
+            status = 502
+        return web.json_response(
+            {"explanation": result, "elapsed_seconds": round(time.perf_counter() - started, 3)}, status=status
+        )
+
+    async def _stream_fragments(self, response, name, fn, args, kwargs, deadline, hold_until):
+        """Run a streaming analysis on the worker pool and forward its fragments as they arrive."""
+        loop = asyncio.get_running_loop()
+        fragments = asyncio.Queue()
+
+        def pump():
+            # The generator blocks on the upstream stream, so it is drained off the event loop
+            try:
+                with trace(f"api.{name}"):
+                    result = fn(*args, **kwargs)
+                    for fragment in [result] if isinstance(result, str) else result:
+                        loop.call_soon_threadsafe(fragments.put_nowait, fragment)
+            except Exception as e:
+                loop.call_soon_threadsafe(fragments.put_nowait, f"\n\nError: {e}")
+            finally:
+                loop.call_soon_threadsafe(fragments.put_nowait, None)
+
+        hold_until(loop.run_in_executor(self._executor, pump))
+        while True:
+            try:
+                fragment = await asyncio.wait_for(fragments.get(), _remaining(deadline))
+            except asyncio.TimeoutError:
+                await response.write(f"\n\nError: request timed out after {self.request_timeout:g}s".encode())
+                break
+            # Send whatever else has arrived in the same write
+            pending = [fragment]
+            while pending[-1] is not None and not fragments.empty():
+                pending.append(fragments.get_nowait())
+            finished = pending[-1] is None
+            text = "".join(pending[:-1] if finished else pending)
+            if text:
+                await response.write(text.encode())
+            if finished:
+                break
+        await response.write_eof()
+
+    # Contract generation
+
+    async def generate(self, request):
+        body = await _read_json(request)
+        prompt = body.get("prompt")
+        mode = body.get("mode", "fast")
+        if not isinstance(prompt, str) or not prompt.strip():
+            raise RequestError(400, "'prompt' must be a non-empty description of the contract")
+        if mode not in GENERATION_MODES:
+            raise RequestError(400, f"'mode' must be one of {', '.join(GENERATION_MODES)}")
+        generator = await self._load_generator()
+        loop = asyncio.get_running_loop()
+        label = GENERATION_MODES[mode]
+        deadline = time.monotonic() + self.request_timeout
+
+        cached = await loop.run_in_executor(self._executor, generator.get_cached_generation, prompt, label)
+        if cached:
+            record("generation_cache.hit")
+            if body.get("stream"):
+                response = await _start_stream(request, "application/x-ndjson")
+                for stage in ("code", "security"):
+                    await response.write(json.dumps({"stage": stage, "text": cached[stage]}).encode() + b"\n")
+                await response.write_eof()
+                return response
+            return web.json_response({"code": cached["code"], "security": cached["security"], "cached": True})
+        record("generation_cache.miss")
+
+        async with self._slot("generate", deadline):
+            started = time.perf_counter()
+            if body.get("stream"):
+                response = await _start_stream(request, "application/x-ndjson")
+                stages = {"code": [], "security": [], "raw": []}
+                try:
+                    async with _timeout(_remaining(deadline)):
+                        async for stage, text in self._generate_stream(generator, prompt, mode):
+                            stages[stage].append(text)
+                            await response.write(json.dumps({"stage": stage, "text": text}).encode() + b"\n")
+                except Exception as e:
+                    message = f"generation did not finish within {self.request_timeout:g}s" \
+                        if isinstance(e, asyncio.TimeoutError) else f"Error generating code: {e}"
+                    await response.write(json.dumps({"stage": "error", "text": message}).encode() + b"\n")
+                    await response.write_eof()
+                    return response
+                if mode == "fast":
+                    code, security = generator.parse_structured_response("".join(stages["raw"]))
+                else:
+                    code, security = "".join(stages["code"]).strip(), "".join(stages["security"]).strip()
+            else:
+                try:
+                    async with _timeout(_remaining(deadline)):
+                        code, security = await self._generate(generator, prompt, mode)
+                except asyncio.TimeoutError:
+                    raise RequestError(504, f"generation did not finish within {self.request_timeout:g}s")
+                except PromptTooLargeError as e:
+                    raise RequestError(413, str(e))
+                except Exception as e:
+                    raise RequestError(502, f"Error generating code: {e}")
+            elapsed = time.perf_counter() - started
+            observe("api.generate", elapsed, mode=mode)
+            if code and security:
+                await loop.run_in_executor(self._executor, generator.store_generation, prompt, label, code, security,
+                                           elapsed)
+
+        if body.get("stream"):
+            await response.write_eof()
+            return response
+        if not (code and security):
+            raise RequestError(502, "the model response did not contain both the contract and its security review")
+        return web.json_response({"code": code, "security": security, "cached": False,
+                                  "elapsed_seconds": round(elapsed, 3)})
+
+    async def _generate(self, generator, prompt, mode):
+        if mode == "fast":
+            text = await self._complete(generator, generator.CODE_SYSTEM_MESSAGE,
+                                        generator.build_single_pass_prompt(prompt), generator.SINGLE_PASS_MAX_TOKENS)
+            return generator.parse_structured_response(text)
+        code = (await self._complete(generator, generator.CODE_SYSTEM_MESSAGE, generator.build_code_prompt(prompt),
+                                     generator.CODE_MAX_TOKENS)).strip()
+        security = await self._complete(generator, generator.SECURITY_SYSTEM_MESSAGE,
+                                        generator.build_security_prompt(code), generator.SECURITY_MAX_TOKENS)
+        return code, security.strip()
+
+    async def _generate_stream(self, generator, prompt, mode):
+        """Yield (stage, text) fragments like contract_generator's streaming functions."""
+        if mode == "fast":
+            async for text in self._complete_stream(generator, generator.CODE_SYSTEM_MESSAGE,
+                                                    generator.build_single_pass_prompt(prompt),
+                                                    generator.SINGLE_PASS_MAX_TOKENS):
+                yield "raw", text
+            return
+        parts = []
+        async for text in self._complete_stream(generator, generator.CODE_SYSTEM_MESSAGE,
+                                                generator.build_code_prompt(prompt), generator.CODE_MAX_TOKENS):
+            parts.append(text)
+            yield "code", text
+        async for text in self._complete_stream(generator, generator.SECURITY_SYSTEM_MESSAGE,
+                                                generator.build_security_prompt("".join(parts).strip()),
+                                                generator.SECURITY_MAX_TOKENS):
+            yield "security", text
+
+    async def _complete(self, generator, system, prompt, max_tokens):
+        # Routed like contract_generator's own calls; oversized prompts fail before the request
+        route, payload = generator.routed_request(system, prompt, max_tokens)
+
+        async def request():
+            async with await self._post_completion(payload) as response:
+                return await response.json()
+
+        started = time.perf_counter()
+        body = await acall_with_retries(get_limiter("openai"), request, tokens=route.prompt_tokens + route.max_tokens)
+        observe_route(route, time.perf_counter() - started)
+        usage = body.get("usage")
+        if usage:
+            record("openai.prompt_tokens", usage.get("prompt_tokens", 0))
+            record("openai.completion_tokens", usage.get("completion_tokens", 0))
+        return body["choices"][0]["message"]["content"]
+
+    async def _complete_stream(self, generator, system, prompt, max_tokens):
+        route, payload = generator.routed_request(system, prompt, max_tokens, stream=True)
+        started = time.perf_counter()
+        response = await acall_with_retries(
+            get_limiter("openai"),
+            lambda: self._post_completion(payload),
+            tokens=route.prompt_tokens + route.max_tokens
+        )
+        async with response:
+            # Server-sent events, one "data: {chunk}" line each; decoded with json directly, as
+            # building SDK objects per chunk costs more CPU than the rest of a request
+            async for line in response.content:
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                choices = json.loads(data).get("choices")
+                if choices and choices[0].get("delta", {}).get("content"):
+                    yield choices[0]["delta"]["content"]
+        observe_route(route, time.perf_counter() - started)
+
+    async def _post_completion(self, payload):
+        """POST a chat completion and return the open response, raising UpstreamError on HTTP errors."""
+        response = await self._http_session().post(
+            f"{OPENAI_BASE_URL}/chat/completions",
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"},
+            json=payload
+        )
+        if response.status >= 400:
+            message = await response.text()
+            response.release()
+            raise UpstreamError(response.status, message[:500], response.headers.get("Retry-After"))
+        return response
+
+    def _http_session(self):
+        if self._http is None:
+            # Concurrency is bounded by the request slots, not the connection pool
+            self._http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        return self._http
+
+    async def _load_generator(self):
+        """Import the contract generator module (and the OpenAI SDK with it) on first use."""
+        if self._generator is None:
+            def load():
+                if GENERATOR_DIR not in sys.path:
+                    sys.path.insert(0, GENERATOR_DIR)
+                import contract_generator
+                return contract_generator
+
+            try:
+                self._generator = await asyncio.get_running_loop().run_in_executor(self._executor, load)
+            except ImportError as e:
+                raise RequestError(503, f"contract generator unavailable: {e}")
+        return self._generator
+
+    # Operations
+
+    async def health(self, request):
+        return web.json_response({
+            "status": "ok",
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+        })
+
+    async def metrics(self, request):
+        return web.Response(text=METRICS.render_prometheus(), content_type="text/plain")
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, name, deadline):
+        """
+        Hold one of the max_concurrency request slots, waiting at most until deadline.
+
+        Yields hold_until(future): worker-pool futures passed to it keep the
+        slot taken after the block exits until they finish, so an analysis
+        that outlived its deadline still counts against the concurrency budget
+        while its thread runs on.
+        """
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), _remaining(deadline))
+        except asyncio.TimeoutError:
+            raise RequestError(503, "server busy, try again later")
+        observe("api.queue_wait", time.monotonic() - started, endpoint=name)
+        self._in_flight += 1
+        work = []
+        try:
+            yield work.append
+        finally:
+            pending = [future for future in work if not future.done()]
+            if pending:
+                record("api.slot_held_past_deadline")
+                asyncio.gather(*pending, return_exceptions=True).add_done_callback(lambda _: self._release())
+            else:
+                self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._slots.release()
+
+
+def _run_analysis(name, fn, args, kwargs):
+    with trace(f"api.{name}"):
+        result = fn(*args, **kwargs)
+    return result if isinstance(result, str) else "".join(result)
+
+
+def _remaining(deadline):
+    return max(deadline - time.monotonic(), 0.001)
+
+
+@contextlib.asynccontextmanager
+async def _timeout(seconds):
+    """asyncio.timeout() for Python versions before 3.11: cancel the enclosed block after seconds."""
+    task = asyncio.current_task()
+    handle = asyncio.get_running_loop().call_later(seconds, task.cancel)
+    try:
+        yield
+    except asyncio.CancelledError:
+        if handle.cancelled() or time.monotonic() < handle.when():
+            raise
+        raise asyncio.TimeoutError()
+    finally:
+        handle.cancel()
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise RequestError(400, "request body must be JSON")
+    if not isinstance(body, dict):
+        raise RequestError(400, "request body must be a JSON object")
+    return body
+
+
+async def _start_stream(request, content_type):
+    response = web.StreamResponse(headers={"Content-Type": content_type, "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    return response
+
+
+@web.middleware
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except RequestError as e:
+        headers = {"Retry-After": "1"} if e.status == 503 else None
+        return web.json_response({"error": str(e)}, status=e.status, headers=headers)
+
+
+def create_app(max_concurrency=MAX_CONCURRENCY, request_timeout=REQUEST_TIMEOUT):
+    """Build the aiohttp application (also used by benchmarks/bench_api.py)."""
+    service = ExplainerService(max_concurrency, request_timeout)
+    app = web.Application(middlewares=[error_middleware], client_max_size=MAX_BODY_BYTES)
+    app.add_routes(service.routes())
+    app.on_cleanup.append(service.close)
+    app["service"] = service
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Contract Explainer HTTP API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY,
+                        help="Requests served at once (default: API_MAX_CONCURRENCY or 256)")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT,
+                        help="Seconds per request, waiting for a slot included (default: API_REQUEST_TIMEOUT or 300)")
+    args = parser.parse_args()
+    web.run_app(create_app(args.concurrency, args.timeout), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from smart_contract_explainer import (
+    is_valid_address,
+    fetch_resolved_metadata,
+    resolve_contracts,
+    load_source_files,
+    build_files_prompt,
+    build_abi_prompt,
+    explain_files,
+    analyze_source_incrementally,
+    analyze_source_by_section,
+    generate_explanation_with_openai
+)
+from rate_limiter import request_priority, BATCH
+from instrumentation import bind
+
+
+# Default concurrency per pipeline stage
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_UNPACK_WORKERS = 2
+DEFAULT_LLM_WORKERS = 4
+
+
+def read_batch_inputs(path):
+    """Read batch items from a directory of .sol files or a file of addresses (one per line)."""
+    if os.path.isdir(path):
+        return [
+            {"kind": "file", "input": os.path.join(path, name)}
+            for name in sorted(os.listdir(path))
+            if name.endswith(".sol")
+        ]
+
+    items = []
+    with open(path, "r") as file:
+        for line in file:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                items.append({"kind": "address", "input": line})
+    return items
+
+
+def _fetch_stage(record):
+    """Stage 1: fetch raw source and ABI from Etherscan or disk."""
+    if record["kind"] == "file":
+        with open(record["input"], "r") as file:
+            record["source_code"] = file.read()
+        return record
+
+    if not is_valid_address(record["input"]):
+        raise ValueError("Invalid Ethereum address")
+    # Proxies and clones of already analyzed bytecode resolve to the contract to explain
+    _, metadata, record["notes"] = fetch_resolved_metadata(record["input"], record.get("resolution"))
+    record["abi"] = metadata.get("abi")
+    record["source_code"] = metadata.get("source_code")
+    if not record["source_code"] and not record["abi"]:
+        raise ValueError("Could not fetch contract source code or ABI")
+    return record
+
+
+def _unpack_stage(record):
+    """Stage 2: unpack Standard JSON sources and build the prompt."""
+    if record.get("source_code"):
+        files = load_source_files(record["source_code"])
+        if not (record["incremental"] or record["sectioned"]):
+            # A None prompt means map-reduce, run in the explain stage
+            record["prompt"] = build_files_prompt(files)
+        record["files"] = files
+    else:
+        record["prompt"] = build_abi_prompt(record["abi"])
+    return record
+
+
+def _explain_stage(record):
+    """Stage 3: generate the explanation with OpenAI."""
+    if not record.get("files"):
+        explanation = generate_explanation_with_openai(record["prompt"])
+    elif record["incremental"]:
+        explanation = analyze_source_incrementally(record["files"])
+    elif record["sectioned"]:
+        explanation = analyze_source_by_section(record["files"])
+    else:
+        explanation = explain_files(record["files"], record["prompt"])
+    # Function-by-function and sectioned explanations report a failed section in place
+    if "Error generating explanation:" in explanation:
+        raise RuntimeError(explanation)
+    record["explanation"] = explanation
+    return record
+
+
+def run_batch(items, output, fetch_workers=DEFAULT_FETCH_WORKERS,
+              unpack_workers=DEFAULT_UNPACK_WORKERS, llm_workers=DEFAULT_LLM_WORKERS,
+              incremental=False, sectioned=False):
+    """
+    Run items through the fetch -> unpack -> explain pipeline.
+
+    Each stage has its own bounded thread pool, so fetches for later contracts
+    overlap with LLM calls for earlier ones. One JSON line is written to output
+    as soon as each contract finishes; a failing item is reported with its error
+    and does not stop the rest of the batch. Returns (succeeded, failed).
+    incremental and sectioned choose how sources are explained, as in
+    analyze_contract_from_source.
+    """
+    if not items:
+        return 0, 0
+
+    write_lock = threading.Lock()
+    finished = threading.Event()
+    counts = {"remaining": len(items), "ok": 0, "error": 0}
+
+    # Batch work yields to interactive requests at the shared upstream limiters
+    with request_priority(BATCH), \
+            ThreadPoolExecutor(fetch_workers, thread_name_prefix="fetch") as fetch_pool, \
+            ThreadPoolExecutor(unpack_workers, thread_name_prefix="unpack") as unpack_pool, \
+            ThreadPoolExecutor(llm_workers, thread_name_prefix="llm") as llm_pool:
+        # bind() carries the caller's trace (and priority) into the pool threads;
+        # stages are chained from done callbacks, which run outside any bound context
+        stages = [
+            (fetch_pool, bind(_fetch_stage)),
+            (unpack_pool, bind(_unpack_stage)),
+            (llm_pool, bind(_explain_stage)),
+        ]
+
+        def emit(record, error=None):
+            result = {
+                "input": record["input"],
+                "kind": record["kind"],
+                "status": "error" if error else "ok",
+                "elapsed_seconds": round(time.perf_counter() - record["started"], 3),
+            }
+            if error:
+                result["error"] = str(error)
+            else:
+                result["explanation"] = record["explanation"]
+            if record.get("notes"):
+                result["notes"] = record["notes"]
+
+            with write_lock:
+                # emit runs in done callbacks, where an exception would be swallowed and the
+                # item never counted, leaving run_batch waiting forever
+                try:
+                    output.write(json.dumps(result) + "\n")
+                    output.flush()
+                except Exception as e:
+                    print(f"Could not write the result for {record['input']}: {e}")
+                    error = error or e
+                finally:
+                    counts["error" if error else "ok"] += 1
+                    counts["remaining"] -= 1
+                    if counts["remaining"] == 0:
+                        finished.set()
+
+        def advance(record, stage_index):
+            if stage_index == len(stages):
+                emit(record)
+                return
+            pool, stage = stages[stage_index]
+
+            def on_done(future):
+                error = future.exception()
+                if error is not None:
+                    emit(record, error)
+                else:
+                    advance(record, stage_index + 1)
+
+            pool.submit(stage, record).add_done_callback(on_done)
+
+        # Read the runtime code of every address up front, in a few batched RPC round trips
+        addresses = [item["input"] for item in items if item["kind"] == "address" and is_valid_address(item["input"])]
+        resolutions = dict(zip(addresses, resolve_contracts(addresses)))
+
+        for item in items:
+            advance(dict(item, started=time.perf_counter(), resolution=resolutions.get(item["input"]),
+                         incremental=incremental, sectioned=sectioned), 0)
+
+        finished.wait()
+
+    return counts["ok"], counts["error"]
@@ -0,0 +1,24 @@
+"""
+Shared setup for the benchmark scripts.
+
+Importing this module puts the explainer modules on sys.path, so a script
+run as `python benchmarks/bench_x.py` can import them (and fake_upstreams,
+which sits next to it) directly.
+"""
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULE_DIR = os.path.dirname(BENCH_DIR)
+GENERATOR_DIR = os.path.join(os.path.dirname(MODULE_DIR), "NLP to SmartContracts")
+
+for path in (BENCH_DIR, MODULE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = min(max(int(round(fraction * len(ordered) + 0.5)) - 1, 0), len(ordered) - 1)
+    return ordered[index]
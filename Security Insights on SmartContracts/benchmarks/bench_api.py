@@ -0,0 +1,141 @@
+"""
+Load benchmark for the HTTP API (api_server.py).
+
+Starts the fake upstreams and the API in-process, then fires N concurrent
+requests spread over the four endpoints (fresh addresses, sources, ABIs
+and prompts, every fourth one streamed) and reports throughput, latency
+percentiles, errors and the upstream calls they cost.
+
+    python benchmarks/bench_api.py --requests 400 --concurrency 256
+"""
+import io
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+from _common import percentile
+from fake_upstreams import FakeUpstreams, make_contract_source, ERC20_ABI
+
+ENDPOINTS = ("address", "source", "abi", "generate")
+
+
+def make_request(index, salt):
+    """(endpoint, path, body) for request number index; every fourth request streams."""
+    endpoint = ENDPOINTS[index % len(ENDPOINTS)]
+    stream = index % 8 >= 4
+    if endpoint == "address":
+        body = {"address": "0x" + f"{salt:08x}{index:032x}"[-40:]}
+    elif endpoint == "source":
+        body = {"source": make_contract_source(f"Api{salt}x{index}", 4)}
+    elif endpoint == "abi":
+        abi = ERC20_ABI + [{"type": "function", "name": f"extra{salt}x{index}", "stateMutability": "view",
+                            "inputs": [], "outputs": []}]
+        body = {"abi": abi}
+    else:
+        body = {"prompt": f"An ERC-20 token number {salt}-{index} with capped minting", "mode": "fast"}
+    body["stream"] = stream
+    path = "/v1/generate" if endpoint == "generate" else f"/v1/analyze/{endpoint}"
+    return endpoint, path, body
+
+
+async def send(session, base_url, endpoint, path, body):
+    """Return (endpoint, seconds, ok) for one request, reading the whole (streamed) response."""
+    start = time.perf_counter()
+    try:
+        async with session.post(base_url + path, json=body) as response:
+            text = await response.text()
+            ok = response.status == 200 and bool(text) and '"stage": "error"' not in text \
+                and "\n\nError" not in text
+    except Exception:
+        ok = False
+    return endpoint, time.perf_counter() - start, ok
+
+
+async def run(args, upstreams):
+    import aiohttp
+    from aiohttp import web
+    from api_server import create_app
+
+    app = create_app(max_concurrency=args.concurrency, request_timeout=args.timeout)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    salt = int(time.time())
+    requests = [make_request(index, salt) for index in range(args.requests)]
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout + 30)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            before = dict(upstreams.counters)
+            start = time.perf_counter()
+            results = await asyncio.gather(*(send(session, base_url, *request) for request in requests))
+            wall = time.perf_counter() - start
+            used = {name: upstreams.counters[name] - before[name] for name in before}
+            async with session.get(base_url + "/healthz") as response:
+                health = await response.json()
+    finally:
+        await runner.cleanup()
+    return results, wall, used, health
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the HTTP API")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=256, help="API_MAX_CONCURRENCY for the server")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--openai-latency-ms", type=float, default=400.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        openai_latency_ms=args.openai_latency_ms, tokens_per_second=args.tokens_per_second, completion_tokens=300
+    ).start()
+    state_dir = tempfile.mkdtemp(prefix="api-bench-")
+    os.environ.update({
+        "ETHERSCAN_API_URL": upstreams.etherscan_url,
+        "ETHERSCAN_API_KEY": "bench",
+        "SEPOLIA_RPC_URL": upstreams.rpc_url,
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "GENERATION_CACHE_PATH": os.path.join(state_dir, "generation.sqlite3"),
+        "SOURCE_STORE_PATH": os.path.join(state_dir, "sources"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity.sqlite3"),
+        "BYTECODE_INDEX_PATH": os.path.join(state_dir, "bytecode.sqlite3"),
+        # The generated sources are near-duplicates of each other; analyze each in full
+        "SIMILARITY_REUSE": "off",
+        "ETHERSCAN_RPS": "0",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+
+    try:
+        # The explainer prints progress for every analysis
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, wall, used, health = asyncio.run(run(args, upstreams))
+    finally:
+        upstreams.stop()
+
+    print(f"{args.requests} concurrent requests, server concurrency {args.concurrency}")
+    print(f"wall {wall:.2f}s, {args.requests / wall:.1f} requests/s, in flight after run: {health['in_flight']}")
+    print(f"upstream calls: etherscan {used['etherscan']}, rpc {used['rpc']}, openai {used['openai']}")
+    header = f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for endpoint in ENDPOINTS + ("all",):
+        rows = [result for result in results if endpoint in ("all", result[0])]
+        samples = [seconds for _, seconds, _ in rows]
+        errors = sum(not ok for _, _, ok in rows)
+        print(f"{endpoint:<10}{len(rows):>10}{errors:>8}{percentile(samples, 0.50) * 1000:>10.1f}"
+              f"{percentile(samples, 0.95) * 1000:>10.1f}{percentile(samples, 0.99) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold-start benchmark for smart_contract_explainer.
+
+Each run imports the module in a fresh interpreter and reports how long the
+import itself took, plus the wall time of the whole process. Heavy clients
+(web3, requests, OpenAI) must not be imported on this path.
+
+    python benchmarks/bench_import.py --runs 20 --budget-ms 100
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+
+
+from _common import MODULE_DIR, percentile
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import smart_contract_explainer
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in ("web3", "openai", "requests") if name in sys.modules)
+print(json.dumps({"import_ms": elapsed * 1000, "heavy_modules": heavy}))
+"""
+
+
+def run_once():
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=MODULE_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    wall_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = wall_ms
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure smart_contract_explainer import time")
+    parser.add_argument("--runs", type=int, default=15, help="Number of fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Fail if the median import exceeds this")
+    args = parser.parse_args()
+
+    # The first run warms the bytecode cache and the OS file cache
+    run_once()
+    results = [run_once() for _ in range(args.runs)]
+    imports = [result["import_ms"] for result in results]
+    processes = [result["process_ms"] for result in results]
+
+    print(f"import:  p50 {statistics.median(imports):.1f} ms  p95 {percentile(imports, 0.95):.1f} ms  min {min(imports):.1f} ms")
+    print(f"process: p50 {statistics.median(processes):.1f} ms  p95 {percentile(processes, 0.95):.1f} ms")
+
+    heavy = results[-1]["heavy_modules"]
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        sys.exit(1)
+    if statistics.median(imports) > args.budget_ms:
+        print(f"FAIL: median import time exceeds {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
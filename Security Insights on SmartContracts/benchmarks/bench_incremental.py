@@ -0,0 +1,75 @@
+"""
+Edit-and-explain loop benchmark for function-level incremental analysis.
+
+Analyzes a generated contract, then a series of versions that each edit one
+function body, once with whole-source analysis and once function by
+function. Reports wall time, OpenAI requests and tokens per step against
+the fake OpenAI server.
+
+    python benchmarks/bench_incremental.py --functions 24 --edits 3
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from fake_upstreams import FakeUpstreams, make_contract_source
+
+
+def edited(source, step):
+    """Version step of source: the body of transfer{step} gains an extra check."""
+    marker = f"function transfer{step}(address to, uint256 amount) external onlyOwner returns (bool) {{\n"
+    return source.replace(marker, marker + f"        require(amount <= {step + 1} ether, \"cap\");\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental re-analysis of edited sources")
+    parser.add_argument("--functions", type=int, default=24)
+    parser.add_argument("--edits", type=int, default=3)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=1200)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        openai_latency_ms=300, tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens
+    ).start()
+    state_dir = tempfile.mkdtemp(prefix="incremental-bench-")
+    os.environ.update({
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity.sqlite3"),
+        # Compare plain whole-source runs, not near-duplicate reuse
+        "SIMILARITY_REUSE": "off",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+    import smart_contract_explainer as explainer
+
+    versions = [make_contract_source("Vault", args.functions)]
+    for step in range(args.edits):
+        versions.append(edited(versions[-1], step))
+
+    print(f"{args.functions}-function contract, {args.edits} single-function edits")
+    print(f"{'mode':<14}{'version':<10}{'seconds':>9}{'requests':>10}{'prompt tok':>12}{'output tok':>12}")
+    try:
+        for label, incremental in (("whole source", False), ("by function", True)):
+            for number, source in enumerate(versions):
+                before = dict(upstreams.counters)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    explainer.analyze_contract_from_source(source, incremental=incremental)
+                seconds = time.perf_counter() - start
+                used = {name: upstreams.counters[name] - before[name] for name in before}
+                print(f"{label:<14}{'original' if number == 0 else f'edit {number}':<10}{seconds:>9.2f}"
+                      f"{used['openai']:>10}{used['openai_prompt_tokens']:>12}{used['openai_completion_tokens']:>12}")
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
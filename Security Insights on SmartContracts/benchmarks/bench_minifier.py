@@ -0,0 +1,132 @@
+"""
+Throughput and token-savings benchmark for source_minifier.
+
+Minifies a large flattened contract at every level and reports the time
+taken and the estimated prompt tokens saved. By default the input is a
+generated, documentation-heavy multi-file source; pass real .sol files or
+Etherscan Standard JSON with --source to measure those instead.
+
+    python benchmarks/bench_minifier.py --files 60
+    python benchmarks/bench_minifier.py --source flattened.sol --runs 10
+
+Every level is also checked to leave the code tokens (pragmas aside) intact.
+"""
+import sys
+import argparse
+import statistics
+import time
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from solidity_lexer import code_tokens
+from source_chunker import estimate_tokens
+from source_minifier import minify_source, MINIFY_LEVELS
+
+
+def make_documented_source(index, functions):
+    """Contract with the license header, NatSpec and commented-out code typical of verified sources."""
+    members = "\n\n".join(
+        f"""    /**
+     * @notice Transfers `amount` tokens to `to`, variant {number}.
+     * @dev Reverts when the caller's balance is too low. Emits a {{Transfer}} event.
+     * @param to Recipient address.
+     * @param amount Number of tokens, in the smallest unit.
+     * @return success True when the transfer went through.
+     */
+    function transfer{number}(address to, uint256 amount) external returns (bool success) {{
+        // require(!paused, "paused");
+        require(balances[msg.sender] >= amount, "ERC20: transfer amount exceeds balance // not a comment");
+        unchecked {{
+            balances[msg.sender] -= amount;   // cannot underflow, checked above
+        }}
+        balances[to] += amount;
+        emit Transfer(msg.sender, to, amount);
+        return true;
+    }}"""
+        for number in range(functions)
+    )
+    return f"""// SPDX-License-Identifier: MIT
+// OpenZeppelin-style token, file {index}
+//
+// Permission is hereby granted, free of charge, to any person obtaining a copy
+// of this software, to deal in the software without restriction.
+
+pragma solidity ^0.8.20;
+pragma abicoder v2;
+
+/// @title Token{index}
+/// @author Example Labs
+contract Token{index} {{
+    mapping(address => uint256) private balances;
+
+    /* Legacy storage, kept for reference:
+    mapping(address => mapping(address => uint256)) private allowances;
+    */
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+{members}
+}}
+"""
+
+
+def load_sources(paths):
+    from smart_contract_explainer import parse_source_files, flatten_source_files
+
+    sources = []
+    for path in paths:
+        with open(path, "r") as file:
+            sources.append(flatten_source_files(parse_source_files(file.read())))
+    return "\n\n".join(sources)
+
+
+def without_pragmas(tokens):
+    texts, skipping = [], False
+    for _, text, _ in tokens:
+        if text == "pragma":
+            skipping = True
+        if not skipping:
+            texts.append(text)
+        elif text == ";":
+            skipping = False
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Solidity prompt minification")
+    parser.add_argument("--source", nargs="*", help="Solidity or Standard JSON files to minify (default: generated)")
+    parser.add_argument("--files", type=int, default=40, help="Generated files in the flattened source")
+    parser.add_argument("--functions", type=int, default=30, help="Functions per generated file")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per level")
+    args = parser.parse_args()
+
+    if args.source:
+        source = load_sources(args.source)
+    else:
+        source = "\n\n".join(make_documented_source(index, args.functions) for index in range(args.files))
+
+    original_tokens = estimate_tokens(source)
+    expected = without_pragmas(code_tokens(source))
+    print(f"input: {len(source) / 1e6:.2f} MB, ~{original_tokens} tokens")
+    print(f"{'level':<7}{'p50 ms':>10}{'MB/s':>8}{'tokens':>10}{'saved':>8}  code intact")
+
+    failed = False
+    for level in MINIFY_LEVELS[1:]:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            minified = minify_source(source, level)
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        tokens = estimate_tokens(minified)
+        intact = without_pragmas(code_tokens(minified)) == expected
+        failed |= not intact
+        print(f"{level:<7}{median * 1000:>10.1f}{len(source) / 1e6 / median:>8.1f}{tokens:>10}"
+              f"{(original_tokens - tokens) / original_tokens:>8.0%}  {'yes' if intact else 'NO'}")
+
+    if failed:
+        print("FAIL: minification changed the code tokens")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
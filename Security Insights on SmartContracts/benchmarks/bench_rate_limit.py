@@ -0,0 +1,103 @@
+"""
+Throughput benchmark for the shared upstream rate limiter.
+
+Starts a fake Etherscan capped at a few calls per second and fetches
+contracts from many threads at once: without throttling or retries, with
+retries alone, and through the token-bucket limiter with retries. While the
+limited run is busy, a second thread issues interactive requests, which
+should overtake the queued batch work.
+
+    python benchmarks/bench_rate_limit.py --calls 60 --cap 5 --threads 16
+"""
+import time
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from fake_upstreams import FakeUpstreams
+from instrumentation import bind
+from rate_limiter import (
+    RateLimiter, RateLimitedError, call_with_retries, request_priority, BATCH, INTERACTIVE
+)
+
+
+def make_fetch(session, url):
+    def fetch(number):
+        params = {"module": "contract", "action": "getsourcecode", "address": f"0x{number:040x}"}
+        data = session.get(url, params=params, timeout=30).json()
+        if data["status"] != "1":
+            raise RateLimitedError(data["result"])
+        return data
+    return fetch
+
+
+def run(fetch, limiter, calls, threads, attempts):
+    def one(number):
+        try:
+            call_with_retries(limiter, lambda: fetch(number), attempts=attempts)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        # bind() carries the caller's priority into the pool threads
+        succeeded = sum(pool.map(bind(one), range(calls)))
+    return succeeded, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the upstream rate limiter")
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--cap", type=float, default=5.0, help="Upstream calls per second")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--interactive", type=int, default=5, help="Interactive calls during the limited run")
+    args = parser.parse_args()
+
+    import requests
+
+    server = FakeUpstreams(etherscan_latency_ms=50, etherscan_rps=args.cap).start()
+    session = requests.Session()
+    fetch = make_fetch(session, server.etherscan_url)
+
+    scenarios = (
+        ("no limiter, no retry", RateLimiter("etherscan"), 1),
+        ("retries only", RateLimiter("etherscan"), 8),
+        ("limiter + retries", RateLimiter("etherscan", requests_per_second=args.cap), 8),
+    )
+    print(f"{args.calls} fetches from {args.threads} threads against a {args.cap:g} calls/s cap")
+    print(f"{'scenario':<24}{'ok':>6}{'seconds':>9}{'ok/s':>7}{'throttled':>11}")
+    try:
+        for label, limiter, attempts in scenarios:
+            # Let the upstream's one-second window drain between scenarios
+            time.sleep(1.1)
+            before = server.counters["throttled"]
+            interactive = []
+            if limiter.buckets:
+                def probe():
+                    time.sleep(1.0)
+                    with request_priority(INTERACTIVE):
+                        for number in range(args.interactive):
+                            start = time.perf_counter()
+                            call_with_retries(limiter, lambda: fetch(10 ** 6 + number))
+                            interactive.append(time.perf_counter() - start)
+                            time.sleep(0.5)
+                prober = threading.Thread(target=probe)
+                prober.start()
+            with request_priority(BATCH):
+                succeeded, seconds = run(fetch, limiter, args.calls, args.threads, attempts)
+            if interactive:
+                prober.join()
+            throttled = server.counters["throttled"] - before
+            print(f"{label:<24}{succeeded:>6}{seconds:>9.1f}{succeeded / seconds:>7.1f}{throttled:>11}")
+            if interactive:
+                print(f"  interactive call latency during the batch: p50 {statistics.median(interactive) * 1000:.0f} ms, "
+                      f"max {max(interactive) * 1000:.0f} ms")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
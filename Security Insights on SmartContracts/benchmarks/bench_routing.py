@@ -0,0 +1,114 @@
+"""
+Benchmark for token-count-aware model routing and preflight budgeting.
+
+Sends a small, a large and an oversized contract request through the
+generator's single-pass path, and an oversized prompt through the explainer,
+once with every request on the fixed model and once routed. The fake OpenAI
+server enforces each model's context window, so requests that do not fit
+fail the way the real API fails them: after a round trip.
+
+    python benchmarks/bench_routing.py
+"""
+import io
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+from _common import GENERATOR_DIR
+from fake_upstreams import FakeUpstreams
+
+
+class FixedRouter:
+    """Stand-in for ModelRouter that sends everything to one model with the requested max_tokens."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def route(self, messages, max_tokens):
+        from model_router import Route
+
+        print(f"Routing fixed prompt to {self.model}, max_tokens {max_tokens}")
+        return Route(self.model, 0, max_tokens)
+
+    def fits(self, messages, max_tokens):
+        return True
+
+
+def specification(characters):
+    """A contract request padded with requirements to about this many characters."""
+    lines = ["An ERC-20 token with capped minting and the following requirements:"]
+    number = 0
+    while sum(len(line) + 1 for line in lines) < characters:
+        number += 1
+        lines.append(f"{number}. Holders in tier {number} may transfer at most {number * 100} tokens per day.")
+    return "\n".join(lines)
+
+
+def run(label, fn, upstreams):
+    before = dict(upstreams.counters)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        try:
+            ok = fn()
+        except Exception:
+            ok = False
+    seconds = time.perf_counter() - start
+    routed = re.findall(r"^Routing .* to (\S+), max_tokens (\d+)", output.getvalue(), re.MULTILINE)
+    model = ", ".join(f"{name} ({tokens})" for name, tokens in routed) or "-"
+    requests = upstreams.counters["openai"] - before["openai"]
+    print(f"{label:<50}{model:<26}{'ok' if ok else 'failed':>8}{seconds:>9.2f}{requests:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model routing and preflight budgeting")
+    parser.add_argument("--openai-latency-ms", type=float, default=400.0)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(openai_latency_ms=args.openai_latency_ms, tokens_per_second=400,
+                              completion_tokens=200).start()
+    state_dir = tempfile.mkdtemp(prefix="routing-bench-")
+    os.environ.update({
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_DISABLED": "1",
+        "GENERATION_CACHE_PATH": os.path.join(state_dir, "generation.sqlite3"),
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+    sys.path.insert(0, GENERATOR_DIR)
+    import smart_contract_explainer as explainer
+    import contract_generator as generator
+
+    requests = [
+        ("small request", "An ERC-20 token with capped minting"),
+        ("large request (~7.5k tokens)", specification(30000)),
+        ("oversized request (~150k tokens)", specification(600000)),
+    ]
+    oversized_prompt = specification(600000)
+    routers = (generator.generation_router, explainer.explainer_router)
+
+    print(f"{'scenario':<50}{'model (max_tokens)':<26}{'outcome':>8}{'seconds':>9}{'requests':>10}")
+    try:
+        for mode in ("fixed", "routed"):
+            if mode == "fixed":
+                generator.generation_router = FixedRouter(generator.GENERATION_MODEL)
+                explainer.explainer_router = FixedRouter(explainer.OPENAI_MODEL)
+            else:
+                generator.generation_router, explainer.explainer_router = routers
+            for label, prompt in requests:
+                run(f"{mode}: generate {label}",
+                    lambda: all(generator.generate_contract_single_pass(prompt, "bench")), upstreams)
+            run(f"{mode}: explain oversized prompt",
+                lambda: not explainer.generate_explanation_with_openai(oversized_prompt).startswith("Error"),
+                upstreams)
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Round-trip benchmark for batched JSON-RPC chain reads.
+
+Starts the fake JSON-RPC server with a configurable latency, deploys a fleet
+of EIP-1167 clones, EIP-1967 proxies and plain contracts into it, and resolves
+every address twice: one address at a time, then with one resolve_contracts()
+call that batches the reads.
+
+    python benchmarks/bench_rpc_batch.py --addresses 300 --rpc-latency-ms 150
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from fake_upstreams import FakeUpstreams
+
+EIP1967_IMPLEMENTATION_SLOT = 0x360894A13BA1A3210667C828492DB98DCA3E2076CC3735A920A3CA505D382BBC
+
+
+def deploy_fleet(upstreams, count):
+    """Register runtime code for count addresses: a third clones, a third proxies, a third plain."""
+    implementation = "0x" + "11" * 20
+    upstreams.code[implementation] = "0x6080604052348015600f57600080fd5b50"
+    addresses = []
+    for index in range(count):
+        address = f"0x{index + 1:040x}"
+        if index % 3 == 0:
+            upstreams.code[address] = "0x363d3d373d3d3d363d73" + implementation[2:] + "5af43d82803e903d91602b57fd5bf3"
+        elif index % 3 == 1:
+            upstreams.code[address] = "0x60806040523661001357f4"
+            upstreams.storage[(address, EIP1967_IMPLEMENTATION_SLOT)] = "0x" + "00" * 12 + implementation[2:]
+        else:
+            upstreams.code[address] = f"0x6080604052{index:08x}"
+        addresses.append(address)
+    return addresses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched JSON-RPC proxy resolution")
+    parser.add_argument("--addresses", type=int, default=300)
+    parser.add_argument("--rpc-latency-ms", type=float, default=150.0)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(rpc_latency_ms=args.rpc_latency_ms, latency_jitter=0).start()
+    state_dir = tempfile.mkdtemp(prefix="rpc-bench-")
+    os.environ.update({
+        "SEPOLIA_RPC_URL": upstreams.rpc_url,
+        "RPC_BATCH_SIZE": str(args.batch_size),
+        "RPC_CONCURRENCY": str(args.concurrency),
+        "BYTECODE_INDEX_PATH": os.path.join(state_dir, "bytecode.sqlite3"),
+    })
+    import smart_contract_explainer as explainer
+
+    addresses = deploy_fleet(upstreams, args.addresses)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = []
+            for label, resolve in (
+                ("one at a time", lambda: [explainer.resolve_contract(address) for address in addresses]),
+                ("batched", lambda: explainer.resolve_contracts(addresses)),
+            ):
+                before = dict(upstreams.counters)
+                start = time.perf_counter()
+                resolved = resolve()
+                elapsed = time.perf_counter() - start
+                rows.append((label, elapsed, upstreams.counters["rpc"] - before["rpc"],
+                             upstreams.counters["rpc_calls"] - before["rpc_calls"], resolved))
+    finally:
+        upstreams.stop()
+
+    print(f"{args.addresses} addresses, {args.rpc_latency_ms:.0f} ms RPC latency")
+    print(f"{'mode':<16}{'seconds':>9}{'requests':>10}{'calls':>8}")
+    for label, elapsed, requests, calls, _ in rows:
+        print(f"{label:<16}{elapsed:>9.2f}{requests:>10}{calls:>8}")
+    if rows[0][4] != rows[1][4]:
+        print("FAIL: batched and sequential resolution disagree")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
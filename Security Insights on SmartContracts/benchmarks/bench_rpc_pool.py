@@ -0,0 +1,70 @@
+"""
+Tail-latency benchmark for the multi-endpoint RPC provider pool.
+
+Starts three fake JSON-RPC servers: a fast one and a slower one, both with
+occasional one-second stalls, and one that fails every request. Sequential
+calls are then timed through a single endpoint, through the pool without
+hedging and through the pool with hedging.
+
+    python benchmarks/bench_rpc_pool.py --calls 300 --slow-ratio 0.05
+"""
+import time
+import argparse
+import statistics
+
+from _common import percentile
+from fake_upstreams import FakeUpstreams
+from rpc_client import BatchRPCClient, RPCProviderPool
+
+
+def run(client, calls):
+    timings, errors = [], 0
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            client.call("eth_blockNumber", [])
+        except Exception:
+            errors += 1
+        timings.append(time.perf_counter() - start)
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RPC failover and hedging")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="Fraction of requests that stall")
+    parser.add_argument("--slow-latency-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    import requests
+
+    tail = {"slow_ratio": args.slow_ratio, "slow_latency_ms": args.slow_latency_ms, "latency_jitter": 0.1}
+    fast = FakeUpstreams(rpc_latency_ms=40, **tail).start()
+    slower = FakeUpstreams(rpc_latency_ms=70, **tail).start()
+    broken = FakeUpstreams(rpc_latency_ms=5, error_rate=1.0, retry_after=0).start()
+    servers = {"fast": fast, "slower": slower, "broken": broken}
+    session = requests.Session()
+
+    scenarios = (
+        ("single endpoint", [fast.rpc_url], "0"),
+        ("pool, no hedging", [broken.rpc_url, fast.rpc_url, slower.rpc_url], "0"),
+        ("pool, hedged", [broken.rpc_url, fast.rpc_url, slower.rpc_url], None),
+    )
+    print(f"{args.calls} sequential calls, {args.slow_ratio:.0%} of requests stall {args.slow_latency_ms:.0f} ms")
+    print(f"{'scenario':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}  requests per server")
+    try:
+        for label, urls, hedge in scenarios:
+            before = {name: server.counters["rpc"] for name, server in servers.items()}
+            pool = RPCProviderPool(urls, session, hedge_after_ms=hedge, health_check_interval=0)
+            timings, errors = run(BatchRPCClient(pool), args.calls)
+            used = {name: server.counters["rpc"] - before[name] for name, server in servers.items()}
+            print(f"{label:<20}{statistics.median(timings) * 1000:>9.1f}{percentile(timings, 0.95) * 1000:>9.1f}"
+                  f"{percentile(timings, 0.99) * 1000:>9.1f}{max(timings) * 1000:>9.1f}{errors:>8}  "
+                  + ", ".join(f"{name} {count}" for name, count in used.items() if count))
+    finally:
+        for server in servers.values():
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
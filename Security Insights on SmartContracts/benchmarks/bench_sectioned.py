@@ -0,0 +1,81 @@
+"""
+Benchmark for sectioned analysis: the seven sections as concurrent requests.
+
+Explains a generated contract once in a single call and once section by
+section with the same total output (the single answer is as long as the
+seven sections together), then re-runs the sectioned analysis after one
+section failed to show that only that section is sent again.
+
+    python benchmarks/bench_sectioned.py --functions 16
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from fake_upstreams import FakeUpstreams, make_contract_source
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sectioned analysis against a single call")
+    parser.add_argument("--functions", type=int, default=16)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--section-tokens", type=int, default=300, help="Output tokens per section")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(openai_latency_ms=300, tokens_per_second=args.tokens_per_second).start()
+    state_dir = tempfile.mkdtemp(prefix="sectioned-bench-")
+    os.environ.update({
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity.sqlite3"),
+        # The sectioned runs must not reuse the single-call analysis of the same source
+        "SIMILARITY_REUSE": "off",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+    import smart_contract_explainer as explainer
+
+    generate = explainer.generate_explanation_with_openai
+    failing_item = explainer.ANALYSIS_SECTIONS[-2][1]
+
+    def fail_one_section(prompt, *args, **kwargs):
+        if failing_item in prompt:
+            return "Error generating explanation: The request timed out"
+        return generate(prompt, *args, **kwargs)
+
+    sections = len(explainer.ANALYSIS_SECTIONS)
+    source = make_contract_source("Vault", args.functions)
+    runs = [
+        ("single call", False, sections * args.section_tokens, generate),
+        ("sectioned, one section fails", True, args.section_tokens, fail_one_section),
+        ("sectioned, re-run", True, args.section_tokens, generate),
+        ("sectioned, repeat", True, args.section_tokens, generate),
+    ]
+
+    print(f"{args.functions}-function contract, {sections} sections of {args.section_tokens} output tokens")
+    print(f"{'run':<32}{'seconds':>9}{'requests':>10}{'prompt tok':>12}{'output tok':>12}{'complete':>10}")
+    try:
+        for label, sectioned, completion_tokens, completion in runs:
+            upstreams.config["completion_tokens"] = completion_tokens
+            explainer.generate_explanation_with_openai = completion
+            before = dict(upstreams.counters)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                explanation = explainer.analyze_contract_from_source(source, incremental=False, sectioned=sectioned)
+            seconds = time.perf_counter() - start
+            used = {name: upstreams.counters[name] - before[name] for name in before}
+            complete = "Error generating explanation" not in explanation
+            print(f"{label:<32}{seconds:>9.2f}{used['openai']:>10}{used['openai_prompt_tokens']:>12}"
+                  f"{used['openai_completion_tokens']:>12}{'yes' if complete else 'no':>10}")
+    finally:
+        explainer.generate_explanation_with_openai = generate
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Lookup latency and recall benchmark for similarity_index.
+
+Indexes a corpus of generated contracts into a temporary SQLite file, then
+queries lightly edited copies of indexed contracts (which should be found)
+and unrelated contracts (which should not).
+
+    python benchmarks/bench_similarity.py --contracts 20000
+
+Signature time (lexing and hashing the query) is reported separately from
+the index lookup itself.
+"""
+import os
+import random
+import argparse
+import statistics
+import tempfile
+import time
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from similarity_index import SimilarityIndex, signature
+
+STATEMENTS = (
+    "require({a} != address(0), \"{s}\");",
+    "{m}[{a}] += {v};",
+    "{m}[{a}] -= {v};",
+    "emit {e}({a}, {v});",
+    "if ({v} > {n}) {{ {v} = {n}; }}",
+    "{v} = {v} * {n} / 10000;",
+    "(bool ok, ) = payable({a}).call{{value: {v}}}(\"\"); require(ok);",
+    "for (uint256 i = 0; i < {n}; i++) {{ {m}[{a}] += i; }}",
+    "return {v};",
+)
+
+
+def make_random_contract(rng, index):
+    word = lambda: rng.choice("abcdefghijklmnopqrstuvwxyz") + "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=rng.randint(3, 9)))
+    mappings = [word() for _ in range(3)]
+    events = [word().capitalize() for _ in range(2)]
+    functions = []
+    for _ in range(rng.randint(6, 20)):
+        body = "\n".join(
+            "        " + rng.choice(STATEMENTS).format(
+                a=word(), v=word(), m=rng.choice(mappings), e=rng.choice(events),
+                n=rng.randint(1, 10 ** 6), s=word()
+            )
+            for _ in range(rng.randint(3, 8))
+        )
+        functions.append(f"    function {word()}(address {word()}, uint256 {word()}) external {{\n{body}\n    }}")
+    state = "\n".join(f"    mapping(address => uint256) public {name};" for name in mappings)
+    declared = "\n".join(f"    event {name}(address indexed who, uint256 amount);" for name in events)
+    return f"pragma solidity ^0.8.{index % 25};\ncontract C{index} {{\n{state}\n{declared}\n" + "\n\n".join(functions) + "\n}\n"
+
+
+def edit(rng, source, lines):
+    """Change a few lines the way a fork would: renamed contract, flipped arithmetic, tweaked constants."""
+    parts = source.split("\n")
+    parts[1] = parts[1].replace("contract C", "contract Fork")
+    for _ in range(lines):
+        position = rng.randrange(2, len(parts))
+        parts[position] = parts[position].replace("+=", "-=").replace("10000", "1000")
+    return "\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the near-duplicate similarity index")
+    parser.add_argument("--contracts", type=int, default=20000, help="Contracts in the index")
+    parser.add_argument("--queries", type=int, default=400, help="Queries (half near-duplicates, half new)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_random_contract(rng, index) for index in range(args.contracts)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarityIndex(os.path.join(directory, "index.sqlite3"), max_entries=args.contracts)
+        start = time.perf_counter()
+        for number, source in enumerate(corpus):
+            index.add(source, f"key-{number}")
+        build_seconds = time.perf_counter() - start
+        print(f"indexed {len(index)} contracts in {build_seconds:.1f}s "
+              f"({build_seconds / args.contracts * 1000:.2f} ms each, signature included)")
+
+        queries = []
+        for number in range(args.queries // 2):
+            target = rng.randrange(args.contracts)
+            queries.append((edit(rng, corpus[target], 3), f"key-{target}"))
+            queries.append((make_random_contract(rng, args.contracts + number), None))
+
+        signature_timings, timings, found, false_hits = [], [], 0, 0
+        for source, expected in queries:
+            start = time.perf_counter()
+            signature(source)
+            signature_timings.append(time.perf_counter() - start)
+            # The signature is memoized, so this times the lookup alone
+            start = time.perf_counter()
+            matches = index.query(source)
+            timings.append(time.perf_counter() - start)
+            keys = [match["explanation_key"] for match in matches]
+            if expected:
+                found += expected in keys[:1]
+            else:
+                false_hits += bool(keys)
+
+    timings.sort()
+    print(f"signature: p50 {statistics.median(signature_timings) * 1000:.2f} ms per query contract")
+    print(f"lookup: p50 {statistics.median(timings) * 1000:.2f} ms, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms")
+    print(f"recall {found / (len(queries) // 2):.0%}, false matches {false_hits}/{len(queries) // 2}")
+
+
+if __name__ == "__main__":
+    main()
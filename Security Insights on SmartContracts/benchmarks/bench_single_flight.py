@@ -0,0 +1,99 @@
+"""
+Burst benchmark for single-flight coalescing of identical analyses.
+
+Fires N concurrent analyze_contract_from_address calls for one address (the
+"popular contract" case), streamed and blocking, and counts the upstream
+calls they cost, with and without the single-flight layer.
+
+    python benchmarks/bench_single_flight.py --requests 50
+"""
+import io
+import os
+import time
+import argparse
+import tempfile
+import threading
+import contextlib
+
+import _common  # noqa: F401 (puts the explainer modules on sys.path)
+from fake_upstreams import FakeUpstreams
+
+
+class NoFlight:
+    """Stand-in for SingleFlight that runs every call."""
+
+    def do(self, key, fn):
+        return fn()
+
+    def stream(self, key, fn):
+        return fn()
+
+
+def burst(explainer, address, requests, stream):
+    results = [None] * requests
+    barrier = threading.Barrier(requests)
+
+    def one(index):
+        barrier.wait()
+        result = explainer.analyze_contract_from_address(address, stream=stream)
+        results[index] = result if isinstance(result, str) else "".join(result)
+
+    threads = [threading.Thread(target=one, args=(index,)) for index in range(requests)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-flight coalescing")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(openai_latency_ms=300, tokens_per_second=200, completion_tokens=300).start()
+    state_dir = tempfile.mkdtemp(prefix="single-flight-bench-")
+    os.environ.update({
+        "ETHERSCAN_API_URL": upstreams.etherscan_url,
+        "ETHERSCAN_API_KEY": "bench",
+        "SEPOLIA_RPC_URL": upstreams.rpc_url,
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "SOURCE_STORE_PATH": os.path.join(state_dir, "sources"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity.sqlite3"),
+        "BYTECODE_INDEX_PATH": os.path.join(state_dir, "bytecode.sqlite3"),
+        # The generated sources are near-duplicates of each other; analyze each in full
+        "SIMILARITY_REUSE": "off",
+        "ETHERSCAN_RPS": "0",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+    import smart_contract_explainer as explainer
+
+    flights = {name: getattr(explainer, name) for name in ("_etherscan_flights", "_rpc_flights", "_openai_flights")}
+    print(f"{args.requests} concurrent requests for one address")
+    print(f"{'scenario':<28}{'seconds':>9}{'etherscan':>11}{'rpc':>6}{'openai':>8}{'identical':>11}")
+    try:
+        number = 0
+        for coalesce in (False, True):
+            for stream in (False, True):
+                for name, flight in flights.items():
+                    setattr(explainer, name, flight if coalesce else NoFlight())
+                number += 1
+                # A fresh address per scenario, so nothing is cached yet
+                address = f"0x{number:040x}"
+                before = dict(upstreams.counters)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    seconds, results = burst(explainer, address, args.requests, stream)
+                used = {name: upstreams.counters[name] - before[name] for name in before}
+                label = f"{'single-flight' if coalesce else 'independent'}, {'streamed' if stream else 'blocking'}"
+                print(f"{label:<28}{seconds:>9.2f}{used['etherscan']:>11}{used['rpc']:>6}{used['openai']:>8}"
+                      f"{len(set(results)) == 1!s:>11}")
+    finally:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
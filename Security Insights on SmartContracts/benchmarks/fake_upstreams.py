@@ -0,0 +1,415 @@
+"""
+Local stand-ins for the upstream services the explainer talks to.
+
+One threaded HTTP server exposes:
+
+    GET  /etherscan/api                 getabi / getsourcecode
+    POST /rpc                           Sepolia JSON-RPC (single and batch requests)
+    POST /openai/v1/chat/completions    OpenAI chat completions (blocking and streaming)
+
+Latency, token throughput, rate caps and error injection are configurable, so the real
+client code can be benchmarked on an offline box:
+
+    python benchmarks/fake_upstreams.py --port 8765 --openai-latency-ms 150 --tokens-per-second 80
+"""
+import json
+import time
+import hashlib
+import random
+import socket
+import argparse
+import threading
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_CONFIG = {
+    "etherscan_latency_ms": 120.0,
+    "rpc_latency_ms": 80.0,
+    "openai_latency_ms": 400.0,   # time to first token
+    "latency_jitter": 0.2,        # +/- fraction applied to every latency
+    "slow_ratio": 0.0,            # fraction of latencies that also get slow_latency_ms (tail)
+    "slow_latency_ms": 1000.0,
+    "tokens_per_second": 60.0,    # completion token rate
+    "completion_tokens": 400,     # tokens per completion (capped by max_tokens)
+    "error_rate": 0.0,            # fraction of requests answered with an error
+    "retry_after": 1,             # Retry-After seconds sent with injected 429s
+    "etherscan_rps": 0.0,         # Etherscan calls per second before "Max rate limit reached" (0: no cap)
+    "openai_rps": 0.0,            # OpenAI requests per second before 429s (0: no cap)
+    "unverified_ratio": 0.0,      # fraction of addresses without verified source
+    "source_files": 1,            # files per verified Standard JSON source
+    "functions_per_file": 8,
+}
+
+# Context windows enforced like the real API (400 context_length_exceeded); others get 128k
+CONTEXT_WINDOWS = {"gpt-4": 8192, "gpt-3.5-turbo": 16385}
+DEFAULT_CONTEXT_WINDOW = 128000
+
+ERC20_ABI = [
+    {"type": "function", "name": "transfer", "stateMutability": "nonpayable",
+     "inputs": [{"name": "to", "type": "address", "internalType": "address"},
+                {"name": "amount", "type": "uint256", "internalType": "uint256"}],
+     "outputs": [{"name": "", "type": "bool", "internalType": "bool"}]},
+    {"type": "function", "name": "balanceOf", "stateMutability": "view",
+     "inputs": [{"name": "account", "type": "address", "internalType": "address"}],
+     "outputs": [{"name": "", "type": "uint256", "internalType": "uint256"}]},
+    {"type": "event", "name": "Transfer", "anonymous": False,
+     "inputs": [{"name": "from", "type": "address", "indexed": True, "internalType": "address"},
+                {"name": "to", "type": "address", "indexed": True, "internalType": "address"},
+                {"name": "value", "type": "uint256", "indexed": False, "internalType": "uint256"}]},
+]
+
+def make_contract_source(name, functions=8):
+    """Deterministic, ERC-20-flavoured Solidity contract used as fake verified source."""
+    body = "\n\n".join(
+        f"""    /// @notice Moves tokens, variant {index}
+    function transfer{index}(address to, uint256 amount) external onlyOwner returns (bool) {{
+        require(to != address(0), "zero address");
+        balances[msg.sender] -= amount;
+        balances[to] += amount;
+        emit Transfer(msg.sender, to, amount);
+        return true;
+    }}"""
+        for index in range(functions)
+    )
+    return f"""// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import "@openzeppelin/contracts/access/Ownable.sol";
+
+/// @title {name}
+contract {name} is Ownable {{
+    mapping(address => uint256) public balances;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+
+    constructor() Ownable(msg.sender) {{}}
+
+{body}
+}}
+"""
+
+
+def make_standard_json(name, files=1, functions=8):
+    """Wrap generated sources in Etherscan's double-brace Standard JSON format."""
+    sources = {
+        f"contracts/{name}{index}.sol": {"content": make_contract_source(f"{name}{index}", functions)}
+        for index in range(files)
+    }
+    return "{" + json.dumps({"language": "Solidity", "sources": sources}) + "}"
+
+
+class FakeUpstreams:
+    """Threaded fake Etherscan / JSON-RPC / OpenAI server."""
+
+    def __init__(self, host="127.0.0.1", port=0, **config):
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.counters = {
+            "etherscan": 0, "rpc": 0, "rpc_calls": 0, "openai": 0, "errors": 0, "throttled": 0, "context_exceeded": 0,
+            "openai_prompt_tokens": 0, "openai_completion_tokens": 0,
+        }
+        self._random = random.Random(1234)
+        self._lock = threading.Lock()
+        self._arrivals = {"etherscan": deque(), "openai": deque()}
+        # Runtime code served by eth_getCode, keyed by lowercase address
+        self.code = {}
+        self.storage = {}
+
+        handler = type("Handler", (_Handler,), {"upstreams": self})
+        self.server = _Server((host, port), handler)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def etherscan_url(self):
+        return f"{self.base_url}/etherscan/api"
+
+    @property
+    def rpc_url(self):
+        return f"{self.base_url}/rpc"
+
+    @property
+    def openai_base_url(self):
+        return f"{self.base_url}/openai/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def sleep(self, latency_ms):
+        jitter = self.config["latency_jitter"]
+        with self._lock:
+            factor = 1 + self._random.uniform(-jitter, jitter)
+            slow = self.config["slow_ratio"] and self._random.random() < self.config["slow_ratio"]
+        tail = self.config["slow_latency_ms"] if slow else 0
+        time.sleep(max(latency_ms * factor + tail, 0) / 1000)
+
+    def over_limit(self, name, per_second):
+        """Count a call against name's one-second window; True if it exceeds per_second."""
+        if not per_second:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            arrivals = self._arrivals[name]
+            while arrivals and arrivals[0] <= now - 1:
+                arrivals.popleft()
+            # Rejected calls count too, as they do upstream
+            arrivals.append(now)
+            if len(arrivals) <= per_second:
+                return False
+            self.counters["throttled"] += 1
+        return True
+
+    def roll(self, probability):
+        with self._lock:
+            return self._random.random() < probability
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when hundreds of clients connect at once
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    upstreams = None
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without this, Nagle's
+        # algorithm and delayed ACKs add ~40 ms to every response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self):
+        """Inject an error response; returns True if one was sent."""
+        upstreams = self.upstreams
+        if not upstreams.roll(upstreams.config["error_rate"]):
+            return False
+        upstreams.count("errors")
+        if upstreams.roll(0.5):
+            self._send_json({"error": {"message": "Rate limit reached"}}, status=429,
+                            headers={"Retry-After": str(upstreams.config["retry_after"])})
+        else:
+            self._send_json({"error": {"message": "Upstream unavailable"}}, status=503)
+        return True
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/etherscan/api":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        upstreams = self.upstreams
+        upstreams.count("etherscan")
+        if upstreams.over_limit("etherscan", upstreams.config["etherscan_rps"]):
+            self._send_json({"status": "0", "message": "NOTOK", "result": "Max rate limit reached"})
+            return
+        upstreams.sleep(upstreams.config["etherscan_latency_ms"])
+        if self._maybe_fail():
+            return
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        address = params.get("address", "").lower()
+        # Verification status is a stable property of the address
+        bucket = int(hashlib.md5(address.encode()).hexdigest(), 16) % 1000 / 1000
+        verified = bucket >= upstreams.config["unverified_ratio"]
+        name = "Token" + address[-6:]
+
+        if params.get("action") == "getabi":
+            if verified:
+                self._send_json({"status": "1", "message": "OK", "result": json.dumps(ERC20_ABI)})
+            else:
+                self._send_json({"status": "0", "message": "NOTOK", "result": "Contract source code not verified"})
+        elif params.get("action") == "getsourcecode":
+            entry = {
+                "SourceCode": "",
+                "ABI": "Contract source code not verified",
+                "ContractName": "",
+                "CompilerVersion": "",
+            }
+            if verified:
+                entry.update({
+                    "SourceCode": make_standard_json(
+                        name, upstreams.config["source_files"], upstreams.config["functions_per_file"]
+                    ),
+                    "ABI": json.dumps(ERC20_ABI),
+                    "ContractName": name,
+                    "CompilerVersion": "v0.8.20+commit.a1b79de6",
+                })
+            self._send_json({"status": "1", "message": "OK", "result": [entry]})
+        else:
+            self._send_json({"status": "0", "message": "NOTOK", "result": "Unknown action"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == "/rpc":
+            self._handle_rpc()
+        elif path == "/openai/v1/chat/completions":
+            self._handle_chat_completion()
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _handle_rpc(self):
+        upstreams = self.upstreams
+        upstreams.count("rpc")
+        payload = self._read_json()
+        upstreams.sleep(upstreams.config["rpc_latency_ms"])
+        if self._maybe_fail():
+            return
+
+        if isinstance(payload, list):
+            upstreams.count("rpc_calls", len(payload))
+            self._send_json([self._rpc_result(call) for call in payload])
+        else:
+            upstreams.count("rpc_calls")
+            self._send_json(self._rpc_result(payload))
+
+    def _rpc_result(self, call):
+        method, params = call.get("method"), call.get("params") or []
+        upstreams = self.upstreams
+        if method == "eth_chainId":
+            result = hex(11155111)
+        elif method == "eth_blockNumber":
+            result = hex(5_000_000)
+        elif method == "eth_getCode":
+            result = upstreams.code.get(params[0].lower(), "0x")
+        elif method == "eth_getStorageAt":
+            slot = int(params[1], 16)
+            result = upstreams.storage.get((params[0].lower(), slot), "0x" + "00" * 32)
+        else:
+            return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+    def _handle_chat_completion(self):
+        upstreams = self.upstreams
+        config = upstreams.config
+        upstreams.count("openai")
+        request = self._read_json()
+        if upstreams.over_limit("openai", config["openai_rps"]):
+            self._send_json({"error": {"message": "Rate limit reached for requests"}}, status=429,
+                            headers={"Retry-After": str(config["retry_after"])})
+            return
+        upstreams.sleep(config["openai_latency_ms"])
+        if self._maybe_fail():
+            return
+
+        prompt_tokens = sum(len(message.get("content") or "") for message in request.get("messages", [])) // 4
+        window = CONTEXT_WINDOWS.get(request.get("model"), DEFAULT_CONTEXT_WINDOW)
+        if prompt_tokens + (request.get("max_tokens") or 0) > window:
+            upstreams.count("context_exceeded")
+            self._send_json({"error": {
+                "message": f"This model's maximum context length is {window} tokens. However, you requested "
+                           f"{prompt_tokens + request.get('max_tokens', 0)} tokens.",
+                "type": "invalid_request_error", "code": "context_length_exceeded",
+            }}, status=400)
+            return
+        completion_tokens = min(config["completion_tokens"], request.get("max_tokens") or config["completion_tokens"])
+        upstreams.count("openai_prompt_tokens", prompt_tokens)
+        upstreams.count("openai_completion_tokens", completion_tokens)
+        words = [f"word{index} " for index in range(completion_tokens)]
+        last_message = (request.get("messages") or [{}])[-1].get("content") or ""
+        if "===SOLIDITY===" in last_message:
+            # Honour the contract generator's single-pass response format
+            half = len(words) // 2
+            words = ["===SOLIDITY===\n"] + words[:half] + ["\n===SECURITY===\n1. "] + words[half:]
+        created = int(time.time())
+        model = request.get("model", "gpt-4o-mini")
+        delay = 1.0 / config["tokens_per_second"] if config["tokens_per_second"] else 0
+
+        if not request.get("stream"):
+            time.sleep(delay * completion_tokens)
+            self._send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(words)}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, word in enumerate(words + [None]):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word} if word else {},
+                             "finish_reason": None if word else "stop"}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if word:
+                time.sleep(delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Etherscan / JSON-RPC / OpenAI upstreams")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for key, value in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+
+    upstreams = FakeUpstreams(host, port, **args)
+    print(f"Etherscan: ETHERSCAN_API_URL={upstreams.etherscan_url}")
+    print(f"JSON-RPC:  SEPOLIA_RPC_URL={upstreams.rpc_url}")
+    print(f"OpenAI:    OPENAI_BASE_URL={upstreams.openai_base_url}")
+    try:
+        upstreams.server.serve_forever()
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
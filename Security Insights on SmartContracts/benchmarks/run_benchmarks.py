@@ -0,0 +1,233 @@
+"""
+Offline latency/throughput benchmarks against local upstream stand-ins.
+
+Starts benchmarks/fake_upstreams.py in-process, points the explainer and the
+contract generator at it through environment variables, and reports
+p50/p95/p99 latency per scenario:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --json results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --tolerance 0.2
+
+With --baseline, the run fails if any scenario's p95 regressed by more than
+the tolerance.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+from _common import GENERATOR_DIR, percentile
+from fake_upstreams import FakeUpstreams, make_standard_json
+
+
+def summarize(name, samples, wall_seconds, items, errors=0):
+    return {
+        "scenario": name,
+        "items": items,
+        "errors": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_second": round(items / wall_seconds, 2) if wall_seconds else None,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+    }
+
+
+def fresh_address(index, salt):
+    return "0x" + f"{salt:08x}{index:032x}"[-40:]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def is_error(result):
+    return not result or str(result).startswith(("Error", "Could not"))
+
+
+def bench_single(explainer, count, salt):
+    """Cold single-contract analyses by address: Etherscan fetch + one LLM call each."""
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for index in range(count):
+        elapsed, result = timed(explainer.analyze_contract_from_address, fresh_address(index, salt))
+        samples.append(elapsed)
+        errors += is_error(result)
+    return summarize("single_contract", samples, time.perf_counter() - start, count, errors), samples
+
+
+def bench_cache_hits(explainer, count, salt):
+    """Repeat analyses of already-analyzed addresses: source store + explanation cache."""
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for index in range(count):
+        elapsed, result = timed(explainer.analyze_contract_from_address, fresh_address(index, salt))
+        samples.append(elapsed)
+        errors += is_error(result)
+    return summarize("cache_hit", samples, time.perf_counter() - start, count, errors)
+
+
+def bench_batch(count, salt, workers):
+    """Batch pipeline throughput over fresh addresses."""
+    from batch_analyzer import run_batch
+
+    items = [{"kind": "address", "input": fresh_address(index, salt)} for index in range(count)]
+    output = io.StringIO()
+    start = time.perf_counter()
+    run_batch(items, output, llm_workers=workers)
+    wall = time.perf_counter() - start
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    samples = [result["elapsed_seconds"] for result in results]
+    errors = sum(result["status"] != "ok" for result in results)
+    return summarize("batch", samples, wall, count, errors)
+
+
+def bench_large_source(explainer, count, files, functions):
+    """Large multi-file Standard JSON sources analyzed through map-reduce."""
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for index in range(count):
+        source = make_standard_json(f"Large{index}x{int(time.time())}", files, functions)
+        elapsed, result = timed(explainer.analyze_contract_from_source, source)
+        samples.append(elapsed)
+        errors += is_error(result)
+    return summarize("large_multi_file", samples, time.perf_counter() - start, count, errors)
+
+
+def bench_generate_contract(count):
+    """NL -> Solidity generation (contract_generator.py), both modes."""
+    sys.path.insert(0, GENERATOR_DIR)
+    try:
+        import contract_generator as generator
+    except ImportError as e:
+        print(f"Skipping generate_contract benchmarks: {e}")
+        return []
+
+    def generate_or_fail(generate, prompt):
+        try:
+            return generate(prompt, os.environ["OPENAI_API_KEY"])
+        except Exception:
+            return None, None
+
+    summaries = []
+    for name, generate in (("generate_two_pass", generator.generate_contract_with_openai),
+                           ("generate_single_pass", generator.generate_contract_single_pass)):
+        samples, errors = [], 0
+        start = time.perf_counter()
+        for index in range(count):
+            elapsed, (code, security) = timed(generate_or_fail, generate, f"ERC-20 token number {index}")
+            samples.append(elapsed)
+            errors += not (code and security)
+        summaries.append(summarize(name, samples, time.perf_counter() - start, count, errors))
+    return summaries
+
+
+def print_table(results):
+    header = f"{'scenario':<22}{'items':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(f"{result['scenario']:<22}{result['items']:>7}{result['errors']:>8}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['throughput_per_second']:>10}")
+
+
+def compare_to_baseline(results, baseline_path, tolerance):
+    with open(baseline_path, "r") as file:
+        baseline = {result["scenario"]: result for result in json.load(file)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["scenario"])
+        if previous and result["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p95 {previous['p95_ms']} ms -> {result['p95_ms']} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline explainer/generator benchmarks")
+    parser.add_argument("--count", type=int, default=10, help="Samples per latency scenario")
+    parser.add_argument("--batch-size", type=int, default=50, help="Contracts in the batch scenario")
+    parser.add_argument("--workers", type=int, default=8, help="Batch LLM concurrency")
+    parser.add_argument("--large-files", type=int, default=40, help="Files per large multi-file source")
+    parser.add_argument("--large-functions", type=int, default=30, help="Functions per file in large sources")
+    parser.add_argument("--openai-latency-ms", type=float, default=400.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--etherscan-latency-ms", type=float, default=120.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--skip-generator", action="store_true", help="Skip the contract generation scenarios")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous --json result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression vs baseline")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        openai_latency_ms=args.openai_latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        etherscan_latency_ms=args.etherscan_latency_ms,
+        error_rate=args.error_rate,
+        completion_tokens=300
+    ).start()
+    state_dir = tempfile.mkdtemp(prefix="explainer-bench-")
+
+    # Configure everything before the modules read their settings at import time
+    os.environ.update({
+        "ETHERSCAN_API_URL": upstreams.etherscan_url,
+        "ETHERSCAN_API_KEY": "bench",
+        "SEPOLIA_RPC_URL": upstreams.rpc_url,
+        "OPENAI_BASE_URL": upstreams.openai_base_url,
+        "OPENAI_API_KEY": "bench",
+        "EXPLANATION_CACHE_PATH": os.path.join(state_dir, "cache.sqlite3"),
+        "SOURCE_STORE_PATH": os.path.join(state_dir, "sources"),
+        "LIBRARY_INDEX_PATH": os.path.join(state_dir, "library_fingerprints.json"),
+        "SIMILARITY_INDEX_PATH": os.path.join(state_dir, "similarity.sqlite3"),
+        "BYTECODE_INDEX_PATH": os.path.join(state_dir, "bytecode.sqlite3"),
+        # The fake upstreams have no rate caps, so measure the pipeline unthrottled
+        "ETHERSCAN_RPS": "0",
+        "OPENAI_RPM": "0",
+        "OPENAI_TPM": "0",
+    })
+    import smart_contract_explainer as explainer
+
+    salt = int(time.time())
+    results = []
+    try:
+        # The explainer logs progress to stdout; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            single, _ = bench_single(explainer, args.count, salt)
+            results.append(single)
+            results.append(bench_cache_hits(explainer, args.count, salt))
+            results.append(bench_batch(args.batch_size, salt + 1, args.workers))
+            results.append(bench_large_source(explainer, max(args.count // 3, 1), args.large_files, args.large_functions))
+        if not args.skip_generator:
+            results.extend(bench_generate_contract(max(args.count // 2, 1)))
+    finally:
+        upstreams.stop()
+
+    print_table(results)
+    print(f"\nUpstream calls: {upstreams.counters}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"config": vars(args), "results": results}, file, indent=2)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo p95 regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
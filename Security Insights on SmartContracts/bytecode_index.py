@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "BYTECODE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".bytecode_index.sqlite3")
+)
+
+# EIP-1167 minimal proxy runtime code, around the 20-byte implementation address
+MINIMAL_PROXY_PREFIX = bytes.fromhex("363d3d373d3d3d363d73")
+MINIMAL_PROXY_SUFFIX = bytes.fromhex("5af43d82803e903d91602b57fd5bf3")
+
+# EIP-1967: bytes32(uint256(keccak256("eip1967.proxy.implementation")) - 1)
+EIP1967_IMPLEMENTATION_SLOT = 0x360894A13BA1A3210667C828492DB98DCA3E2076CC3735A920A3CA505D382BBC
+
+DELEGATECALL = 0xF4
+
+
+def to_bytes(code):
+    """Runtime code as bytes, from the hex string or HexBytes an RPC call returns."""
+    if isinstance(code, str):
+        code = code[2:] if code.startswith("0x") else code
+        return bytes.fromhex(code)
+    return bytes(code)
+
+
+def strip_metadata(code):
+    """
+    Drop the CBOR metadata the Solidity compiler appends to runtime code.
+
+    The metadata (IPFS/Swarm hash of the sources and settings) differs between
+    otherwise identical builds; its length is stored in the last two bytes.
+    """
+    if len(code) < 2:
+        return code
+    length = int.from_bytes(code[-2:], "big")
+    start = len(code) - length - 2
+    # A CBOR map with one to five entries starts with 0xa1-0xa5
+    if length and start >= 0 and 0xA1 <= code[start] <= 0xA5:
+        return code[:start]
+    return code
+
+
+def code_hash(code):
+    """Hash of runtime code with compiler metadata stripped."""
+    return hashlib.sha256(strip_metadata(code)).hexdigest()
+
+
+def minimal_proxy_target(code):
+    """Implementation address of an EIP-1167 minimal proxy, or None."""
+    if (len(code) == len(MINIMAL_PROXY_PREFIX) + 20 + len(MINIMAL_PROXY_SUFFIX)
+            and code.startswith(MINIMAL_PROXY_PREFIX) and code.endswith(MINIMAL_PROXY_SUFFIX)):
+        return "0x" + code[len(MINIMAL_PROXY_PREFIX):len(MINIMAL_PROXY_PREFIX) + 20].hex()
+    return None
+
+
+def may_delegate(code):
+    """Whether code contains a DELEGATECALL byte; proxies always do."""
+    # Cheap pre-filter before an implementation slot read: the byte may also be push data
+    return DELEGATECALL in code
+
+
+def slot_address(value):
+    """Address stored in a storage slot word, or None when the slot is empty."""
+    value = to_bytes(value).rjust(32, b"\0")
+    if not any(value):
+        return None
+    return "0x" + value[-20:].hex()
+
+
+class BytecodeIndex:
+    """
+    SQLite map from metadata-stripped runtime code hash to the first verified address analyzed with it.
+
+    It also keeps how each looked-up address resolved (proxy target, code
+    hash and notes), so repeat lookups need no code reads.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS code (
+                hash TEXT PRIMARY KEY,
+                address TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS resolutions (
+                address TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                hash TEXT,
+                notes TEXT NOT NULL,
+                upgradeable INTEGER NOT NULL,
+                resolved_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, code_hash):
+        """Return the address recorded for code_hash, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT address FROM code WHERE hash = ?", (code_hash,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, code_hash, address):
+        """Record address for code_hash unless another address already has it."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO code (hash, address, created_at) VALUES (?, ?, ?)",
+                (code_hash, address.lower(), time.time())
+            )
+
+    def get_resolution(self, address, max_age=None):
+        """
+        Return (target, code_hash, notes, upgradeable) recorded for address, or None.
+
+        code_hash is None for an address that had no runtime code.
+
+        Resolutions through an upgradeable proxy expire after max_age seconds,
+        since the proxy can be pointed at a new implementation; the others do
+        not change.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT target, hash, notes, upgradeable, resolved_at FROM resolutions WHERE address = ?",
+                (address.lower(),)
+            ).fetchone()
+        if row is None:
+            return None
+        target, code_hash, notes, upgradeable, resolved_at = row
+        if upgradeable and max_age is not None and time.time() - resolved_at > max_age:
+            return None
+        return target, code_hash, json.loads(notes), bool(upgradeable)
+
+    def put_resolution(self, address, target, code_hash, notes, upgradeable):
+        """Record how address resolved, replacing any earlier resolution."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resolutions (address, target, hash, notes, upgradeable, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (address.lower(), target, code_hash, json.dumps(notes), int(upgradeable), time.time())
+            )
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_bytecode_index():
+    """Return the process-wide bytecode index."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = BytecodeIndex()
+    return _default_index
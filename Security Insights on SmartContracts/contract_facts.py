@@ -0,0 +1,354 @@
+import re
+from functools import lru_cache
+
+from solidity_lexer import code_tokens
+
+
+VISIBILITIES = frozenset(("public", "external", "internal", "private"))
+MUTABILITIES = frozenset(("view", "pure", "payable", "constant"))
+VARIABLE_SPECIFIERS = VISIBILITIES | frozenset(("constant", "immutable", "override", "transient"))
+FUNCTION_KINDS = frozenset(("function", "constructor", "fallback", "receive", "modifier"))
+CONTRACT_KINDS = frozenset(("contract", "interface", "library"))
+
+# The patterns the contract generator is told to avoid
+RISKY_PATTERNS = ("tx.origin", "delegatecall", "selfdestruct", "low-level call")
+
+WORD_CHAR = re.compile(r"[A-Za-z0-9_$]")
+# The lexer emits operators one character per token, so == and != are two tokens
+COMPARISONS = (["=", "="], ["!", "="])
+
+
+def extract_facts(files):
+    """
+    Extract contract structure from parsed source files ({file_path: content}).
+
+    Returns a dict with the Solidity version pragmas, one entry per contract
+    (inheritance, state variables, events, modifiers, functions) and the risky
+    patterns found, each with its contract, function and line.
+    """
+    facts = {"pragmas": [], "contracts": [], "risks": []}
+    for file_path, content in files.items():
+        pragmas, contracts, risks = _file_facts(file_path, content)
+        facts["pragmas"].extend(pragma for pragma in pragmas if pragma not in facts["pragmas"])
+        facts["contracts"].extend(contracts)
+        facts["risks"].extend(risks)
+    return facts
+
+
+@lru_cache(maxsize=512)
+def _file_facts(file_path, content):
+    # Cached per file: the same file is often seen again (map-reduce reduce
+    # step, shared dependencies across contracts). Callers must not mutate.
+    pragmas, contracts, risks = [], [], []
+    tokens = code_tokens(content)
+    for unit in _statements(tokens):
+        texts = [text for _, text, _ in unit]
+        kind = texts[1] if texts[0] == "abstract" and len(texts) > 1 else texts[0]
+        if kind in CONTRACT_KINDS:
+            contracts.append(_contract_facts(file_path, content, unit, risks))
+        elif kind in FUNCTION_KINDS:
+            # Free functions at file level
+            name = texts[1] if kind == "function" else kind
+            _scan_risks(content, unit, None, name, risks)
+        elif texts[:2] == ["pragma", "solidity"]:
+            version = _join(texts[2:-1])
+            if version not in pragmas:
+                pragmas.append(version)
+    return pragmas, contracts, risks
+
+
+def _statements(tokens):
+    """Split code tokens into depth-0 units ending at ';' or at the '}' closing a block."""
+    depth, start = 0, 0
+    for position, (_, text, _) in enumerate(tokens):
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                yield tokens[start:position + 1]
+                start = position + 1
+        elif text == ";" and depth == 0:
+            yield tokens[start:position + 1]
+            start = position + 1
+    if start < len(tokens):
+        yield tokens[start:]
+
+
+def _contract_facts(file_path, content, unit, risks):
+    texts = [text for _, text, _ in unit]
+    open_at = texts.index("{") if "{" in texts else len(texts)
+    header = texts[:open_at]
+    kind_at = 1 if header[0] == "abstract" else 0
+    name = header[kind_at + 1] if len(header) > kind_at + 1 else None
+    contract = {
+        "name": name,
+        "kind": " ".join(header[:kind_at + 1]),
+        "path": file_path,
+        "bases": _bases(header),
+        "using": [],
+        "state": [],
+        "events": [],
+        "errors": [],
+        "types": [],
+        "modifiers": [],
+        "functions": [],
+    }
+    for member in _statements(unit[open_at + 1:-1]):
+        member_texts = [text for _, text, _ in member]
+        kind = member_texts[0]
+        if kind in FUNCTION_KINDS:
+            function = _function_facts(content, member)
+            (contract["modifiers"] if kind == "modifier" else contract["functions"]).append(function)
+            _scan_risks(content, member, name, function["name"], risks)
+        elif kind in ("event", "error"):
+            contract[kind + "s"].append(_join(member_texts[1:-1]))
+        elif kind in ("struct", "enum"):
+            contract["types"].append(f"{kind} {member_texts[1]}")
+        elif kind == "using":
+            contract["using"].append(_join(member_texts[1:-1]))
+        elif member_texts[-1] == ";":
+            variable = _variable_facts(member_texts[:-1])
+            if variable:
+                contract["state"].append(variable)
+    return contract
+
+
+def _bases(tokens):
+    if "is" not in tokens:
+        return []
+    bases, depth, current = [], 0, []
+    for text in tokens[tokens.index("is") + 1:]:
+        if text == "{" and depth == 0:
+            break
+        if text == "(":
+            depth += 1
+        elif text == ")":
+            depth -= 1
+        elif text == "," and depth == 0:
+            bases.append(current[0])
+            current = []
+        elif depth == 0:
+            current.append(text)
+    if current:
+        bases.append(current[0])
+    return bases
+
+
+def _function_facts(content, member):
+    texts = [text for _, text, _ in member]
+    has_body = texts[-1] == "}"
+    open_at = texts.index("{") if has_body else len(texts)
+    tokens = texts[:open_at]
+    kind = tokens[0]
+    name = tokens[1] if kind in ("function", "modifier") and len(tokens) > 1 and tokens[1] != "(" else kind
+    function = {
+        "name": name,
+        "kind": kind,
+        "params": "",
+        "visibility": None,
+        "mutability": None,
+        "modifiers": [],
+        "returns": None,
+        "has_body": has_body,
+        "checks_sender": False,
+        "source": content[member[0][2]:member[-1][2] + len(member[-1][1])],
+    }
+
+    index = tokens.index("(") if "(" in tokens else len(tokens)
+    group, index = _paren_group(tokens, index)
+    function["params"] = _join(group)
+    while index < len(tokens) and tokens[index] != ";":
+        text = tokens[index]
+        index += 1
+        if text in VISIBILITIES:
+            function["visibility"] = text
+        elif text in MUTABILITIES:
+            function["mutability"] = "view" if text == "constant" else text
+        elif text == "returns":
+            group, index = _paren_group(tokens, index)
+            function["returns"] = _join(group)
+        elif text in ("virtual", "override"):
+            if text == "override":
+                _, index = _paren_group(tokens, index)
+        elif WORD_CHAR.match(text):
+            # Modifier invocation, possibly with arguments
+            _, index = _paren_group(tokens, index)
+            function["modifiers"].append(text)
+
+    body = texts[open_at:]
+    for position in range(len(body) - 2):
+        if body[position] == "msg" and body[position + 1:position + 3] == [".", "sender"]:
+            if body[max(position - 2, 0):position] in COMPARISONS or body[position + 3:position + 5] in COMPARISONS:
+                function["checks_sender"] = True
+                break
+    return function
+
+
+def _paren_group(tokens, index):
+    """Return the tokens inside the parenthesized group at index and the index after it."""
+    if index >= len(tokens) or tokens[index] != "(":
+        return [], index
+    depth = 0
+    for position in range(index, len(tokens)):
+        if tokens[position] == "(":
+            depth += 1
+        elif tokens[position] == ")":
+            depth -= 1
+            if depth == 0:
+                return tokens[index + 1:position], position + 1
+    return tokens[index + 1:], len(tokens)
+
+
+def _variable_facts(tokens):
+    depth, end = 0, len(tokens)
+    for position, text in enumerate(tokens):
+        if text in ("(", "["):
+            depth += 1
+        elif text in (")", "]"):
+            depth -= 1
+        elif text == "=" and depth == 0:
+            end = position
+            break
+    declaration = tokens[:end]
+    if not declaration or not WORD_CHAR.match(declaration[-1]):
+        return None
+    specifiers = [text for text in declaration[:-1] if text in VARIABLE_SPECIFIERS]
+    type_tokens = [text for text in declaration[:-1] if text not in VARIABLE_SPECIFIERS]
+    return {
+        "name": declaration[-1],
+        "type": _join(type_tokens),
+        "specifiers": specifiers,
+    }
+
+
+def _scan_risks(content, tokens, contract, function, risks):
+    texts = [token[1] for token in tokens]
+    for position, (_, token, offset) in enumerate(tokens):
+        pattern = None
+        following = texts[position + 1] if position + 1 < len(texts) else None
+        previous = texts[position - 1] if position else None
+        if token == "tx" and texts[position + 1:position + 3] == [".", "origin"]:
+            pattern = "tx.origin"
+        elif token == "delegatecall":
+            pattern = "delegatecall"
+        elif token in ("selfdestruct", "suicide") and following == "(":
+            pattern = "selfdestruct"
+        elif token in ("call", "callcode") and previous == "." and following in ("(", "{", "."):
+            pattern = "low-level call"
+        if pattern:
+            risks.append({
+                "pattern": pattern,
+                "contract": contract,
+                "function": function,
+                "line": content.count("\n", 0, offset) + 1,
+            })
+
+
+def _join(tokens):
+    """Join code tokens back into compact source text."""
+    parts = []
+    for text in tokens:
+        if parts and WORD_CHAR.match(parts[-1][-1]) and WORD_CHAR.match(text[0]):
+            parts.append(" ")
+        parts.append(text)
+    return "".join(parts)
+
+
+def format_fact_sheet(facts, show_lines=True, outline=False):
+    """
+    Render extracted facts as a compact plain-text fact sheet.
+
+    show_lines=False omits line numbers, for facts extracted from minified
+    sources whose lines no longer match the original. outline=True lists
+    the risky patterns first and then only the contracts and their bases,
+    for systems whose full sheet is too large to send.
+    """
+    lines = []
+    if facts["pragmas"]:
+        lines.append(f"Solidity: {', '.join(facts['pragmas'])}")
+    if outline:
+        lines.extend(_risk_lines(facts, show_lines))
+    for contract in facts["contracts"]:
+        heading = f"{contract['kind']} {contract['name']}"
+        if contract["bases"]:
+            heading += f" is {', '.join(contract['bases'])}"
+        if contract["path"]:
+            heading += f"  ({contract['path']})"
+        lines.append(heading)
+        if outline:
+            continue
+        if contract["using"]:
+            lines.append(f"  using: {'; '.join(contract['using'])}")
+        if contract["types"]:
+            lines.append(f"  types: {', '.join(contract['types'])}")
+        if contract["state"]:
+            lines.append("  state: " + "; ".join(
+                f"{variable['type']} {variable['name']}"
+                + (f" [{' '.join(variable['specifiers'])}]" if variable["specifiers"] else "")
+                for variable in contract["state"]
+            ))
+        if contract["events"]:
+            lines.append(f"  events: {'; '.join(contract['events'])}")
+        if contract["errors"]:
+            lines.append(f"  errors: {'; '.join(contract['errors'])}")
+        if contract["modifiers"]:
+            lines.append(f"  modifiers: {', '.join(modifier['name'] for modifier in contract['modifiers'])}")
+        for function in contract["functions"]:
+            lines.append(f"  {format_function(function)}")
+    if not outline:
+        lines.extend(_risk_lines(facts, show_lines))
+    return "\n".join(lines)
+
+
+def _risk_lines(facts, show_lines):
+    if not facts["risks"]:
+        return ["Risky patterns: none of tx.origin, delegatecall, selfdestruct, low-level call"]
+    lines = ["Risky patterns:"]
+    for risk in facts["risks"]:
+        location = ".".join(part for part in (risk["contract"], risk["function"]) if part)
+        lines.append(f"  {risk['pattern']} in {location}" + (f" (line {risk['line']})" if show_lines else ""))
+    return lines
+
+
+def format_function(function):
+    signature = f"{function['name']}({function['params']})"
+    if function["kind"] == "function":
+        signature = f"function {signature}"
+    parts = [signature]
+    parts.extend(part for part in (function["visibility"], function["mutability"]) if part)
+    if function["modifiers"]:
+        parts.append(f"[{', '.join(function['modifiers'])}]")
+    if function["returns"]:
+        parts.append(f"returns ({function['returns']})")
+    if function["checks_sender"]:
+        parts.append("checks msg.sender")
+    if not function["has_body"]:
+        parts.append("(no body)")
+    return " ".join(parts)
+
+
+def key_function_source(facts):
+    """
+    Source of the code the fact sheet cannot summarize.
+
+    Modifiers, constructors, fallback/receive, state-changing public or
+    external functions and any function with a risky pattern are kept;
+    view/pure functions, internal helpers and interfaces are left to the
+    fact sheet.
+    """
+    flagged = {(risk["contract"], risk["function"]) for risk in facts["risks"]}
+    sections = []
+    for contract in facts["contracts"]:
+        for function in contract["modifiers"] + contract["functions"]:
+            if not function["has_body"]:
+                continue
+            keep = (
+                function["kind"] != "function"
+                or (contract["name"], function["name"]) in flagged
+                or (function["visibility"] in ("public", "external", None)
+                    and function["mutability"] not in ("view", "pure"))
+            )
+            if keep:
+                sections.append(f"// {contract['name']}.{function['name']}\n{function['source']}")
+    return "\n\n".join(sections)
@@ -0,0 +1,155 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+# Cache location and limits can be overridden from the environment
+DEFAULT_CACHE_PATH = os.getenv(
+    "EXPLANATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".explanation_cache.sqlite3")
+)
+DEFAULT_TTL_SECONDS = int(os.getenv("EXPLANATION_CACHE_TTL", str(30 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "5000"))
+DEFAULT_MAX_BYTES = int(os.getenv("EXPLANATION_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+
+def normalize_content(content):
+    """Normalize source/ABI text so formatting-only changes map to the same key."""
+    lines = (line.strip() for line in content.replace("\r\n", "\n").split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(content, model, prompt_version):
+    """Build a content-addressed key from the normalized input, model and prompt version."""
+    material = f"{model}\0{prompt_version}\0{normalize_content(content)}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """SQLite-backed key/value cache with TTL expiry and LRU eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def contains(self, key):
+        """Whether key holds a fresh entry; unlike get, counters and recency are untouched."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and not (self.ttl and time.time() - row[0] > self.ttl)
+
+    def set(self, key, value):
+        """Store value under key and evict least recently used entries if over budget."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        if self.ttl:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def stats(self):
+        """Return hit/miss counters and current cache size."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def clear(self):
+        """Remove every cached entry and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self.hits = 0
+            self.misses = 0
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path=DEFAULT_CACHE_PATH):
+    """
+    Return the process-wide cache stored at path.
+
+    The default path is the explanation cache shared by the CLI and the
+    Streamlit app; other callers (e.g. the contract generator) pass their own.
+    """
+    cache = _caches.get(path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(path)
+            if cache is None:
+                cache = _caches[path] = ExplanationCache(path=path)
+    return cache
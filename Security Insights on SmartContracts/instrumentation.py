@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+# Completed traces are appended here as JSON lines when set
+TRACE_FILE = os.getenv("EXPLAINER_TRACE_FILE")
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_trace = contextvars.ContextVar("explainer_trace", default=None)
+_current_span = contextvars.ContextVar("explainer_span", default=None)
+_sink_lock = threading.Lock()
+
+
+class Trace:
+    """Spans and counters collected for one top-level operation (a CLI run, a job, a request)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.wall_seconds = None
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def add(self, key, amount):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def summary(self):
+        """Per-stage totals plus counters, in the order stages first started."""
+        stages = {}
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: record["start"])
+            counters = dict(self.counters)
+        for record in spans:
+            stage = stages.setdefault(record["name"], {"count": 0, "total_ms": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total_ms"] += record["duration_ms"]
+            stage["errors"] += record.get("error", False)
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_ms": round((self.wall_seconds or 0) * 1000, 2),
+            "stages": {name: dict(stage, total_ms=round(stage["total_ms"], 2)) for name, stage in stages.items()},
+            "counters": counters,
+        }
+
+
+class MetricsRegistry:
+    """Process-wide aggregates exported in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._counters = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._durations.setdefault(stage, {"buckets": [0] * len(DURATION_BUCKETS), "count": 0, "sum": 0.0})
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def render_prometheus(self):
+        lines = [
+            "# HELP explainer_stage_duration_seconds Time spent in each analysis stage.",
+            "# TYPE explainer_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            durations = {stage: dict(histogram) for stage, histogram in self._durations.items()}
+            counters = dict(self._counters)
+        for stage, histogram in sorted(durations.items()):
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                lines.append(f'explainer_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'explainer_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'explainer_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'explainer_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        lines.append("# HELP explainer_events_total Tokens, bytes and cache outcomes recorded by the explainer.")
+        lines.append("# TYPE explainer_events_total counter")
+        for name, value in sorted(counters.items()):
+            lines.append(f'explainer_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def trace(name):
+    """
+    Collect every span and counter recorded below this point into one Trace.
+
+    Nested calls reuse the enclosing trace. When the outermost trace ends it
+    is written to the JSONL sink (EXPLAINER_TRACE_FILE), if configured.
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        with span(name):
+            yield existing
+        return
+
+    current = Trace(name)
+    token = _current_trace.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.wall_seconds = time.perf_counter() - start
+        _current_trace.reset(token)
+        _write_trace(current)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time one stage; the span is attached to the current trace and exported as a metric."""
+    parent = _current_span.get()
+    record = {
+        "name": name,
+        "parent": parent["name"] if parent else None,
+        "start": time.perf_counter(),
+        "attributes": attributes,
+    }
+    token = _current_span.set(record)
+    try:
+        yield record
+    except Exception:
+        record["error"] = True
+        raise
+    finally:
+        _current_span.reset(token)
+        seconds = time.perf_counter() - record["start"]
+        record["duration_ms"] = round(seconds * 1000, 3)
+        METRICS.observe(name, seconds)
+        current = _current_trace.get()
+        if current is not None:
+            current.add_span(record)
+
+
+def observe(name, seconds, **attributes):
+    """Record an already-timed stage, for code that cannot wrap it in span() (e.g. generators)."""
+    parent = _current_span.get()
+    entry = {
+        "name": name,
+        "parent": parent["name"] if parent else None,
+        "start": time.perf_counter() - seconds,
+        "duration_ms": round(seconds * 1000, 3),
+        "attributes": attributes,
+    }
+    METRICS.observe(name, seconds)
+    current = _current_trace.get()
+    if current is not None:
+        current.add_span(entry)
+
+
+def record(name, amount=1):
+    """Count tokens, bytes or cache outcomes against the current span, trace and global metrics."""
+    METRICS.increment(name, amount)
+    current_span = _current_span.get()
+    if current_span is not None:
+        counters = current_span["attributes"].setdefault("counters", {})
+        counters[name] = counters.get(name, 0) + amount
+    current = _current_trace.get()
+    if current is not None:
+        current.add(name, amount)
+
+
+def bind(fn):
+    """
+    Wrap fn so every call runs in a copy of the context it was bound in.
+
+    Used when handing work to thread pools, so spans recorded by pool threads
+    land in the submitting trace. Each call gets its own copy, so one bound
+    function may run on several threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def _write_trace(current):
+    if not TRACE_FILE:
+        return
+    line = dict(current.summary(), spans=current.spans)
+    with _sink_lock:
+        with open(TRACE_FILE, "a") as file:
+            file.write(json.dumps(line, default=str) + "\n")
+
+
+def format_breakdown(summary):
+    """
+    Render a trace summary as a per-stage table for terminal output.
+
+    Stages that ran concurrently (map-reduce chunks, batch items) can add up
+    to more than 100% of wall time.
+    """
+    wall = summary["wall_ms"] or 1
+    lines = [f"{'stage':<28}{'calls':>7}{'total ms':>12}{'% wall':>9}"]
+    for name, stage in summary["stages"].items():
+        lines.append(
+            f"{name:<28}{stage['count']:>7}{stage['total_ms']:>12.1f}{stage['total_ms'] / wall * 100:>8.0f}%"
+        )
+    lines.append(f"{'wall time':<28}{'':>7}{summary['wall_ms']:>12.1f}")
+    for name, value in sorted(summary["counters"].items()):
+        lines.append(f"  {name}: {value}")
+    return "\n".join(lines)
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port):
+    """Serve Prometheus metrics on port from a daemon thread (idempotent)."""
+    # http.server is only needed when an endpoint is actually requested
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = METRICS.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", int(port)), MetricsHandler)
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
@@ -0,0 +1,122 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import trace
+
+
+DEFAULT_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+DEFAULT_MAX_JOBS = int(os.getenv("ANALYSIS_MAX_JOBS", "1000"))
+
+
+class JobQueue:
+    """
+    In-process job store backed by a bounded worker pool.
+
+    Jobs are identified by ID and outlive the Streamlit script run that
+    submitted them, so a rerun or tab switch only has to poll get(job_id).
+    A job function may return a string or an iterator of text fragments; in
+    the latter case the fragments received so far are exposed as 'partial'.
+    Each finished job carries a per-stage 'timings' summary.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_jobs=DEFAULT_MAX_JOBS):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._jobs = OrderedDict()
+        self._active_keys = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label, fn, *args, key=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return its job ID.
+
+        If key is given and an identical job is still queued or running, that
+        job's ID is returned instead of starting a duplicate.
+        """
+        with self._lock:
+            if key is not None and key in self._active_keys:
+                return self._active_keys[key]
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "label": label,
+                "key": key,
+                "status": "queued",
+                "fragments": [],
+                "result": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "timings": None,
+            }
+            if key is not None:
+                self._active_keys[key] = job_id
+            self._trim()
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status="running", started_at=time.time())
+        with trace(self.get(job_id)["label"]) as current:
+            try:
+                result = fn(*args, **kwargs)
+                if not isinstance(result, str):
+                    with self._lock:
+                        fragments = self._jobs[job_id]["fragments"]
+                    for fragment in result:
+                        # Joined only when read (see get), not once per fragment
+                        with self._lock:
+                            fragments.append(fragment)
+                    result = "".join(fragments)
+                fields = {"status": "done", "result": result}
+            except Exception as e:
+                fields = {"status": "error", "error": str(e)}
+        self._finish(job_id, timings=current.summary(), **fields)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _finish(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields, finished_at=time.time())
+            if job["key"] is not None and self._active_keys.get(job["key"]) == job_id:
+                del self._active_keys[job["key"]]
+
+    def _trim(self):
+        # Drop the oldest finished jobs once the store is over capacity
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job["finished_at"]][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if it is unknown or has been evicted."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            fragments = list(snapshot.pop("fragments"))
+        snapshot["partial"] = "".join(fragments)
+        return snapshot
+
+    def stats(self):
+        """Return job counts by status."""
+        counts = {"queued": 0, "running": 0, "done": 0, "error": 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
@@ -0,0 +1,164 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import threading
+
+from solidity_lexer import tokenize, code_tokens, split_units
+
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "LIBRARY_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "library_fingerprints.json")
+)
+INDEX_FORMAT_VERSION = 1
+
+
+def fingerprint(source):
+    """Hash the code tokens of a file so whitespace and comment edits do not change it."""
+    normalized = " ".join(text for _, text, _ in code_tokens(source))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def summarize_library_file(source):
+    """Build a short offline summary from a file's declarations and NatSpec."""
+    declared = []
+    for unit in split_units(source):
+        if unit["kind"] in ("contract", "interface", "library") and unit["name"]:
+            declared.append(f"{unit['kind']} {unit['name']}")
+
+    summary = ", ".join(declared) or "no contract declarations"
+    natspec = "\n".join(text for kind, text, _ in tokenize(source) if kind in ("natspec_line", "natspec_block"))
+    for tag in ("@notice", "@dev", "@title"):
+        match = re.search(re.escape(tag) + r"\s+([^\n@*]+)", natspec)
+        if match:
+            return f"{summary} — {match.group(1).strip()}"
+    return summary
+
+
+class LibraryIndex:
+    """Content-hash index of known, unmodified library files (OpenZeppelin, etc.)."""
+
+    def __init__(self, entries=None, path=DEFAULT_INDEX_PATH):
+        self.entries = entries or {}
+        self.path = path
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        """Load an index from disk; a missing index is treated as empty."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls(path=path)
+        return cls(data.get("entries", {}), path=path)
+
+    def save(self):
+        with open(self.path, "w") as file:
+            json.dump({"version": INDEX_FORMAT_VERSION, "entries": self.entries}, file, indent=1, sort_keys=True)
+
+    def match(self, source):
+        """Return the index entry for an unmodified known library file, or None."""
+        if not self.entries:
+            return None
+        return self.entries.get(fingerprint(source))
+
+    def add_checkout(self, checkout_dir, library, version, prefix=""):
+        """Fingerprint every .sol file under a local library checkout. Returns the number added."""
+        added = 0
+        for root, _, names in os.walk(checkout_dir):
+            for name in sorted(names):
+                if not name.endswith(".sol"):
+                    continue
+                file_path = os.path.join(root, name)
+                with open(file_path, "r", encoding="utf-8") as file:
+                    source = file.read()
+                relative = os.path.relpath(file_path, checkout_dir).replace(os.sep, "/")
+                self.entries[fingerprint(source)] = {
+                    "library": library,
+                    "version": version,
+                    "path": prefix + relative,
+                    "summary": summarize_library_file(source),
+                }
+                added += 1
+        return added
+
+
+def strip_known_libraries(files, index=None):
+    """
+    Replace unmodified known library files with a one-line reference and summary.
+
+    Returns (files, matched) where matched lists the replaced file paths.
+    """
+    index = index or get_library_index()
+    if not index.entries:
+        return files, []
+
+    stripped, matched = {}, []
+    for file_path, content in files.items():
+        entry = index.match(content) if file_path else None
+        if entry is None:
+            stripped[file_path] = content
+            continue
+        matched.append(file_path)
+        stripped[file_path] = (
+            f"// Unmodified {entry['library']} {entry['version']} ({entry['path']}): {entry['summary']}\n"
+        )
+    return stripped, matched
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_library_index():
+    """Return the process-wide library index, loaded on first use."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = LibraryIndex.load()
+    return _default_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the known-library fingerprint index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Add a local library checkout to the index")
+    build.add_argument("checkout", help="Path to the library's contracts directory")
+    build.add_argument("--library", required=True, help="Library name, e.g. openzeppelin-contracts")
+    build.add_argument("--version", required=True, help="Library version, e.g. 4.9.3")
+    build.add_argument("--prefix", default="", help="Import prefix, e.g. @openzeppelin/contracts/")
+    build.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file to update")
+    build.add_argument("--reset", action="store_true", help="Start from an empty index")
+
+    stats = subparsers.add_parser("stats", help="Show what the index contains")
+    stats.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Index file to read")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not os.path.isdir(args.checkout):
+            print(f"Error: Directory {args.checkout} not found")
+            sys.exit(1)
+        index = LibraryIndex(path=args.index) if args.reset else LibraryIndex.load(args.index)
+        added = index.add_checkout(args.checkout, args.library, args.version, args.prefix)
+        index.save()
+        print(f"Indexed {added} files from {args.library} {args.version} ({len(index.entries)} total)")
+
+    elif args.command == "stats":
+        index = LibraryIndex.load(args.index)
+        libraries = {}
+        for entry in index.entries.values():
+            key = f"{entry['library']} {entry['version']}"
+            libraries[key] = libraries.get(key, 0) + 1
+        for key, count in sorted(libraries.items()):
+            print(f"{key}: {count} files")
+        print(f"Total: {len(index.entries)} fingerprints")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import time
+from collections import namedtuple
+
+from instrumentation import observe, record
+
+try:
+    import tiktoken
+except ImportError:
+    # Optional: exact counts when installed, the conservative estimate below otherwise
+    tiktoken = None
+
+
+# (context window, output cap) in tokens for the chat models prompts can be routed to
+MODEL_LIMITS = {
+    "gpt-4o-mini": (128000, 16384),
+    "gpt-4o": (128000, 16384),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-3.5-turbo": (16385, 4096),
+}
+# Unknown models are assumed to have the smallest window in common use
+DEFAULT_LIMITS = (8192, 4096)
+
+# Without tiktoken prompts are counted at this many characters per token. Solidity, JSON
+# and Markdown tokenize denser than English prose, so 3 errs high: a prompt that passes
+# preflight fits, at the cost of routing borderline prompts one tier up. Source chunking
+# and the map-reduce threshold count with the same estimate (source_chunker.estimate_tokens).
+PREFLIGHT_CHARS_PER_TOKEN = float(os.getenv("PREFLIGHT_CHARS_PER_TOKEN", "3"))
+# Chat format overhead: per message (role, separators) and for priming the reply
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+# A model only qualifies if it leaves at least this much room for the answer; below that
+# max_tokens is capped to whatever is left
+MIN_OUTPUT_TOKENS = 256
+
+Route = namedtuple("Route", "model prompt_tokens max_tokens")
+
+_encodings = {}
+
+
+class PromptTooLargeError(ValueError):
+    """A prompt that no configured model can take; raised before any request is sent."""
+
+    def __init__(self, prompt_tokens, capacity, models):
+        super().__init__(
+            f"Prompt of about {prompt_tokens} tokens is too large for {', '.join(models)} "
+            f"(at most about {capacity} prompt tokens)"
+        )
+        self.prompt_tokens = prompt_tokens
+        self.capacity = capacity
+
+
+def parse_routes(spec):
+    """
+    Parse a route table such as "gpt-4o-mini@4000,gpt-4o" into [(model, ceiling), ...].
+
+    Models are tried in order; "@N" limits a model to prompts of at most N
+    tokens, so a cheap model can take small prompts and the next one the rest.
+    """
+    routes = []
+    for entry in spec.split(","):
+        model, _, ceiling = entry.strip().partition("@")
+        if model:
+            routes.append((model, int(ceiling) if ceiling else None))
+    if not routes:
+        raise ValueError(f"No models in route table {spec!r}")
+    return routes
+
+
+def model_limits(model):
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+
+
+def count_tokens(text, model=None):
+    """Tokens in text for model (any chat model if None): exact with tiktoken, a slight overestimate without it."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return int(len(text) / PREFLIGHT_CHARS_PER_TOKEN) + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages, model=None):
+    """Prompt tokens a chat completion request is billed and limited for."""
+    return sum(count_tokens(message["content"], model) + MESSAGE_OVERHEAD_TOKENS for message in messages) \
+        + REPLY_OVERHEAD_TOKENS
+
+
+def _encoding(model):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # The encoding files could not be loaded (e.g. offline on first use)
+            encoding = None
+        _encodings[model] = encoding
+    return _encodings[model]
+
+
+class ModelRouter:
+    """
+    Preflight for chat completions: count the prompt, pick a model, budget the answer.
+
+    The first model in the route table whose ceiling and context window leave
+    room for the answer gets the request, with max_tokens capped to what is
+    left of its window. Prompts no model can take raise PromptTooLargeError
+    without a network call.
+    """
+
+    def __init__(self, name, routes):
+        self.name = name
+        self.spec = routes
+        self.routes = parse_routes(routes)
+
+    def route(self, messages, max_tokens):
+        """Return the Route for messages, logging and counting the decision."""
+        started = time.perf_counter()
+        route, counts = self._select(messages, max_tokens)
+        observe("route.preflight", time.perf_counter() - started)
+        if route is None:
+            record(f"route.{self.name}.rejected")
+            raise PromptTooLargeError(max(counts.values()), self.capacity(), [model for model, _ in self.routes])
+        record(f"route.{self.name}.{route.model}")
+        capped = route.max_tokens < max_tokens
+        if capped:
+            record(f"route.{self.name}.capped")
+        print(f"Routing {self.name} prompt (~{route.prompt_tokens} tokens) to {route.model}, "
+              f"max_tokens {route.max_tokens}" + (f" (capped from {max_tokens})" if capped else ""))
+        return route
+
+    def fits(self, messages, max_tokens):
+        """Whether some model can take messages, without logging a decision."""
+        return self._select(messages, max_tokens)[0] is not None
+
+    def capacity(self):
+        """The largest prompt, in tokens, that some model in the route table can take."""
+        return max(self._capacity(model, ceiling) for model, ceiling in self.routes)
+
+    def _select(self, messages, max_tokens):
+        counts = {}
+        for model, ceiling in self.routes:
+            prompt_tokens = counts[model] = count_message_tokens(messages, model)
+            context, max_output = model_limits(model)
+            available = min(max_tokens, max_output, context - prompt_tokens)
+            if ceiling is not None and prompt_tokens > ceiling:
+                continue
+            if available >= min(max_tokens, MIN_OUTPUT_TOKENS):
+                return Route(model, prompt_tokens, available), counts
+        return None, counts
+
+    def _capacity(self, model, ceiling):
+        context, _ = model_limits(model)
+        capacity = context - MIN_OUTPUT_TOKENS
+        return min(capacity, ceiling) if ceiling is not None else capacity
+
+
+def observe_route(route, seconds):
+    """Time a routed completion under its model, so the latency of each route shows in the metrics."""
+    observe(f"route.{route.model}", seconds)
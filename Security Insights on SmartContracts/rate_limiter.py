@@ -0,0 +1,266 @@
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from instrumentation import observe, record
+
+
+# Request priorities: interactive work (CLI, Streamlit) is served before batch work
+INTERACTIVE = 0
+BATCH = 1
+
+# Upstream ceilings; 0 disables a limit. Etherscan's free tier allows 5 calls/s.
+ETHERSCAN_RPS = float(os.getenv("ETHERSCAN_RPS", "5"))
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+
+MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 30.0
+RETRYABLE_STATUS = frozenset((408, 409, 429, 500, 502, 503, 504))
+
+# After a 429 the allowed rate is halved, then recovers by this much per success
+MIN_RATE_SCALE = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(level):
+    """Run the enclosed upstream calls (including bound worker threads) at the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitedError(Exception):
+    """An upstream signalled throttling in its response body (e.g. Etherscan's 'Max rate limit reached')."""
+
+    status_code = 429
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate per second up to capacity."""
+
+    def __init__(self, rate, capacity):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until amount tokens are available (amount is clamped to the capacity)."""
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Process-wide throttle for one upstream.
+
+    Callers queue by priority (then arrival); only the head of the queue may
+    take from the buckets, so interactive requests overtake queued batch
+    work. A 429 halves the allowed rate and pauses the queue for Retry-After;
+    each success then recovers the rate gradually (AIMD).
+    """
+
+    def __init__(self, name, requests_per_second=0, tokens_per_second=0, burst_seconds=0.0):
+        self.name = name
+        self.buckets = {}
+        if requests_per_second:
+            # Without a burst allowance requests are evenly paced, which keeps a
+            # sliding one-second window upstream from ever seeing more than the cap
+            self.buckets["requests"] = TokenBucket(requests_per_second, max(requests_per_second * burst_seconds, 1))
+        if tokens_per_second:
+            # Token budgets are per minute upstream, so allow a minute's worth of burst
+            self.buckets["tokens"] = TokenBucket(tokens_per_second, tokens_per_second * 60)
+        self.scale = 1.0
+        self._paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def acquire(self, tokens=0, priority=None):
+        """Block until a request costing tokens may be sent."""
+        if not self.buckets:
+            return
+        ticket = (_priority.get() if priority is None else priority, next(self._sequence))
+        costs = {"requests": 1, "tokens": tokens}
+        started = time.monotonic()
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            # A new head may have arrived ahead of a sleeping one
+            self._condition.notify_all()
+            while True:
+                now = time.monotonic()
+                delay = None
+                if self._waiters[0] == ticket:
+                    for bucket in self.buckets.values():
+                        bucket.refill(now)
+                    delay = max([self._paused_until - now] + [
+                        bucket.wait_time(costs[kind]) for kind, bucket in self.buckets.items()
+                    ])
+                    if delay <= 0:
+                        for kind, bucket in self.buckets.items():
+                            bucket.take(costs[kind])
+                        heapq.heappop(self._waiters)
+                        self._condition.notify_all()
+                        break
+                self._condition.wait(delay)
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            observe("ratelimit.wait", waited, upstream=self.name)
+
+    def throttled(self, retry_after=None):
+        """The upstream answered 429: slow down and, with Retry-After, pause everyone."""
+        with self._condition:
+            self._set_scale(max(self.scale / 2, MIN_RATE_SCALE))
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._condition.notify_all()
+        record(f"ratelimit.{self.name}.throttled")
+
+    def succeeded(self):
+        if self.scale < 1.0:
+            with self._condition:
+                self._set_scale(min(self.scale + RATE_RECOVERY_STEP, 1.0))
+
+    def _set_scale(self, scale):
+        self.scale = scale
+        now = time.monotonic()
+        for bucket in self.buckets.values():
+            bucket.refill(now)
+            bucket.rate = bucket.base_rate * scale
+
+
+def status_of(error):
+    """HTTP status of a requests/OpenAI error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def retry_after_of(error):
+    """Retry-After seconds from an error or its HTTP response, if present."""
+    if getattr(error, "retry_after", None):
+        return float(error.retry_after)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error):
+    """Throttling, server errors, timeouts and dropped connections are worth retrying."""
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # requests and openai both name their transport errors this way
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def call_with_retries(limiter, fn, tokens=0, attempts=None):
+    """
+    Call fn() under limiter, retrying retryable failures.
+
+    Waits Retry-After when the upstream sends it and jittered exponential
+    backoff otherwise. The last error is re-raised once attempts run out.
+    """
+    attempts = attempts or MAX_ATTEMPTS
+    for attempt in range(attempts):
+        limiter.acquire(tokens)
+        try:
+            result = fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            retry_after = retry_after_of(e)
+            if status_of(e) == 429:
+                limiter.throttled(retry_after)
+            record(f"retry.{limiter.name}")
+            time.sleep(retry_after if retry_after else backoff_delay(attempt))
+            continue
+        limiter.succeeded()
+        return result
+
+
+async def acall_with_retries(limiter, fn, tokens=0, attempts=None):
+    """
+    Async variant of call_with_retries for coroutine functions (e.g. AsyncOpenAI calls).
+
+    The limiter is shared with synchronous callers, so waiting for it happens
+    on a worker thread (which inherits the caller's priority) rather than the
+    event loop.
+    """
+    # Imported here: only the HTTP API calls this, and asyncio would add ~45 ms to every CLI start
+    import asyncio
+
+    attempts = attempts or MAX_ATTEMPTS
+    for attempt in range(attempts):
+        if limiter.buckets:
+            await asyncio.to_thread(limiter.acquire, tokens)
+        try:
+            result = await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            retry_after = retry_after_of(e)
+            if status_of(e) == 429:
+                limiter.throttled(retry_after)
+            record(f"retry.{limiter.name}")
+            await asyncio.sleep(retry_after if retry_after else backoff_delay(attempt))
+            continue
+        limiter.succeeded()
+        return result
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Return the process-wide limiter for 'etherscan' or 'openai' (unknown names are unlimited)."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                if name == "etherscan":
+                    limiter = RateLimiter(name, requests_per_second=ETHERSCAN_RPS)
+                elif name == "openai":
+                    limiter = RateLimiter(name, requests_per_second=OPENAI_RPM / 60, tokens_per_second=OPENAI_TPM / 60)
+                else:
+                    limiter = RateLimiter(name)
+                _limiters[name] = limiter
+    return limiter
@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import itertools
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from instrumentation import span, record
+
+
+# Calls per JSON-RPC batch request and batch requests in flight at once
+DEFAULT_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+DEFAULT_CONCURRENCY = int(os.getenv("RPC_CONCURRENCY", "4"))
+
+# Provider pool tuning: latency smoothing, hedging and health checks
+EWMA_ALPHA = float(os.getenv("RPC_EWMA_ALPHA", "0.2"))
+# Send a duplicate request to the next endpoint when the first is this slow;
+# unset means the chosen endpoint's recent HEDGE_QUANTILE latency, "0" disables hedging
+HEDGE_AFTER_MS = os.getenv("RPC_HEDGE_MS")
+HEDGE_QUANTILE = 0.9
+MIN_HEDGE_MS = 20.0
+LATENCY_WINDOW = 64
+HEALTH_CHECK_INTERVAL = float(os.getenv("RPC_HEALTH_INTERVAL", "30"))
+MAX_COOLDOWN_SECONDS = 60.0
+
+# Expected eth_chainId per chain name; endpoints answering otherwise are dropped
+CHAIN_IDS = {"mainnet": 1, "sepolia": 11155111, "holesky": 17000}
+
+
+class RPCError(Exception):
+    """A JSON-RPC call that was answered with an error (or not answered at all)."""
+
+    def __init__(self, method, error):
+        self.method = method
+        self.code = error.get("code")
+        super().__init__(f"{method}: {error.get('message', error)}")
+
+
+def configured_endpoints(chain, defaults=()):
+    """
+    Endpoint URLs for chain from RPC_ENDPOINTS, followed by defaults.
+
+    RPC_ENDPOINTS is either a JSON object mapping chain names to URL lists,
+    e.g. {"sepolia": ["https://a", "https://b"], "mainnet": ["https://c"]},
+    or a comma-separated list of Sepolia URLs.
+    """
+    raw = os.getenv("RPC_ENDPOINTS", "").strip()
+    urls = []
+    if raw.startswith("{"):
+        urls = list(json.loads(raw).get(chain, []))
+    elif raw and chain == "sepolia":
+        urls = [url.strip() for url in raw.split(",") if url.strip()]
+    return list(dict.fromkeys(urls + [url for url in defaults if url]))
+
+
+class Endpoint:
+    """One RPC URL with its smoothed latency and health state."""
+
+    def __init__(self, url):
+        self.url = url
+        self.name = urlparse(url).netloc or url
+        self.latency = None          # EWMA of successful request latency, seconds
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0            # consecutive failures
+        self.cooldown_until = 0.0
+        self.disabled = False        # wrong chain: never used again
+
+    def healthy(self, now):
+        return not self.disabled and now >= self.cooldown_until
+
+    def succeeded(self, seconds):
+        self.latency = seconds if self.latency is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+        self.recent.append(seconds)
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def failed(self, retry_after=None):
+        self.failures += 1
+        backoff = retry_after if retry_after else min(2 ** (self.failures - 1), MAX_COOLDOWN_SECONDS)
+        self.cooldown_until = time.time() + backoff
+
+    def snapshot(self):
+        return {
+            "url": self.name,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "failures": self.failures,
+            "healthy": self.healthy(time.time()),
+            "disabled": self.disabled,
+        }
+
+
+class RPCProviderPool:
+    """
+    Routes JSON-RPC requests across several endpoints of one chain.
+
+    Each request goes to the healthy endpoint with the lowest moving-average
+    latency (endpoints not measured yet are tried first). Errors, timeouts
+    and 429/5xx answers put an endpoint in an exponentially growing cooldown
+    and the request fails over to the next one. When the chosen endpoint is
+    slower than its recent 90th percentile, a hedged duplicate goes to the
+    runner-up and the first answer wins; requests are read-only, so
+    duplicates are harmless.
+    A background thread re-checks every endpoint with eth_chainId.
+    """
+
+    def __init__(self, urls, session, chain="sepolia", timeout=30, hedge_after_ms=HEDGE_AFTER_MS,
+                 health_check_interval=HEALTH_CHECK_INTERVAL):
+        if not urls:
+            raise ValueError(f"No RPC endpoints configured for {chain}")
+        self.chain = chain
+        self.session = session
+        self.timeout = timeout
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge_after = None if hedge_after_ms in (None, "") else float(hedge_after_ms) / 1000
+        self._lock = threading.Lock()
+        # Hedged and failed-over attempts run here so the caller can wait on the first answer
+        self._attempts = ThreadPoolExecutor(max_workers=max(4 * len(urls), 4), thread_name_prefix=f"rpc-{chain}")
+        self._health_interval = health_check_interval
+        if health_check_interval and len(self.endpoints) > 1:
+            threading.Thread(target=self._health_loop, daemon=True, name=f"rpc-health-{chain}").start()
+
+    def ranked(self):
+        """Endpoints in the order requests should try them."""
+        now = time.time()
+        with self._lock:
+            healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy(now)]
+            if not healthy:
+                # Everything is cooling down: try the ones that recover first
+                usable = [endpoint for endpoint in self.endpoints if not endpoint.disabled]
+                return sorted(usable, key=lambda endpoint: endpoint.cooldown_until)
+            return sorted(healthy, key=lambda endpoint: -1 if endpoint.latency is None else endpoint.latency)
+
+    def _hedge_delay(self, endpoint, alternatives):
+        if not alternatives or self.hedge_after == 0:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            recent = sorted(endpoint.recent)
+        if len(recent) < 8:
+            return None
+        # A quantile rather than the EWMA, which a single stall inflates for a while
+        return max(recent[int(len(recent) * HEDGE_QUANTILE)], MIN_HEDGE_MS / 1000)
+
+    def request(self, payload):
+        """POST payload to the best endpoint, with hedging and failover; returns the decoded JSON answer."""
+        order = self.ranked()
+        if not order:
+            raise RPCError("request", {"message": f"every {self.chain} RPC endpoint is disabled"})
+        if len(order) == 1:
+            return self._attempt(order[0], payload)
+        pending = {}
+        hedged = False
+        errors = []
+
+        def launch():
+            endpoint = order.pop(0)
+            pending[self._attempts.submit(self._attempt, endpoint, payload)] = endpoint
+            return endpoint
+
+        current = launch()
+        while pending:
+            delay = None if hedged else self._hedge_delay(current, order)
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                record("rpc.hedged")
+                launch()
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if order and not pending:
+                        record("rpc.failover")
+                        current = launch()
+        raise errors[-1]
+
+    def _attempt(self, endpoint, payload):
+        start = time.perf_counter()
+        retry_after = None
+        try:
+            response = self.session.post(endpoint.url, json=payload, timeout=self.timeout)
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+            response.raise_for_status()
+            answer = response.json()
+        except Exception:
+            with self._lock:
+                endpoint.failed(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            raise
+        with self._lock:
+            endpoint.succeeded(time.perf_counter() - start)
+        return answer
+
+    def check_health(self):
+        """Probe every endpoint with eth_chainId, updating latency and health."""
+        expected = CHAIN_IDS.get(self.chain)
+        for endpoint in self.endpoints:
+            if endpoint.disabled:
+                continue
+            try:
+                answer = self._attempt(endpoint, {"jsonrpc": "2.0", "id": 0, "method": "eth_chainId", "params": []})
+            except Exception:
+                continue
+            if expected is not None and isinstance(answer, dict) and answer.get("result") is not None:
+                if int(answer["result"], 16) != expected:
+                    print(f"Warning: RPC endpoint {endpoint.name} is not on {self.chain}; disabling it")
+                    with self._lock:
+                        endpoint.disabled = True
+
+    def _health_loop(self):
+        while True:
+            self.check_health()
+            time.sleep(self._health_interval)
+
+    def stats(self):
+        with self._lock:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+class BatchRPCClient:
+    """
+    Minimal JSON-RPC client that sends calls as batch requests.
+
+    batch() splits a list of calls into requests of at most batch_size calls
+    and sends up to concurrency of them in parallel through the provider pool,
+    so reading code or storage for hundreds of addresses costs a few round
+    trips instead of hundreds.
+    """
+
+    def __init__(self, pool, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY):
+        self.pool = pool
+        self.batch_size = max(batch_size, 1)
+        self.concurrency = max(concurrency, 1)
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+
+    def call(self, method, params):
+        """Send a single call and return its result; raises RPCError on an error answer."""
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, RPCError):
+            raise result
+        return result
+
+    def batch(self, calls):
+        """
+        Send [(method, params), ...] and return the results in the same order.
+
+        A call answered with an error yields an RPCError in its place instead of
+        failing the others; transport errors on every endpoint raise.
+        """
+        chunks = [calls[start:start + self.batch_size] for start in range(0, len(calls), self.batch_size)]
+        if len(chunks) <= 1:
+            return self._send(chunks[0]) if chunks else []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks)), thread_name_prefix="rpc") as pool:
+            return [result for results in pool.map(self._send, chunks) for result in results]
+
+    def _send(self, calls):
+        with self._ids_lock:
+            payload = [
+                {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+                for method, params in calls
+            ]
+        with span("rpc.batch", calls=len(payload)):
+            answers = self.pool.request(payload)
+        record("rpc.requests")
+        record("rpc.calls", len(payload))
+
+        # Some servers answer a rejected batch with a single error object
+        if isinstance(answers, dict):
+            error = RPCError("batch", answers.get("error") or {"message": "unexpected response"})
+            return [error] * len(payload)
+        by_id = {answer.get("id"): answer for answer in answers if isinstance(answer, dict)}
+        results = []
+        for call in payload:
+            answer = by_id.get(call["id"])
+            if answer is None:
+                results.append(RPCError(call["method"], {"message": "missing from batch response"}))
+            elif answer.get("error"):
+                results.append(RPCError(call["method"], answer["error"]))
+            else:
+                results.append(answer.get("result"))
+        return results
@@ -0,0 +1,229 @@
+import os
+import time
+import zlib
+import sqlite3
+import difflib
+import threading
+from array import array
+from functools import lru_cache
+
+from solidity_lexer import code_tokens
+
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "SIMILARITY_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".similarity_index.sqlite3")
+)
+DEFAULT_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("SIMILARITY_INDEX_MAX_ENTRIES", "50000"))
+
+SHINGLE_SIZE = 5  # unpacked as five names in signature()
+# One-permutation MinHash: every shingle is hashed once and lands in one bin
+NUM_BINS = 128  # power of two, so the bin is the low bits of the hash
+# LSH banding: 16 bands of 8 bins find pairs above ~0.7 Jaccard with high probability
+BANDS = 16
+ROWS_PER_BAND = NUM_BINS // BANDS
+
+_MASK64 = (1 << 64) - 1
+_EMPTY_BIN = _MASK64
+
+
+def _mix64(value):
+    # splitmix64 finalizer: cheap, deterministic across processes (unlike hash(str))
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & _MASK64
+    return value ^ (value >> 31)
+
+
+def normalized_tokens(source):
+    """Code tokens with literals abstracted, so changed constants and messages barely move the signature."""
+    tokens = []
+    for kind, text, _ in code_tokens(source):
+        if kind == "number":
+            text = "0"
+        elif kind == "string":
+            text = '""'
+        tokens.append(zlib.crc32(text.encode("utf-8")))
+    return tokens
+
+
+@lru_cache(maxsize=64)
+def signature(source):
+    """
+    MinHash signature (NUM_BINS values) over SHINGLE_SIZE-token shingles of the source.
+
+    Memoized because a lookup is usually followed by indexing the same source.
+    """
+    tokens = normalized_tokens(source)
+    if len(tokens) < SHINGLE_SIZE:
+        tokens += [0] * (SHINGLE_SIZE - len(tokens))
+    bins = [_EMPTY_BIN] * NUM_BINS
+    prime, mask = 0x100000001B3, _MASK64
+    for a, b, c, d, e in zip(*(tokens[offset:] for offset in range(SHINGLE_SIZE))):
+        value = _mix64((((a * prime + b) * prime + c) * prime + d) * prime + e & mask)
+        slot = value & (NUM_BINS - 1)
+        if value < bins[slot]:
+            bins[slot] = value
+    return tuple(bins)
+
+
+def estimate_similarity(first, second):
+    """Estimated Jaccard similarity of two signatures (bins empty in both are ignored)."""
+    matching = compared = 0
+    for a, b in zip(first, second):
+        if a == _EMPTY_BIN and b == _EMPTY_BIN:
+            continue
+        compared += 1
+        matching += a == b
+    return matching / compared if compared else 0.0
+
+
+def band_keys(bins):
+    """One LSH bucket key per band; signed 63-bit so SQLite stores them as integers."""
+    keys = []
+    for band in range(BANDS):
+        value = band
+        for row in bins[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]:
+            value = _mix64(value ^ row)
+        keys.append(value >> 1)
+    return keys
+
+
+def source_diff(previous, current, max_lines=200):
+    """Unified diff from a previously indexed source to the current one."""
+    lines = list(difflib.unified_diff(
+        previous.splitlines(), current.splitlines(), "previous", "current", lineterm="", n=1
+    ))
+    if len(lines) > max_lines:
+        lines = lines[:max_lines] + [f"... ({len(lines) - max_lines} more diff lines)"]
+    return "\n".join(lines)
+
+
+class SimilarityIndex:
+    """
+    MinHash/LSH index over analyzed sources, stored in SQLite.
+
+    Each entry keeps the signature, the compressed source (for diffs) and the
+    explanation cache key of its analysis. Lookups touch only the LSH buckets
+    of the query, so they stay fast with tens of thousands of entries.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                signature BLOB NOT NULL,
+                source BLOB NOT NULL,
+                explanation_key TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER NOT NULL, entry_id INTEGER NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_band ON bands (band)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_entry ON bands (entry_id)")
+        self._unique_explanation_keys()
+        # Counted once here and kept up to date by add(), instead of a COUNT(*) per insert
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _unique_explanation_keys(self):
+        # Indexes created before entries were unique may hold duplicates; keep the newest of each
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'entries_explanation_key'"
+        ).fetchone()
+        if exists:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM entries WHERE id NOT IN (SELECT MAX(id) FROM entries GROUP BY explanation_key)")
+            self._conn.execute("DELETE FROM bands WHERE entry_id NOT IN (SELECT id FROM entries)")
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS entries_explanation_key ON entries (explanation_key)")
+            self._conn.execute("COMMIT")
+
+    def add(self, source, explanation_key):
+        """Index source under the cache key of its explanation; a key that is already indexed is left as is."""
+        bins = signature(source)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (signature, source, explanation_key, created_at) VALUES (?, ?, ?, ?)",
+                (array("Q", bins).tobytes(), zlib.compress(source.encode("utf-8")), explanation_key, time.time())
+            )
+            if cursor.rowcount:
+                self._conn.executemany(
+                    "INSERT INTO bands (band, entry_id) VALUES (?, ?)",
+                    [(key, cursor.lastrowid) for key in band_keys(bins)]
+                )
+                self._evict()
+            self._conn.execute("COMMIT")
+
+    def _evict(self):
+        self._count += 1
+        if self._count <= self.max_entries:
+            return
+        # Other processes may share the file, so recount before deleting
+        count = self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # Oldest first: ids only grow
+        cutoff = self._conn.execute(
+            "SELECT id FROM entries ORDER BY id ASC LIMIT 1 OFFSET ?", (count - self.max_entries - 1,)
+        ).fetchone()[0]
+        self._conn.execute("DELETE FROM entries WHERE id <= ?", (cutoff,))
+        self._conn.execute("DELETE FROM bands WHERE entry_id <= ?", (cutoff,))
+        self._count = self.max_entries
+
+    def query(self, source, threshold=DEFAULT_THRESHOLD):
+        """
+        Return candidates at or above threshold, most similar first.
+
+        Each candidate is a dict with 'similarity', 'explanation_key' and the
+        previously indexed 'source'.
+        """
+        bins = signature(source)
+        keys = band_keys(bins)
+        with self._lock:
+            ids = {row[0] for row in self._conn.execute(
+                f"SELECT entry_id FROM bands WHERE band IN ({','.join('?' * len(keys))})", keys
+            )}
+            rows = self._conn.execute(
+                f"SELECT id, signature, source, explanation_key FROM entries WHERE id IN ({','.join('?' * len(ids))})",
+                list(ids)
+            ).fetchall() if ids else []
+
+        matches = []
+        for _, stored, compressed, explanation_key in rows:
+            similarity = estimate_similarity(bins, array("Q", stored))
+            if similarity >= threshold:
+                matches.append({
+                    "similarity": similarity,
+                    "explanation_key": explanation_key,
+                    "source": zlib.decompress(compressed).decode("utf-8"),
+                })
+        matches.sort(key=lambda match: match["similarity"], reverse=True)
+        return matches
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Return the process-wide similarity index."""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = SimilarityIndex()
+    return _default_index
@@ -0,0 +1,120 @@
+import threading
+
+from instrumentation import bind, record
+
+
+class _Flight:
+    """One in-flight call: its result or error, or the fragments it has streamed so far."""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.parts = []
+        self.done = False
+        self._condition = threading.Condition()
+
+    def append(self, fragment):
+        with self._condition:
+            self.parts.append(fragment)
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self.done = True
+            self._condition.notify_all()
+
+    def wait(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self.done)
+
+    def fragments(self):
+        """Yield every fragment from the first one, blocking for new ones until the flight is done."""
+        index = 0
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self.done or index < len(self.parts))
+                pending = self.parts[index:]
+                index += len(pending)
+                finished = self.done and index == len(self.parts)
+            yield from pending
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SingleFlight:
+    """
+    Process-wide duplicate suppression for in-flight calls.
+
+    Concurrent calls with the same key share one execution: the first caller
+    runs it and the others wait for its result (or exception). Streams are
+    shared too; every caller receives all fragments from the start. Once a
+    call finishes its key is released, so later calls run again (by then the
+    result is normally in a cache).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (flight, leader) for key, registering a new flight if none is running."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                return flight, True
+        record(f"singleflight.{self.name}.shared")
+        return flight, False
+
+    def _release(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish()
+
+    def do(self, key, fn):
+        """Return fn(), or the result of the identical call already in flight."""
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                flight.result = fn()
+            except Exception as e:
+                flight.error = e
+            finally:
+                self._release(key, flight)
+        else:
+            flight.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, key, fn):
+        """
+        Iterate the fragments of fn(), shared with the identical stream already in flight.
+
+        The stream is drained on its own thread, so it completes (and caches its
+        result) even if the caller that started it stops reading.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            # bind() keeps the pump's spans in the starting caller's trace
+            threading.Thread(target=bind(self._pump), args=(key, flight, fn), daemon=True,
+                             name=f"singleflight-{self.name}").start()
+        return flight.fragments()
+
+    def _pump(self, key, flight, fn):
+        try:
+            for fragment in fn():
+                flight.append(fragment)
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._release(key, flight)
+
+    def in_flight(self):
+        """Number of distinct calls currently running."""
+        with self._lock:
+            return len(self._flights)
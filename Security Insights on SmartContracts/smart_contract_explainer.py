@@ -1,64 +1,247 @@
 import os
 import sys
 import json
+import time
 import argparse
+import itertools
+import contextlib
+import threading
+from functools import partial
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from web3 import Web3
-import requests
-from openai import OpenAI
-import hashlib
-import openai
+from address_utils import is_address
+from rpc_client import BatchRPCClient, RPCProviderPool, RPCError, configured_endpoints
+from explanation_cache import get_cache, make_cache_key
+from source_store import get_source_store
+from source_chunker import chunk_sources, estimate_tokens
+from library_index import strip_known_libraries
+from abi_compactor import compact_abi
+from contract_facts import extract_facts, format_fact_sheet, key_function_source
+from source_minifier import minify_files, DEFAULT_MINIFY_LEVEL, MINIFY_LEVELS
+from similarity_index import get_similarity_index, source_diff
+from source_units import extract_units, diff_units
+from bytecode_index import (
+    get_bytecode_index, code_hash, to_bytes, minimal_proxy_target, may_delegate, slot_address,
+    EIP1967_IMPLEMENTATION_SLOT
+)
+from rate_limiter import get_limiter, call_with_retries, RateLimitedError
+from model_router import ModelRouter, PromptTooLargeError, observe_route, count_message_tokens
+from single_flight import SingleFlight
+from instrumentation import span, observe, record, bind, trace, format_breakdown, METRICS
 
 
 # Load environment variables from .env file
 load_dotenv()
 
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-client = openai
-
-
-# Initialize Web3 with Sepolia provider
 INFURA_API_KEY = os.getenv("INFURA_API_KEY")
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
 
-# If no Infura key is provided, use a fallback public endpoint
-if INFURA_API_KEY:
-    w3 = Web3(Web3.HTTPProvider(f"https://sepolia.infura.io/v3/{INFURA_API_KEY}"))
-else:
-    # Fallback to Alchemy public endpoint or another public provider
-    w3 = Web3(Web3.HTTPProvider("https://eth-sepolia.g.alchemy.com/v2/demo"))
+# web3, requests and OpenAI are heavy imports, so their clients are created on
+# first use (see get_web3, get_http_session and get_openai_client) and reused.
+# Chain reads use the batching client from get_rpc_client, so no run imports web3.
+_web3 = None
+_openai_client = None
+_http_session = None
+_rpc_clients = {}
+_clients_lock = threading.Lock()
+
+# Identical requests in flight at the same time (e.g. many Streamlit sessions
+# analyzing one popular address) share a single upstream call
+_etherscan_flights = SingleFlight("etherscan")
+_rpc_flights = SingleFlight("rpc")
+_openai_flights = SingleFlight("openai")
+
+# Etherscan API for Sepolia (overridable, e.g. to point benchmarks at a local stand-in)
+ETHERSCAN_API_URL = os.getenv("ETHERSCAN_API_URL", "https://api-sepolia.etherscan.io/api")
+
+# Explicit JSON-RPC endpoint; takes precedence over the Infura/Alchemy defaults
+SEPOLIA_RPC_URL = os.getenv("SEPOLIA_RPC_URL")
+
+# Model and prompt version are part of the cache key, so bump PROMPT_VERSION
+# whenever the prompt templates or guardrails change
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+PROMPT_VERSION = "1"
+# Models prompts are routed to by size, cheapest first (see model_router.parse_routes),
+# e.g. "gpt-4o-mini@8000,gpt-4o". Cache keys include the table, so changing it is like
+# changing the model.
+EXPLAINER_MODEL_ROUTES = os.getenv("EXPLAINER_MODEL_ROUTES", OPENAI_MODEL)
+EXPLANATION_MAX_TOKENS = 4000
+explainer_router = ModelRouter("explainer", EXPLAINER_MODEL_ROUTES)
+CACHE_ENABLED = os.getenv("EXPLANATION_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+# How aggressively sources are compacted before prompting (see source_minifier)
+MINIFY_LEVEL = DEFAULT_MINIFY_LEVEL
+
+# Send the fact sheet and key functions instead of the full source, even when it would fit
+FACTS_ONLY = os.getenv("EXPLAINER_FACTS_ONLY", "").lower() in ("1", "true", "yes")
 
-# Etherscan API for Sepolia
-ETHERSCAN_API_URL = "https://api-sepolia.etherscan.io/api"
+# Reuse of analyses of near-duplicate sources (see similarity_index):
+#   delta     have the model update the earlier explanation for the diff only (default)
+#   auto      annotate when few lines changed, otherwise send a delta prompt
+#   annotate  return the earlier explanation with the source diff appended, without a model call;
+#             the explanation text itself is not updated, so it is opt-in
+#   off       always analyze from scratch
+SIMILARITY_REUSE = os.getenv("SIMILARITY_REUSE", "delta").lower()
+SIMILARITY_ANNOTATE_MAX_LINES = int(os.getenv("SIMILARITY_ANNOTATE_MAX_LINES", "12"))
+
+# Explain sources as a contract-level overview plus one section per function, each
+# cached on its own, so re-analyzing an edited source only sends what changed
+# (see analyze_source_incrementally). Also the default of the Streamlit sidebar toggle.
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "").lower() in ("1", "true", "yes")
+OVERVIEW_MAX_TOKENS = 2000
+UNIT_MAX_TOKENS = 300
+
+# Explain sources one section at a time, all sections concurrently over the same
+# context, each cached on its own (see analyze_source_by_section)
+SECTIONED_ANALYSIS = os.getenv("SECTIONED_ANALYSIS", "").lower() in ("1", "true", "yes")
+# (heading, what the section covers, max_tokens) in the order they are assembled
+ANALYSIS_SECTIONS = [
+    ("Overall Purpose", "Overall purpose of the contract", 600),
+    ("Key Functions", "Key functions and their purposes", 1000),
+    ("Access Control", "Access control and permissions", 600),
+    ("State Variables", "State variables and their significance", 700),
+    ("Events", "Events and their significance", 500),
+    ("Security", "Security patterns and potential concerns", 1000),
+    ("Inheritance and Interfaces", "Inheritance and interfaces used", 500),
+]
+
+# Read runtime code before fetching source, to follow proxies and reuse analyses of
+# identical bytecode (see resolve_contract)
+BYTECODE_DEDUP = os.getenv("BYTECODE_DEDUP", "1").lower() not in ("0", "false", "no")
+MAX_PROXY_HOPS = 3
+# Resolutions that led to verified source are kept in the bytecode index, so repeat
+# lookups read no code; those through an EIP-1967 proxy, whose implementation can be
+# upgraded, are re-read after this many seconds
+PROXY_RESOLUTION_TTL = int(os.getenv("PROXY_RESOLUTION_TTL", "3600"))
+
+# address: the contract to explain; code_hash: its runtime code hash (None without code);
+# upgradeable: reached through an EIP-1967 proxy; resolved: the code was read (not an
+# RPC failure or BYTECODE_DEDUP off)
+Resolution = namedtuple("Resolution", "address code_hash notes upgradeable resolved")
+
+MAP_SUMMARY_MAX_TOKENS = 600
+# Sources above this estimated size are analyzed with map-reduce over chunks; it also caps
+# the merged summaries in the reduce prompt, which must hold at least two of them
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.getenv("MAP_REDUCE_THRESHOLD_TOKENS", "12000"))
+if MAP_REDUCE_THRESHOLD_TOKENS < 2 * MAP_SUMMARY_MAX_TOKENS:
+    raise ValueError(f"MAP_REDUCE_THRESHOLD_TOKENS must be at least {2 * MAP_SUMMARY_MAX_TOKENS} "
+                     f"(two chunk summaries), got {MAP_REDUCE_THRESHOLD_TOKENS}")
+MAP_REDUCE_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", "6000"))
+MAP_REDUCE_WORKERS = int(os.getenv("MAP_REDUCE_WORKERS", "6"))
+# At most this much of the reduce prompt goes to the fact sheet; larger sheets are cut
+# down to an outline (see reduce_fact_sheet)
+REDUCE_FACTS_MAX_TOKENS = int(os.getenv("REDUCE_FACTS_MAX_TOKENS", "8000"))
 
 def is_valid_address(address):
     """Check if the provided string is a valid Ethereum address."""
-    return w3.is_address(address)
+    return is_address(address)
 
-def get_contract_abi(contract_address):
-    """Fetch contract ABI from Etherscan."""
-    if not ETHERSCAN_API_KEY:
-        print("Warning: ETHERSCAN_API_KEY not set. Some features may be limited.")
-    
-    params = {
-        "module": "contract",
-        "action": "getabi",
-        "address": contract_address,
-        "apikey": ETHERSCAN_API_KEY
-    }
-    
-    response = requests.get(ETHERSCAN_API_URL, params=params)
-    data = response.json()
-    
-    if data["status"] == "1":
-        return json.loads(data["result"])
-    else:
-        print(f"Error fetching ABI: {data['result']}")
-        return None
+def get_web3():
+    """Return the shared Web3 client for Sepolia, creating it on first use."""
+    global _web3
+    if _web3 is None:
+        with _clients_lock:
+            if _web3 is None:
+                from web3 import Web3
 
-def get_contract_source_code(contract_address):
-    """Fetch contract source code from Etherscan."""
+                _web3 = Web3(Web3.HTTPProvider(get_rpc_url()))
+    return _web3
+
+def get_rpc_url():
+    """The preferred Sepolia JSON-RPC endpoint (see get_rpc_endpoints)."""
+    return get_rpc_endpoints()[0]
+
+def get_rpc_endpoints(chain="sepolia"):
+    """
+    JSON-RPC endpoints for chain, best first.
+
+    RPC_ENDPOINTS entries come first. For Sepolia, SEPOLIA_RPC_URL and Infura
+    (with INFURA_API_KEY) follow; the rate-limited public Alchemy endpoint is
+    only used when nothing else is configured.
+    """
+    defaults = []
+    if chain == "sepolia":
+        defaults = [SEPOLIA_RPC_URL, f"https://sepolia.infura.io/v3/{INFURA_API_KEY}" if INFURA_API_KEY else None]
+    endpoints = configured_endpoints(chain, defaults)
+    if not endpoints and chain == "sepolia":
+        # Fallback to Alchemy public endpoint or another public provider
+        endpoints = ["https://eth-sepolia.g.alchemy.com/v2/demo"]
+    return endpoints
+
+def get_rpc_client(chain="sepolia"):
+    """
+    Return the shared batching JSON-RPC client for chain reads on chain.
+
+    Requests are routed over a pool of the chain's endpoints (see
+    RPCProviderPool). Proxy resolution and code reads go through this rather
+    than web3, so they can be batched and address runs never import web3.
+    """
+    client = _rpc_clients.get(chain)
+    if client is None:
+        session = get_http_session()
+        with _clients_lock:
+            client = _rpc_clients.get(chain)
+            if client is None:
+                pool = RPCProviderPool(get_rpc_endpoints(chain), session, chain=chain)
+                client = _rpc_clients[chain] = BatchRPCClient(pool)
+    return client
+
+def get_openai_client():
+    """Return the shared OpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        with _clients_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                # OPENAI_BASE_URL, if set, is picked up by the client itself; retries
+                # are left to call_with_retries so they share the process-wide limiter
+                _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _openai_client
+
+def get_http_session():
+    """Return a shared keep-alive HTTP session so repeat requests reuse pooled connections."""
+    global _http_session
+    if _http_session is None:
+        with _clients_lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+def __getattr__(name):
+    # Backwards compatibility for code that used the old module-level clients
+    if name == "w3":
+        return get_web3()
+    if name == "client":
+        return get_openai_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def fetch_contract_metadata(contract_address):
+    """
+    Fetch verified source code and ABI from Etherscan in a single getsourcecode call.
+
+    Verified source for an address never changes, so results are persisted in the
+    local source store and later lookups do not touch the network. Concurrent
+    lookups of the same address share one Etherscan call.
+    """
+    store = get_source_store()
+    metadata = store.get(contract_address)
+    if metadata is not None:
+        record("source_store.hit")
+        return metadata
+    record("source_store.miss")
+    return _etherscan_flights.do(contract_address.lower(), lambda: _fetch_contract_metadata(contract_address, store))
+
+def _fetch_contract_metadata(contract_address, store):
     if not ETHERSCAN_API_KEY:
         print("Warning: ETHERSCAN_API_KEY not set. Some features may be limited.")
     
@@ -69,49 +252,231 @@ def get_contract_source_code(contract_address):
         "apikey": ETHERSCAN_API_KEY
     }
     
-    response = requests.get(ETHERSCAN_API_URL, params=params)
-    data = response.json()
+    def request():
+        response = get_http_session().get(ETHERSCAN_API_URL, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        # Etherscan reports its per-second cap in the body of a 200 response
+        if data["status"] != "1" and "rate limit" in str(data["result"]).lower():
+            raise RateLimitedError(f"Etherscan: {data['result']}")
+        record("etherscan.bytes", len(response.content))
+        return data
+
+    with span("etherscan.fetch", address=contract_address):
+        data = call_with_retries(get_limiter("etherscan"), request)
     
-    if data["status"] == "1" and data["result"]:
-        return data["result"][0]["SourceCode"]
-    else:
+    if data["status"] != "1" or not data["result"]:
         print(f"Error fetching source code: {data['result']}")
         return None
 
-def analyze_contract_from_address(contract_address):
+    entry = data["result"][0]
+    try:
+        # Unverified contracts report "Contract source code not verified" here
+        abi = json.loads(entry.get("ABI") or "")
+    except json.JSONDecodeError:
+        abi = None
+
+    metadata = {
+        "source_code": entry.get("SourceCode") or None,
+        "abi": abi,
+        "contract_name": entry.get("ContractName") or None,
+        "compiler_version": entry.get("CompilerVersion") or None
+    }
+    if metadata["source_code"]:
+        store.put(contract_address, metadata)
+    return metadata
+
+def get_contract_abi(contract_address):
+    """Fetch contract ABI from Etherscan."""
+    metadata = fetch_contract_metadata(contract_address)
+    if metadata and metadata["abi"]:
+        return metadata["abi"]
+    print("Error fetching ABI: contract ABI is not available")
+    return None
+
+def get_contract_source_code(contract_address):
+    """Fetch contract source code from Etherscan."""
+    metadata = fetch_contract_metadata(contract_address)
+    return metadata["source_code"] if metadata else None
+
+def analyze_contract_from_address(contract_address, stream=False):
     """Analyze a contract from its address on Sepolia testnet."""
     print(f"Analyzing contract at address: {contract_address}")
     
-    # Fetch contract ABI
-    abi = get_contract_abi(contract_address)
-    
-    # Fetch contract source code
-    source_code = get_contract_source_code(contract_address)
+    # Source code and ABI come back from a single Etherscan call
+    target, metadata, notes = fetch_resolved_metadata(contract_address)
+    abi = metadata.get("abi")
+    source_code = metadata.get("source_code")
     
     if not source_code:
         if abi:
-            return analyze_contract_from_abi(abi, contract_address)
+            return _with_notes(notes, analyze_contract_from_abi(abi, target, stream=stream), stream)
         else:
-            return "Could not fetch contract source code or ABI. Please check the address or your API keys."
+            return _respond("Could not fetch contract source code or ABI. Please check the address or your API keys.", stream)
     
-    return analyze_contract_from_source(source_code, abi, contract_address)
+    return _with_notes(notes, analyze_contract_from_source(source_code, abi, target, stream=stream), stream)
+
+def fetch_resolved_metadata(contract_address, resolution=None):
+    """
+    Fetch metadata for the contract that explains contract_address (see resolve_contract).
+
+    resolution is a precomputed resolve_contracts() entry, if any. Returns
+    (address, metadata, notes), with metadata {} when nothing was found.
+    Verified runtime code and the resolution that led to it are recorded in
+    the bytecode index.
+    """
+    address, bytecode_hash, notes, upgradeable, resolved = resolution or resolve_contract(contract_address)
+    metadata = fetch_contract_metadata(address) or {}
+    if resolved and metadata.get("source_code"):
+        index = get_bytecode_index()
+        if bytecode_hash:
+            index.put(bytecode_hash, address)
+        if index.get_resolution(contract_address, PROXY_RESOLUTION_TTL) is None:
+            index.put_resolution(contract_address, address, bytecode_hash, notes, upgradeable)
+    return address, metadata, notes
+
+def resolve_contract(contract_address):
+    """
+    Find the address whose verified source explains contract_address.
+
+    Runtime code is read over JSON-RPC. EIP-1167 minimal proxies and EIP-1967
+    proxies are followed to their implementation, and code whose
+    metadata-stripped hash matches a contract analyzed before is redirected to
+    that contract, so clones reuse its source and cached explanation.
+    Returns a Resolution; on RPC errors, or with BYTECODE_DEDUP off, the
+    address is returned unchanged with no hash. Addresses resolved before
+    (see PROXY_RESOLUTION_TTL) are answered from the bytecode index without
+    any RPC call.
+    """
+    return _rpc_flights.do(contract_address.lower(), lambda: resolve_contracts([contract_address])[0])
+
+def resolve_contracts(addresses):
+    """
+    resolve_contract for many addresses at once.
 
-def analyze_contract_from_abi(abi, contract_address=None):
+    Each proxy hop reads the code (and, for possible proxies, the EIP-1967
+    slot) of every pending address in batched JSON-RPC requests, so hundreds
+    of addresses take a few round trips.
+    """
+    if not BYTECODE_DEDUP or not addresses:
+        return [Resolution(address, None, [], False, False) for address in addresses]
+    index = get_bytecode_index()
+    resolved = {}
+    for address in addresses:
+        stored = index.get_resolution(address, PROXY_RESOLUTION_TTL)
+        if stored is not None:
+            resolved[address] = Resolution(*stored, resolved=True)
+            for note in resolved[address].notes:
+                print(note)
+    if resolved:
+        record("resolution.hit", len(resolved))
+    missing = [address for address in addresses if address not in resolved]
+    if missing:
+        record("resolution.miss", len(missing))
+        resolved.update(zip(missing, _resolve_over_rpc(missing, index)))
+    return [resolved[address] for address in addresses]
+
+def _resolve_over_rpc(addresses, index):
+    states = [{"address": address, "notes": [], "code": b"", "failed": False, "upgradeable": False}
+              for address in addresses]
+    client = get_rpc_client()
+    try:
+        with span("rpc.resolve", addresses=len(addresses)):
+            pending = states
+            for hop in range(MAX_PROXY_HOPS + 1):
+                codes = client.batch([("eth_getCode", [state["address"], "latest"]) for state in pending])
+                following, slot_reads = [], []
+                for state, code in zip(pending, codes):
+                    if isinstance(code, RPCError):
+                        print(f"Warning: could not read runtime code of {state['address']} ({code})")
+                        state["failed"] = True
+                        continue
+                    state["code"] = to_bytes(code)
+                    if not state["code"] or hop == MAX_PROXY_HOPS:
+                        continue
+                    implementation = minimal_proxy_target(state["code"])
+                    if implementation:
+                        following.append((state, "an EIP-1167 minimal proxy", implementation))
+                    elif may_delegate(state["code"]):
+                        slot_reads.append(state)
+
+                slots = client.batch([
+                    ("eth_getStorageAt", [state["address"], hex(EIP1967_IMPLEMENTATION_SLOT), "latest"])
+                    for state in slot_reads
+                ])
+                for state, value in zip(slot_reads, slots):
+                    implementation = None if isinstance(value, RPCError) else slot_address(value)
+                    if implementation:
+                        state["upgradeable"] = True
+                        following.append((state, "an EIP-1967 proxy", implementation))
+
+                for state, kind, implementation in following:
+                    state["notes"].append(
+                        f"{state['address']} is {kind}; this analysis covers its implementation at {implementation}."
+                    )
+                    state["address"] = implementation
+                pending = [state for state, _, _ in following]
+                if not pending:
+                    break
+    except Exception as e:
+        print(f"Warning: could not read runtime code ({e}); analyzing the addresses as given")
+        return [Resolution(address, None, [], False, False) for address in addresses]
+
+    results = []
+    for original, state in zip(addresses, states):
+        if state["failed"]:
+            results.append(Resolution(original, None, [], False, False))
+            continue
+        address, notes = state["address"], state["notes"]
+        if not state["code"]:
+            # No code on chain (or not a contract): let Etherscan decide
+            results.append(Resolution(address, None, notes, state["upgradeable"], True))
+            continue
+        bytecode_hash = code_hash(state["code"])
+        known = index.get(bytecode_hash)
+        if known and known != address.lower():
+            record("bytecode_index.hit")
+            notes.append(f"The runtime bytecode of {address} matches {known}, analyzed earlier; "
+                         "that contract's verified source is used.")
+            address = known
+        elif not known:
+            record("bytecode_index.miss")
+        for note in notes:
+            print(note)
+        results.append(Resolution(address, bytecode_hash, notes, state["upgradeable"], True))
+    return results
+
+def _with_notes(notes, result, stream=False):
+    """Prefix an explanation (string or stream) with resolution notes as Markdown quotes."""
+    if not notes:
+        return result
+    header = "\n".join(f"> {note}" for note in notes) + "\n\n"
+    if stream:
+        return itertools.chain([header], result)
+    if result.startswith("Error generating explanation:"):
+        return result
+    return header + result
+
+def analyze_contract_from_abi(abi, contract_address=None, stream=False):
     """Generate an explanation from the contract ABI when source code is not available."""
     if not abi:
-        return "No ABI available for analysis."
+        return _respond("No ABI available for analysis.", stream)
     
-    contract_info = {
-        "address": contract_address,
-        "abi": abi
-    }
-    
-    # Create prompt for the LLM
-    prompt = f"""
+    return explain_prompt(build_abi_prompt(abi), stream)
+
+def build_abi_prompt(abi):
+    """Create the LLM prompt for an ABI-only analysis."""
+    # One signature per line instead of pretty-printed JSON
+    signatures = compact_abi(abi)
+    before, after = estimate_tokens(json.dumps(abi, indent=2)), estimate_tokens(signatures)
+    print(f"Compacted ABI: {before} -> {after} estimated tokens")
+    record("abi.tokens_saved", before - after)
+    signatures = signatures.replace("\n", "\n    ")
+    return f"""
     Analyze this smart contract ABI and provide a detailed technical summary.
     
-    Contract ABI:
-    {json.dumps(abi, indent=2)}
+    Contract ABI (one entry per line, Solidity signature form):
+    {signatures}
     
     Your analysis should include:
     1. Overall purpose of the contract (based on function signatures)
@@ -122,56 +487,501 @@ def analyze_contract_from_abi(abi, contract_address=None):
     
     Provide the information in a clear, organized format suitable for non-technical users.
     """
-    
-    return generate_explanation_with_openai(prompt)
 
-def analyze_contract_from_source(source_code, abi=None, contract_address=None):
-    """Analyze a contract from its source code."""
+def analyze_contract_from_source(source_code, abi=None, contract_address=None, stream=False, incremental=None,
+                                 sectioned=None):
+    """
+    Analyze a contract from its source code.
+
+    With incremental it is explained function by function (see
+    INCREMENTAL_ANALYSIS), otherwise with sectioned one section at a time
+    (see SECTIONED_ANALYSIS).
+    """
     if not source_code:
-        return "No source code provided for analysis."
+        return _respond("No source code provided for analysis.", stream)
     
+    with span("source.unpack"):
+        files = load_source_files(source_code)
+
+    if INCREMENTAL_ANALYSIS if incremental is None else incremental:
+        return analyze_source_incrementally(files, stream)
+    if SECTIONED_ANALYSIS if sectioned is None else sectioned:
+        return analyze_source_by_section(files, stream)
+    with span("prompt.build"):
+        prompt = build_files_prompt(files)
+    return explain_files(files, prompt, stream)
+
+def explain_files(files, prompt, stream=False):
+    """
+    Explain parsed source files given their single-call prompt.
+
+    A source that nearly duplicates one analyzed before reuses that analysis
+    unless its own explanation is already cached. Sources too large for one
+    prompt (prompt is None) are summarized chunk by chunk and merged.
+    """
+    source_code = flatten_source_files(files)
+    if prompt is None or not _is_cached(prompt):
+        reused = reuse_similar_analysis(source_code, stream)
+        if reused is not None:
+            return reused
+
+    if prompt is None:
+        return analyze_large_source(files, stream=stream)
+    return explain_and_remember(source_code, prompt, stream)
+
+def _is_cached(prompt):
+    return CACHE_ENABLED and get_cache().contains(make_cache_key(prompt, EXPLAINER_MODEL_ROUTES, PROMPT_VERSION))
+
+def reuse_similar_analysis(source_code, stream=False):
+    """
+    Reuse the explanation of a near-duplicate source, or return None.
+
+    By default the differences are sent as a delta prompt (earlier
+    explanation plus diff) instead of the full source; with annotate or auto
+    small differences are appended to the earlier explanation as a diff
+    instead. See SIMILARITY_REUSE.
+    """
+    if not CACHE_ENABLED or SIMILARITY_REUSE == "off":
+        return None
+    with span("similarity.lookup"):
+        matches = get_similarity_index().query(source_code)
+    for match in matches:
+        previous = get_cache().get(match["explanation_key"])
+        if previous is None:
+            # The earlier explanation was evicted or never completed
+            continue
+        diff = source_diff(match["source"], source_code)
+        changed = sum(1 for line in diff.splitlines()[2:] if line[:1] in ("+", "-"))
+        record("similarity.hit")
+        print(f"Near-duplicate of an earlier analysis ({match['similarity']:.0%} similar, {changed} changed lines)")
+        if SIMILARITY_REUSE == "annotate" or (SIMILARITY_REUSE == "auto" and changed <= SIMILARITY_ANNOTATE_MAX_LINES):
+            return _respond(annotate_reused_explanation(previous, match["similarity"], diff), stream)
+        prompt = build_delta_prompt(previous, diff)
+        return explain_and_remember(source_code, prompt, stream)
+    record("similarity.miss")
+    return None
+
+def explain_and_remember(source_code, prompt, stream=False):
+    """
+    Explain prompt and, once a fresh explanation is cached, index source_code for near-duplicate reuse.
+
+    Cache hits are not indexed again and failed generations (which are not
+    cached) are not indexed at all.
+    """
+    if _is_cached(prompt):
+        return explain_prompt(prompt, stream)
+    result = explain_prompt(prompt, stream)
+    if stream:
+        return _remember_after(result, source_code, prompt)
+    _remember_if_cached(source_code, prompt)
+    return result
+
+def _remember_after(fragments, source_code, prompt):
+    yield from fragments
+    _remember_if_cached(source_code, prompt)
+
+def _remember_if_cached(source_code, prompt):
+    if _is_cached(prompt):
+        remember_analysis(source_code, prompt)
+
+def remember_analysis(source_code, prompt, cache_key=None):
+    """Index source_code so later near-duplicates can reuse the explanation of prompt (or stored under cache_key)."""
+    if not CACHE_ENABLED or SIMILARITY_REUSE == "off":
+        return
+    with span("similarity.index"):
+        get_similarity_index().add(source_code, cache_key or make_cache_key(prompt, EXPLAINER_MODEL_ROUTES, PROMPT_VERSION))
+
+def annotate_reused_explanation(explanation, similarity, diff):
+    """Append a note (and the source diff, if any) to an explanation reused from a near-duplicate."""
+    if not diff:
+        return f"{explanation}\n\n---\n_This analysis was reused: the code is identical to a contract analyzed earlier._\n"
+    return f"""{explanation}
+
+---
+_This analysis was reused from a contract analyzed earlier whose code is {similarity:.0%} similar.
+It does not cover the differences below; review them separately._
+
+```diff
+{diff}
+```
+"""
+
+def analyze_source_incrementally(files, stream=False):
+    """
+    Explain parsed source files as an overview plus one section per function.
+
+    The overview sees the contract-level skeleton (function bodies elided) and
+    each function is explained on its own, all concurrently. Every section is
+    cached under its own prompt, so after an edit only the changed or added
+    functions (and the overview, if contract-level code changed) go to the
+    model; the rest are spliced in from the cache. The assembled explanation
+    is cached under the whole source.
+    """
+    source_code = flatten_source_files(files)
+    with span("units.split"):
+        units, skeleton = extract_units(files)
+    if not units:
+        # Interfaces and declarations only: nothing to split
+        with span("prompt.build"):
+            prompt = build_files_prompt(files)
+        return explain_files(files, prompt, stream)
+
+    full_key = make_cache_key(source_code, EXPLAINER_MODEL_ROUTES, f"{PROMPT_VERSION}:units")
+    if CACHE_ENABLED:
+        cached = get_cache().get(full_key)
+        if cached is not None:
+            record("explanation_cache.hit")
+            return _respond(cached, stream)
+
+    with span("prompt.build"):
+        fact_sheet = format_fact_sheet(extract_facts(files), show_lines=False)
+        sections = [(build_overview_prompt(skeleton, fact_sheet), OVERVIEW_MAX_TOKENS)]
+        sections += [(build_unit_prompt(unit), UNIT_MAX_TOKENS) for unit in units]
+    reused = sum(_is_cached(prompt) for prompt, _ in sections)
+    print(f"Function-level analysis: {reused} of {len(sections)} sections cached, "
+          f"{len(sections) - reused} sent to the model")
+    record("units.reused", reused)
+    record("units.generated", len(sections) - reused)
+
+    def render(index, text):
+        if index == 0:
+            return f"{text}\n\n## Function by Function\n"
+        unit = units[index - 1]
+        part = ""
+        if index == 1 or unit["contract"] != units[index - 2]["contract"]:
+            part = f"\n### {unit['contract'] or 'Free functions'}\n"
+        return part + f"\n#### `{unit['label']}`\n{text}\n"
+
+    parts = _generate_sections(sections, render, full_key, source_code)
+    return _with_notes(describe_unit_changes(source_code, units), parts if stream else "".join(parts), stream)
+
+def analyze_source_by_section(files, stream=False):
+    """
+    Explain parsed source files one section of the analysis at a time.
+
+    Every section of the single-call analysis (purpose, functions, access
+    control, ...) is requested on its own, all concurrently, over the same
+    context, so the answer takes about as long as its longest section rather
+    than all of them in a row. Sections are cached under their own prompts:
+    a re-run only sends the ones that are missing or failed. Sources too
+    large for one prompt are summarized chunk by chunk as usual.
+    """
+    source_code = flatten_source_files(files)
+    with span("prompt.build"):
+        builder = files_prompt_builder(files)
+    if builder is None:
+        return explain_files(files, None, stream)
+
+    full_key = make_cache_key(source_code, EXPLAINER_MODEL_ROUTES, f"{PROMPT_VERSION}:sections")
+    if CACHE_ENABLED:
+        cached = get_cache().get(full_key)
+        if cached is not None:
+            record("explanation_cache.hit")
+            return _respond(cached, stream)
+
+    with span("prompt.build"):
+        # The shared context comes first in every prompt, so the provider can reuse it across sections
+        sections = [(builder(section_request(item)), max_tokens) for _, item, max_tokens in ANALYSIS_SECTIONS]
+    reused = sum(_is_cached(prompt) for prompt, _ in sections)
+    print(f"Sectioned analysis: {reused} of {len(sections)} sections cached, "
+          f"{len(sections) - reused} sent to the model")
+    record("sections.reused", reused)
+    record("sections.generated", len(sections) - reused)
+
+    def render(index, text):
+        return f"## {ANALYSIS_SECTIONS[index][0]}\n\n{text}\n\n"
+
+    parts = _generate_sections(sections, render, full_key, source_code, workers=len(sections))
+    return parts if stream else "".join(parts)
+
+def _generate_sections(sections, render, full_key, source_code, workers=MAP_REDUCE_WORKERS):
+    """Generate (prompt, max_tokens) sections concurrently and yield them rendered in order; caches the result if all succeed."""
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = [
+        pool.submit(bind(generate_explanation_with_openai), prompt, max_tokens=max_tokens)
+        for prompt, max_tokens in sections
+    ]
+    pool.shutdown(wait=False)
+
+    assembled, failed = [], False
+    for index, future in enumerate(futures):
+        text = future.result().strip()
+        failed = failed or text.startswith("Error generating explanation:")
+        part = render(index, text)
+        assembled.append(part)
+        yield part
+
+    if CACHE_ENABLED and not failed:
+        get_cache().set(full_key, "".join(assembled))
+        remember_analysis(source_code, None, cache_key=full_key)
+
+def describe_unit_changes(source_code, units):
+    """Notes on which functions changed since the closest earlier version of this source, if one is indexed."""
+    if not CACHE_ENABLED or SIMILARITY_REUSE == "off":
+        return []
+    with span("similarity.lookup"):
+        matches = get_similarity_index().query(source_code)
+    if not matches or matches[0]["source"] == source_code:
+        return []
+    previous, _ = extract_units({"": matches[0]["source"]})
+    changes = diff_units(previous, units)
+    described = [
+        f"{kind} " + ", ".join(f"`{unit_id}`" for unit_id in changes[kind])
+        for kind in ("changed", "added", "removed") if changes[kind]
+    ]
+    if not described:
+        return []
+    return [f"Since the closest earlier version ({matches[0]['similarity']:.0%} similar): "
+            f"{'; '.join(described)}; {len(changes['unchanged'])} functions unchanged."]
+
+def build_files_prompt(files):
+    """
+    Build the single-call prompt for parsed source files.
+
+    The locally extracted fact sheet is always included. Sources over the
+    map-reduce threshold (or every source with FACTS_ONLY) are sent as the
+    fact sheet plus the key function bodies instead of the full code.
+    Returns None when even that is too large, for the threshold or for every
+    routed model, and map-reduce is needed.
+    """
+    builder = files_prompt_builder(files)
+    return builder() if builder is not None else None
+
+def files_prompt_builder(files):
+    """
+    Choose the prompt form for parsed source files (see build_files_prompt).
+
+    Returns a function of the analysis request (the full analysis by default)
+    that builds the prompt, or None when map-reduce is needed.
+    """
+    with span("facts.extract"):
+        facts = extract_facts(files)
+    fact_sheet = format_fact_sheet(facts, show_lines=False)
+
+    source_code = flatten_source_files(files)
+    source_tokens = estimate_tokens(source_code)
+    fits = source_tokens <= MAP_REDUCE_THRESHOLD_TOKENS
+    if fits and not FACTS_ONLY:
+        builder = partial(build_source_prompt, source_code, fact_sheet)
+        if _fits_routes(builder()):
+            return builder
+        # Under the threshold, but over what the routed models can take
+        fits = False
+
+    key_source = key_function_source(facts)
+    condensed_tokens = estimate_tokens(fact_sheet) + estimate_tokens(key_source)
+    if fits and condensed_tokens >= source_tokens:
+        # Mostly state-changing code: the full source is the smaller prompt
+        builder = partial(build_source_prompt, source_code, fact_sheet)
+        return builder if _fits_routes(builder()) else None
+    if condensed_tokens > MAP_REDUCE_THRESHOLD_TOKENS:
+        return None
+    builder = partial(build_facts_prompt, fact_sheet, key_source)
+    if not _fits_routes(builder()):
+        return None
+    print(f"Sending fact sheet and key functions ({condensed_tokens} estimated tokens) "
+          f"instead of the full source ({source_tokens})")
+    return builder
+
+def _fits_routes(prompt):
+    return explainer_router.fits(build_messages(prompt), EXPLANATION_MAX_TOKENS)
+
+def parse_source_files(source_code):
+    """
+    Split Etherscan source formats into a {file_path: content} dict.
+
+    Handles Standard JSON input (optionally wrapped in an extra pair of braces
+    or double JSON encoded) and the multi-file {path: {"content": ...}} format.
+    Plain Solidity is returned as a single entry with an empty path.
+    """
+    parsed = None
     # If the source code is a complex JSON
     if source_code.startswith("{") and "}" in source_code:
-        try:
-            # Handle different source code formats from Etherscan
-            if source_code.startswith("{{"):  # Double JSON encoding sometimes happens
-                source_code = json.loads(json.loads(source_code))
-                if isinstance(source_code, dict) and "sources" in source_code:
-                    # Extract actual source from Standard JSON input format
-                    all_sources = []
-                    for file_path, file_content in source_code["sources"].items():
-                        if "content" in file_content:
-                            all_sources.append(f"// File: {file_path}\n{file_content['content']}")
-                    source_code = "\n\n".join(all_sources)
-            else:
-                parsed = json.loads(source_code)
-                if isinstance(parsed, dict) and "sources" in parsed:
-                    # Extract actual source from Standard JSON input format
-                    all_sources = []
-                    for file_path, file_content in parsed["sources"].items():
-                        if "content" in file_content:
-                            all_sources.append(f"// File: {file_path}\n{file_content['content']}")
-                    source_code = "\n\n".join(all_sources)
-        except json.JSONDecodeError:
-            # If it's not valid JSON
-            pass
-    
-    contract_info = {
-        "address": contract_address,
-        "source_code": source_code
-    }
-    
-    if abi:
-        contract_info["abi"] = abi
-    
-    # Create prompt for the LLM
-    prompt = f"""
-    Analyze this Solidity smart contract and provide a detailed technical summary in plain English.
+        candidates = [source_code]
+        if source_code.startswith("{{"):
+            # Etherscan wraps Standard JSON input in an extra pair of braces
+            candidates.insert(0, source_code.strip()[1:-1])
+        for candidate in candidates:
+            try:
+                parsed = json.loads(candidate)
+                if isinstance(parsed, str):  # Double JSON encoding sometimes happens
+                    parsed = json.loads(parsed)
+                break
+            except json.JSONDecodeError:
+                # If it's not valid JSON
+                parsed = None
+
+    if isinstance(parsed, dict):
+        sources = parsed.get("sources", parsed)
+        files = {
+            file_path: file_content["content"]
+            for file_path, file_content in sources.items()
+            if isinstance(file_content, dict) and "content" in file_content
+        }
+        if files:
+            return files
+
+    return {"": source_code}
+
+def load_source_files(source_code):
+    """Parse source files, replace unmodified known library files with short references and minify the rest."""
+    files, known = strip_known_libraries(parse_source_files(source_code))
+    if known:
+        print(f"Replaced {len(known)} known library files with references")
+    if MINIFY_LEVEL > 0:
+        with span("source.minify", level=MINIFY_LEVEL):
+            files, before, after = minify_files(files, MINIFY_LEVEL, skip=known)
+        if before:
+            print(f"Minified source (level {MINIFY_LEVEL}): {before} -> {after} estimated tokens "
+                  f"({(before - after) / before:.0%} saved)")
+        record("minify.tokens_saved", before - after)
+    return files
+
+def flatten_source_files(files):
+    """Join parsed source files into a single annotated Solidity string."""
+    if list(files) == [""]:
+        return files[""]
+    return "\n\n".join(f"// File: {file_path}\n{content}" for file_path, content in files.items())
+
+def analyze_large_source(files, stream=False):
+    """
+    Map-reduce analysis for sources too large for a single prompt.
+
+    Files are split by file, contract and function into token-bounded chunks,
+    each chunk is summarized concurrently, and a final reduce call merges the
+    summaries into the usual seven-part explanation.
+
+    The reduce prompt is budgeted before any chunk is sent: the summaries
+    are merged down to what the routed models can take beside the prompt
+    itself, and the fact sheet gets what is left.
+    """
+    room = explainer_router.capacity() - count_message_tokens(build_messages(build_reduce_prompt([])))
+    summary_budget = min(MAP_REDUCE_THRESHOLD_TOKENS, room)
+    if summary_budget < 2 * MAP_SUMMARY_MAX_TOKENS:
+        return _respond(f"Error generating explanation: Source is too large to summarize for "
+                        f"{explainer_router.spec} (about {room} tokens left for the merged summaries).", stream)
+    with span("facts.extract"):
+        fact_sheet = reduce_fact_sheet(extract_facts(files), min(REDUCE_FACTS_MAX_TOKENS, room - summary_budget))
+
+    with span("map_reduce.chunk"):
+        chunks = chunk_sources(files, MAP_REDUCE_CHUNK_TOKENS)
+    print(f"Source exceeds {MAP_REDUCE_THRESHOLD_TOKENS} tokens; summarizing {len(chunks)} chunks")
+
+    with span("map_reduce.map", chunks=len(chunks)):
+        summaries = _summarize_parallel([
+            (", ".join(chunk["labels"]), build_chunk_prompt(chunk["text"], chunk["labels"]))
+            for chunk in chunks
+        ])
+    if summaries is None:
+        return _respond("Error generating explanation: one or more source chunks could not be summarized.", stream)
+
+    # Merge summaries in groups until they fit in a single reduce prompt
+    while estimate_tokens("\n\n".join(summaries)) > summary_budget and len(summaries) > 1:
+        groups = _group_by_tokens(summaries, MAP_REDUCE_CHUNK_TOKENS)
+        with span("map_reduce.merge", groups=len(groups)):
+            summaries = _summarize_parallel([
+                (f"group {index + 1}", build_merge_prompt(group))
+                for index, group in enumerate(groups)
+            ])
+        if summaries is None:
+            return _respond("Error generating explanation: chunk summaries could not be merged.", stream)
+
+    prompt = build_reduce_prompt(summaries, fact_sheet)
+    return explain_and_remember(flatten_source_files(files), prompt, stream)
+
+def reduce_fact_sheet(facts, max_tokens):
+    """
+    The fact sheet for a reduce prompt, cut down to at most max_tokens.
+
+    The full sheet is used when it fits, then the outline (risky patterns,
+    contracts and their bases), then as much of the outline as fits. Returns
+    None when not even that leaves room for a line.
+    """
+    sheet = format_fact_sheet(facts, show_lines=False)
+    if estimate_tokens(sheet) <= max_tokens:
+        return sheet
+    sheet = format_fact_sheet(facts, show_lines=False, outline=True)
+    if estimate_tokens(sheet) <= max_tokens:
+        print("Fact sheet too large for the reduce prompt; sending contracts, bases and risky patterns only")
+        return sheet
+    lines = sheet.splitlines()
+    kept, used = [], estimate_tokens(f"... {len(lines)} more lines")
+    for line in lines:
+        used += estimate_tokens(line)
+        if used > max_tokens:
+            break
+        kept.append(line)
+    if not kept:
+        print("Fact sheet too large for the reduce prompt; leaving it out")
+        return None
+    print(f"Fact sheet too large for the reduce prompt; sending {len(kept)} of {len(lines)} outline lines")
+    return "\n".join(kept + [f"... {len(lines) - len(kept)} more lines"])
+
+def _summarize_parallel(labelled_prompts):
+    """Run chunk prompts with bounded concurrency; returns labelled summaries or None on failure."""
+    with ThreadPoolExecutor(max_workers=MAP_REDUCE_WORKERS) as pool:
+        futures = [
+            pool.submit(bind(generate_explanation_with_openai), prompt, max_tokens=MAP_SUMMARY_MAX_TOKENS)
+            for _, prompt in labelled_prompts
+        ]
+        results = [future.result() for future in futures]
+    if any(result.startswith("Error generating explanation:") for result in results):
+        return None
+    return [f"### {label}\n{result}" for (label, _), result in zip(labelled_prompts, results)]
+
+def _group_by_tokens(texts, max_tokens):
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def build_chunk_prompt(chunk_text, labels):
+    """Create the map-step prompt for one chunk of a large contract system."""
+    return f"""
+    The following Solidity code is one part of a larger multi-file smart contract system.
+    It covers: {", ".join(labels)}
     
     ```solidity
-    {source_code}
+    {chunk_text}
     ```
     
+    Summarize this part concisely (at most 300 words) as notes for a later overall analysis:
+    - Contracts, interfaces and libraries defined, with what they inherit from
+    - Key functions, their visibility, modifiers and purpose
+    - Access control, state variables and events
+    - Security-relevant patterns or concerns
+    """
+
+def build_merge_prompt(summaries):
+    """Create the prompt that condenses a group of chunk summaries."""
+    joined = "\n\n".join(summaries)
+    return f"""
+    Condense these notes about parts of a smart contract system into one set of notes
+    (at most 400 words), keeping contract names, key functions, access control and security concerns.
+    
+    {joined}
+    """
+
+def build_reduce_prompt(summaries, fact_sheet=None):
+    """Create the final reduce prompt from per-chunk summaries."""
+    joined = "\n\n".join(summaries)
+    facts = f"""
+    Structural facts extracted directly from the source (authoritative):
+    {fact_sheet}
+    """ if fact_sheet else ""
+    return f"""
+    The notes below summarize every part of a large multi-file Solidity smart contract system.
+    Using them, provide a detailed technical summary of the whole system in plain English.
+    {facts}
+    {joined}
+    
     Your analysis should include:
     1. Overall purpose of the contract
     2. Key functions and their purposes
@@ -184,18 +994,126 @@ def analyze_contract_from_source(source_code, abi=None, contract_address=None):
     Provide the information in a clear, organized format suitable for non-technical users.
     Highlight any potential security concerns or best practices that are or are not followed.
     """
+
+FULL_ANALYSIS_REQUEST = """Your analysis should include:
+    1. Overall purpose of the contract
+    2. Key functions and their purposes
+    3. Access control and permissions
+    4. State variables and their significance
+    5. Events and their significance
+    6. Security patterns and potential concerns
+    7. Inheritance and interfaces used
     
-    return generate_explanation_with_openai(prompt)
+    Provide the information in a clear, organized format suitable for non-technical users.
+    Highlight any potential security concerns or best practices that are or are not followed."""
 
-def generate_explanation_with_openai(prompt):
-    """Generate an explanation using OpenAI's API with guardrails."""
-    try:
-        # Create hash of the input for logging purposes
-        input_hash = hashlib.md5(prompt.encode()).hexdigest()
-        print(f"Generating explanation for input hash: {input_hash[:8]}...")
-        
-        # Apply guardrails by adding instructions
-        safe_prompt = f"""
+def section_request(item):
+    """The closing request of a prompt that asks for one section of the analysis only."""
+    return f"""Write only this part of the analysis; the other parts are written separately:
+    {item}
+    
+    Do not add a heading, an introduction or a summary of the contract beyond what this part needs.
+    Provide the information in a clear, organized format suitable for non-technical users.
+    Highlight any potential security concerns or best practices that are or are not followed."""
+
+def build_source_prompt(source_code, fact_sheet=None, request=FULL_ANALYSIS_REQUEST):
+    """Create the LLM prompt for a full source code analysis (or the part of it that request asks for)."""
+    facts = f"""
+    Structural facts extracted directly from the source (authoritative; use them for items 2-7
+    and focus on behavior the facts cannot show):
+    {fact_sheet}
+    """ if fact_sheet else ""
+    return f"""
+    Analyze this Solidity smart contract and provide a detailed technical summary in plain English.
+    {facts}
+    ```solidity
+    {source_code}
+    ```
+    
+    {request}
+    """
+
+def build_facts_prompt(fact_sheet, key_source, request=FULL_ANALYSIS_REQUEST):
+    """Create the prompt for a source summarized by its fact sheet and key function bodies."""
+    return f"""
+    Analyze this Solidity smart contract system and provide a detailed technical summary in plain English.
+    
+    The structure below was extracted directly from the full source (authoritative). It lists every
+    contract, inherited base, state variable, event, modifier and function signature, plus risky patterns.
+    {fact_sheet}
+    
+    Source of the modifiers, constructors and state-changing or flagged functions
+    (view/pure functions and internal helpers are described by the structure above only):
+    ```solidity
+    {key_source}
+    ```
+    
+    {request}
+    """
+
+def build_overview_prompt(skeleton, fact_sheet):
+    """Create the contract-level prompt for a function-by-function analysis."""
+    return f"""
+    Analyze this Solidity smart contract and provide a technical summary in plain English.
+    Function bodies are elided as {{ ... }}; every function is explained separately, so do not
+    describe the functions one by one.
+    
+    Structural facts extracted directly from the source (authoritative):
+    {fact_sheet}
+    
+    ```solidity
+    {skeleton}
+    ```
+    
+    Your analysis should include:
+    1. Overall purpose of the contract
+    2. Access control and permissions
+    3. State variables and their significance
+    4. Events and their significance
+    5. Security patterns and potential concerns
+    6. Inheritance and interfaces used
+    
+    Provide the information in a clear, organized format suitable for non-technical users.
+    """
+
+def build_unit_prompt(unit):
+    """Create the prompt that explains one function of a function-by-function analysis."""
+    context = f"{unit['context']}\n    // ...\n" if unit["context"] else ""
+    closing = "\n}" if unit["context"] else ""
+    return f"""
+    Explain this Solidity function in plain English (at most 150 words): what it does, who may
+    call it, which state it changes, which events it emits, and any security concerns.
+    Start directly with the explanation, without a heading.
+    
+    ```solidity
+    {context}{unit['text']}{closing}
+    ```
+    """
+
+def build_delta_prompt(previous_explanation, diff):
+    """Create the prompt that updates an earlier explanation for a near-duplicate source."""
+    return f"""
+    Below is an analysis of a Solidity smart contract, followed by a unified diff from that contract
+    to a new, nearly identical one. Rewrite the analysis so it describes the new contract.
+    
+    Keep everything the diff does not affect. Update the parts it changes (functions, access control,
+    state variables, events, constants, security concerns) and mention each change explicitly.
+    
+    Earlier analysis:
+    {previous_explanation}
+    
+    Diff from the earlier contract to the new one:
+    ```diff
+    {diff}
+    ```
+    
+    Keep the same seven-part structure and the clear, organized format suitable for non-technical users.
+    """
+
+def build_messages(prompt):
+    """Wrap a prompt with the guardrail instructions and system message."""
+    # Apply guardrails by adding instructions
+    safe_prompt = f"""
         {prompt}
 
         
@@ -208,56 +1126,293 @@ def generate_explanation_with_openai(prompt):
         - Be thorough but accessible in your explanations
         - Format the response in Markdown for better readability
         """
-        
-        # Call the OpenAI API
-        # Using gpt-4o-mini for better analysis, but can be changed to other models as needed
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  
-            messages=[
-                {"role": "system", "content": "You are a smart contract security expert tasked with explaining smart contracts in plain English to non-technical users."},
-                {"role": "user", "content": safe_prompt}
-            ],
-            max_tokens=4000,
-            temperature=0.2
+    return [
+        {"role": "system", "content": "You are a smart contract security expert tasked with explaining smart contracts in plain English to non-technical users."},
+        {"role": "user", "content": safe_prompt}
+    ]
+
+def generate_explanation_with_openai(prompt, use_cache=None, max_tokens=EXPLANATION_MAX_TOKENS):
+    """Generate an explanation using OpenAI's API with guardrails."""
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    try:
+        # Content-addressed key: normalized prompt (source/ABI) + model + prompt version
+        cache_key = make_cache_key(prompt, EXPLAINER_MODEL_ROUTES, PROMPT_VERSION)
+        print(f"Generating explanation for input hash: {cache_key[:8]}...")
+
+        if use_cache:
+            cached = get_cache().get(cache_key)
+            if cached is not None:
+                print(f"Cache hit for input hash: {cache_key[:8]}")
+                record("explanation_cache.hit")
+                return cached
+            record("explanation_cache.miss")
+
+        # Counted and routed locally; a prompt no model can take fails here, not upstream
+        route = explainer_router.route(build_messages(prompt), max_tokens)
+        # Identical prompts in flight at the same time share one completion
+        return _openai_flights.do(
+            ("complete", cache_key, max_tokens),
+            lambda: _complete(prompt, cache_key, use_cache, route)
         )
-        
-        return response.choices[0].message.content
     
     except Exception as e:
         return f"Error generating explanation: {str(e)}"
 
+def _complete(prompt, cache_key, use_cache, route):
+    # Call the OpenAI API with the model and budget chosen by the router
+    started = time.perf_counter()
+    with span("openai.completion", model=route.model):
+        response = call_with_retries(
+            get_limiter("openai"),
+            lambda: get_openai_client().chat.completions.create(
+                model=route.model,
+                messages=build_messages(prompt),
+                max_tokens=route.max_tokens,
+                temperature=0.2
+            ),
+            # OpenAI reserves max_tokens against the TPM limit when the request is accepted
+            tokens=route.prompt_tokens + route.max_tokens
+        )
+    observe_route(route, time.perf_counter() - started)
+    if response.usage:
+        record("openai.prompt_tokens", response.usage.prompt_tokens)
+        record("openai.completion_tokens", response.usage.completion_tokens)
+
+    explanation = response.choices[0].message.content
+    if use_cache and explanation:
+        get_cache().set(cache_key, explanation)
+    return explanation
+
+def stream_explanation_with_openai(prompt, use_cache=None, max_tokens=EXPLANATION_MAX_TOKENS):
+    """
+    Stream an explanation from OpenAI, yielding text fragments as they arrive.
+
+    A cache hit is yielded as a single fragment. The full text is cached once
+    the stream completes, so streamed and blocking calls share cache entries.
+    Callers streaming the same prompt at the same time share one completion,
+    each receiving every fragment from the start.
+    """
+    if use_cache is None:
+        use_cache = CACHE_ENABLED
+    cache_key = make_cache_key(prompt, EXPLAINER_MODEL_ROUTES, PROMPT_VERSION)
+    print(f"Streaming explanation for input hash: {cache_key[:8]}...")
+
+    if use_cache:
+        cached = get_cache().get(cache_key)
+        if cached is not None:
+            print(f"Cache hit for input hash: {cache_key[:8]}")
+            record("explanation_cache.hit")
+            yield cached
+            return
+        record("explanation_cache.miss")
+
+    try:
+        route = explainer_router.route(build_messages(prompt), max_tokens)
+    except PromptTooLargeError as e:
+        yield f"\n\nError generating explanation: {str(e)}"
+        return
+    yield from _openai_flights.stream(
+        ("stream", cache_key, max_tokens),
+        lambda: _stream_completion(prompt, cache_key, use_cache, route)
+    )
+
+def open_completion_stream(model, messages, max_tokens):
+    """
+    Start a streaming chat completion on the shared HTTP session.
+
+    The stream is read as raw server-sent events rather than through the
+    OpenAI SDK, whose per-chunk objects cost more CPU than the rest of the
+    request and cap how many streams one process can serve.
+    """
+    response = get_http_session().post(
+        f"{OPENAI_BASE_URL}/chat/completions",
+        headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"},
+        json={
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.2,
+            "stream": True,
+        },
+        stream=True,
+        timeout=(10, 120)
+    )
+    if response.status_code >= 400:
+        response.close()
+        # HTTPError keeps the response, so the retry helpers see its status and Retry-After
+        response.raise_for_status()
+    return response
+
+def completion_deltas(response):
+    """Yield the content deltas of a streamed chat completion."""
+    with response:
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                return
+            choices = json.loads(data).get("choices")
+            if choices:
+                yield choices[0].get("delta", {}).get("content")
+
+def _stream_completion(prompt, cache_key, use_cache, route):
+    parts = []
+    started = time.perf_counter()
+    first_token_at = None
+    try:
+        # Only opening the stream is retried; a stream that fails midway is reported
+        response = call_with_retries(
+            get_limiter("openai"),
+            lambda: open_completion_stream(route.model, build_messages(prompt), route.max_tokens),
+            tokens=route.prompt_tokens + route.max_tokens
+        )
+        for delta in completion_deltas(response):
+            if delta:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    observe("openai.first_token", first_token_at - started, model=route.model)
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        yield f"\n\nError generating explanation: {str(e)}"
+        return
+
+    explanation = "".join(parts)
+    # Streamed responses carry no usage block, so token counts are estimated
+    observe("openai.stream", time.perf_counter() - started, model=route.model)
+    observe_route(route, time.perf_counter() - started)
+    record("openai.prompt_tokens_estimated", estimate_tokens(prompt))
+    record("openai.completion_tokens_estimated", estimate_tokens(explanation))
+    if use_cache and explanation:
+        get_cache().set(cache_key, explanation)
+
+def explain_prompt(prompt, stream=False):
+    """Send a finished prompt to the blocking or the streaming OpenAI helper."""
+    if stream:
+        return stream_explanation_with_openai(prompt)
+    return generate_explanation_with_openai(prompt)
+
+def _respond(message, stream=False):
+    """Return a fixed message in the same shape (string or stream) the caller asked for."""
+    return iter([message]) if stream else message
+
 def main():
     parser = argparse.ArgumentParser(description="Smart Contract Explainer")
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-a", "--address", help="Contract address on Sepolia testnet")
     group.add_argument("-f", "--file", help="Solidity file path")
     group.add_argument("-c", "--code", help="Raw Solidity code")
+    group.add_argument("-b", "--batch", help="File of contract addresses (one per line) or a directory of .sol files")
+    parser.add_argument("-o", "--output", help="Batch mode: write JSONL results to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=4, help="Batch mode: number of concurrent OpenAI calls")
+    parser.add_argument("--fetch-workers", type=int, default=8, help="Batch mode: number of concurrent Etherscan/file fetches")
+    parser.add_argument("-s", "--stream", action="store_true", help="Print the explanation as it is generated")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the explanation cache")
+    parser.add_argument("--cache-stats", action="store_true", help="Print cache hit/miss counters after the analysis")
+    parser.add_argument("--minify-level", type=int, choices=MINIFY_LEVELS, default=DEFAULT_MINIFY_LEVEL,
+                        help="Source compaction before prompting: 0 off, 1 comments, 2 NatSpec/whitespace (default), 3 maximal")
+    parser.add_argument("--facts-only", action="store_true",
+                        help="Send the local fact sheet and key functions instead of the full source")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Explain sources function by function, reusing cached sections of earlier versions")
+    parser.add_argument("--sectioned", action="store_true",
+                        help="Generate the sections of a source analysis as concurrent requests")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage timing breakdown after the analysis")
+    parser.add_argument("--metrics-file", help="Write stage timings and counters to this file in Prometheus text format")
     
     args = parser.parse_args()
+
+    global CACHE_ENABLED, MINIFY_LEVEL, FACTS_ONLY, INCREMENTAL_ANALYSIS, SECTIONED_ANALYSIS
+    if args.no_cache:
+        CACHE_ENABLED = False
+    MINIFY_LEVEL = args.minify_level
+    FACTS_ONLY = FACTS_ONLY or args.facts_only
+    INCREMENTAL_ANALYSIS = INCREMENTAL_ANALYSIS or args.incremental
+    SECTIONED_ANALYSIS = SECTIONED_ANALYSIS or args.sectioned
+
+    if args.batch:
+        with trace("batch") as current:
+            run_batch_cli(args)
+        if args.profile:
+            print(format_breakdown(current.summary()), file=sys.stderr)
+        if args.metrics_file:
+            with open(args.metrics_file, "w") as file:
+                file.write(METRICS.render_prometheus())
+        return
     
-    if args.address:
-        if not is_valid_address(args.address):
-            print("Error: Invalid Ethereum address")
-            sys.exit(1)
-        explanation = analyze_contract_from_address(args.address)
-    
-    elif args.file:
-        try:
-            with open(args.file, 'r') as file:
-                source_code = file.read()
-            explanation = analyze_contract_from_source(source_code)
-        except FileNotFoundError:
-            print(f"Error: File {args.file} not found")
-            sys.exit(1)
-    
-    elif args.code:
-        explanation = analyze_contract_from_source(args.code)
-    
-    print("\n" + "="*50 + "\n")
-    print("SMART CONTRACT ANALYSIS")
-    print("\n" + "="*50 + "\n")
-    print(explanation)
-    print("\n" + "="*50 + "\n")
+    with trace("cli") as current:
+        if args.address:
+            if not is_valid_address(args.address):
+                print("Error: Invalid Ethereum address")
+                sys.exit(1)
+            explanation = analyze_contract_from_address(args.address, stream=args.stream)
+    
+        elif args.file:
+            try:
+                with open(args.file, 'r') as file:
+                    source_code = file.read()
+                explanation = analyze_contract_from_source(source_code, stream=args.stream)
+            except FileNotFoundError:
+                print(f"Error: File {args.file} not found")
+                sys.exit(1)
+    
+        elif args.code:
+            explanation = analyze_contract_from_source(args.code, stream=args.stream)
+    
+        print("\n" + "="*50 + "\n")
+        print("SMART CONTRACT ANALYSIS")
+        print("\n" + "="*50 + "\n")
+        if args.stream:
+            for fragment in explanation:
+                print(fragment, end="", flush=True)
+            print()
+        else:
+            print(explanation)
+        print("\n" + "="*50 + "\n")
+
+    if args.profile:
+        print(format_breakdown(current.summary()))
+    if args.metrics_file:
+        with open(args.metrics_file, "w") as file:
+            file.write(METRICS.render_prometheus())
+
+    if args.cache_stats:
+        stats = get_cache().stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes']} bytes)")
+
+def run_batch_cli(args):
+    """Run the batch pipeline and stream JSONL results to a file or stdout."""
+    from batch_analyzer import read_batch_inputs, run_batch
+
+    try:
+        items = read_batch_inputs(args.batch)
+    except FileNotFoundError:
+        print(f"Error: Batch input {args.batch} not found")
+        sys.exit(1)
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        # Keep progress logging off stdout so JSONL output stays parseable
+        with contextlib.redirect_stdout(sys.stderr):
+            succeeded, failed = run_batch(
+                items,
+                output,
+                fetch_workers=args.fetch_workers,
+                llm_workers=args.workers,
+                incremental=INCREMENTAL_ANALYSIS,
+                sectioned=SECTIONED_ANALYSIS
+            )
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"Batch complete: {succeeded} succeeded, {failed} failed", file=sys.stderr)
+    if args.cache_stats:
+        stats = get_cache().stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+import re
+
+
+# Order matters: NatSpec before plain comments, strings before identifiers
+# (so hex"..." / unicode"..." literals are read as strings)
+TOKEN_PATTERN = re.compile(r"""
+    (?P<natspec_line>///[^\n]*)
+   |(?P<natspec_block>/\*\*(?!/)[\s\S]*?(?:\*/|\Z))
+   |(?P<line_comment>//[^\n]*)
+   |(?P<block_comment>/\*[\s\S]*?(?:\*/|\Z))
+   |(?P<string>(?:unicode|hex)?"(?:\\.|[^"\\\n])*"|(?:unicode|hex)?'(?:\\.|[^'\\\n])*')
+   |(?P<newline>\r?\n)
+   |(?P<whitespace>[ \t\r\f\v]+)
+   |(?P<number>0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d[\d_]*)?(?:[eE]-?\d+)?)
+   |(?P<identifier>[A-Za-z_$][A-Za-z0-9_$]*)
+   |(?P<punct>.)
+""", re.VERBOSE)
+
+COMMENT_KINDS = frozenset(("natspec_line", "natspec_block", "line_comment", "block_comment"))
+TRIVIA_KINDS = COMMENT_KINDS | frozenset(("newline", "whitespace"))
+
+# Keywords that open a named top-level or member declaration
+DECLARATION_KEYWORDS = frozenset((
+    "contract", "interface", "library", "abstract", "function", "modifier",
+    "constructor", "fallback", "receive", "event", "error", "struct", "enum"
+))
+
+
+def tokenize(source):
+    """Split Solidity source into (kind, text, offset) tokens, keeping comments and whitespace."""
+    return [(match.lastgroup, match.group(), match.start()) for match in TOKEN_PATTERN.finditer(source)]
+
+
+def code_tokens(source):
+    """Tokenize and drop comments and whitespace."""
+    return [token for token in tokenize(source) if token[0] not in TRIVIA_KINDS]
+
+
+def split_units(source):
+    """
+    Split source into consecutive top-level units.
+
+    A unit ends at a depth-0 ';' or at the '}' that closes a depth-0 block, so
+    comments and blank lines preceding a declaration stay attached to it.
+    Returns a list of dicts with 'name', 'kind', 'start', 'end' and 'text'.
+    """
+    units = []
+    depth = 0
+    unit_start = 0
+    head = []
+    for kind, text, offset in tokenize(source):
+        if kind in TRIVIA_KINDS or kind == "string":
+            continue
+        if depth == 0 and len(head) < 4:
+            head.append(text)
+        if text == "{":
+            depth += 1
+        elif text == "}":
+            depth = max(depth - 1, 0)
+            if depth == 0:
+                units.append(_make_unit(source, head, unit_start, offset + 1))
+                unit_start, head = offset + 1, []
+        elif text == ";" and depth == 0:
+            units.append(_make_unit(source, head, unit_start, offset + 1))
+            unit_start, head = offset + 1, []
+
+    if source[unit_start:].strip():
+        units.append(_make_unit(source, head, unit_start, len(source)))
+    return units
+
+
+def _make_unit(source, head, start, end):
+    kind, name = "statement", None
+    words = [word for word in head if word != "abstract"]
+    if words and words[0] in DECLARATION_KEYWORDS:
+        kind = words[0]
+        if len(words) > 1 and re.match(r"[A-Za-z_$]", words[1]):
+            name = words[1]
+        elif kind in ("constructor", "fallback", "receive"):
+            name = kind
+    return {"name": name, "kind": kind, "start": start, "end": end, "text": source[start:end]}
+
+
+def block_body(source):
+    """Return (header, body, footer) around the first top-level {...} block in source."""
+    depth = 0
+    open_at = None
+    for kind, text, offset in tokenize(source):
+        if kind in TRIVIA_KINDS or kind == "string":
+            continue
+        if text == "{":
+            if depth == 0:
+                open_at = offset
+            depth += 1
+        elif text == "}":
+            depth -= 1
+            if depth == 0 and open_at is not None:
+                return source[:open_at + 1], source[open_at + 1:offset], source[offset:]
+    return source, "", ""
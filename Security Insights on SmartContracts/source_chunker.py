@@ -0,0 +1,121 @@
+import os
+
+from solidity_lexer import split_units, block_body
+from model_router import count_tokens
+
+
+DEFAULT_CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", "6000"))
+
+
+def estimate_tokens(text):
+    """
+    Number of tokens in text, counted the same way the model router measures prompts.
+
+    Chunks and thresholds sized with this estimate therefore pass preflight
+    (see model_router.count_tokens).
+    """
+    return count_tokens(text)
+
+
+def split_pieces(path, content, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Split one source file into pieces that each fit in max_tokens.
+
+    Files that fit are kept whole. Larger files are split into top-level
+    contracts, contracts that are still too large are split into members
+    (functions, modifiers, state variables, ...), and any single member that
+    is still too large is split by lines. Member pieces carry the enclosing
+    contract header as 'context' so each chunk stays self-describing.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return [{"path": path, "context": None, "label": path or "source", "text": content}]
+
+    pieces = []
+    for unit in split_units(content):
+        unit_label = f"{path}:{unit['name'] or unit['kind']}"
+        if estimate_tokens(unit["text"]) <= max_tokens:
+            pieces.append({"path": path, "context": None, "label": unit_label, "text": unit["text"]})
+            continue
+
+        header, body, _ = block_body(unit["text"])
+        if not body:
+            for part in _split_lines(unit["text"], max_tokens):
+                pieces.append({"path": path, "context": None, "label": unit_label, "text": part})
+            continue
+
+        context = header.strip()
+        budget = max(max_tokens - estimate_tokens(context) - 1, 1)
+        for member in split_units(body):
+            label = f"{unit_label}.{member['name'] or member['kind']}"
+            for part in _split_lines(member["text"], budget):
+                pieces.append({"path": path, "context": context, "label": label, "text": part})
+    return pieces
+
+
+def _split_lines(text, max_tokens):
+    """Split text on line boundaries into parts of at most max_tokens (single huge lines are kept whole)."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    parts, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if current and size + line_tokens > max_tokens:
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += line_tokens
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def chunk_sources(files, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """
+    Pack the files of a multi-file source into chunks of at most ~max_tokens.
+
+    Consecutive small files share a chunk, so a project with dozens of short
+    imports does not turn into dozens of LLM calls. Returns a list of dicts
+    with 'labels' (what the chunk covers) and 'text'.
+    """
+    pieces = []
+    for path, content in files.items():
+        pieces.extend(split_pieces(path, content, max_tokens))
+
+    chunks = []
+    current, labels, size = [], [], 0
+    last_path, last_context = None, None
+
+    def close_chunk():
+        if last_context:
+            current.append("}\n")
+        chunks.append({"labels": list(labels), "text": "".join(current)})
+
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece["text"])
+        if current and size + piece_tokens > max_tokens:
+            close_chunk()
+            current, labels, size = [], [], 0
+            last_path, last_context = None, None
+
+        if piece["path"] != last_path:
+            if last_context:
+                current.append("}\n")
+                last_context = None
+            if piece["path"]:
+                current.append(f"// File: {piece['path']}\n")
+            last_path = piece["path"]
+        if piece["context"] != last_context:
+            if last_context:
+                current.append("}\n")
+            if piece["context"]:
+                current.append(f"{piece['context']}\n")
+                size += estimate_tokens(piece["context"])
+            last_context = piece["context"]
+
+        current.append(piece["text"].strip("\n").rstrip() + "\n\n")
+        labels.append(piece["label"])
+        size += piece_tokens
+
+    if current:
+        close_chunk()
+    return chunks
@@ -0,0 +1,154 @@
+import os
+import re
+
+from solidity_lexer import tokenize, TRIVIA_KINDS
+from source_chunker import estimate_tokens
+
+
+# Compaction levels, each including everything below it:
+#   0  leave the source untouched
+#   1  drop regular comments (license headers, commented-out code), trailing
+#      whitespace and runs of blank lines; NatSpec is kept
+#   2  also drop NatSpec except @notice text, indentation and repeated spaces,
+#      blank lines and non-version pragmas
+#   3  also drop all NatSpec and pragmas and every space the parser does not
+#      need; lines only break after ';', '{' and '}'
+MINIFY_LEVELS = (0, 1, 2, 3)
+DEFAULT_MINIFY_LEVEL = int(os.getenv("PROMPT_MINIFY_LEVEL", "2"))
+
+NATSPEC_TAG = re.compile(r"@([A-Za-z]+(?::[A-Za-z0-9_-]+)?)")
+WORD_CHAR = re.compile(r"[A-Za-z0-9_$]")
+OPERATOR_CHARS = frozenset("+-*/%&|^<>=!")
+
+
+def minify_source(source, level=None):
+    """
+    Compact Solidity source for prompting without changing its meaning.
+
+    Works on lexer tokens, so string literals (including ones containing
+    '//' or '/*') and the spacing inside them are never touched.
+    """
+    level = DEFAULT_MINIFY_LEVEL if level is None else level
+    if level <= 0 or not source:
+        return source
+    if level == 1:
+        return _strip_comments(source)
+    return _compact(source, level)
+
+
+def _strip_comments(source):
+    parts = [
+        text for kind, text, _ in tokenize(source)
+        if kind not in ("line_comment", "block_comment")
+    ]
+    # Strings cannot span lines, so line-wise trimming never reaches inside one
+    lines = [line.rstrip() for line in "".join(parts).split("\n")]
+    compacted = []
+    for line in lines:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted).strip("\n") + "\n"
+
+
+def _compact(source, level):
+    tokens = tokenize(source)
+    out = []
+    gap = ""            # trivia since the last emitted token: "", " " or "\n"
+    natspec = []        # NatSpec comments waiting for the next code token
+    statement_start = True
+    index = 0
+
+    def emit(text):
+        nonlocal gap
+        if out:
+            previous = out[-1]
+            if gap == "\n" and (level == 2 or previous[-1] in ";{}"):
+                out.append("\n")
+            elif gap and _needs_space(previous[-1], text[0], level):
+                out.append(" ")
+        out.append(text)
+        gap = ""
+
+    while index < len(tokens):
+        kind, text, _ = tokens[index]
+        index += 1
+        if kind in TRIVIA_KINDS:
+            if level == 2 and kind in ("natspec_line", "natspec_block"):
+                natspec.append(text)
+            gap = "\n" if gap == "\n" or "\n" in text else " "
+            continue
+
+        if statement_start and text == "pragma" and _drop_pragma(tokens, index, level):
+            while index < len(tokens) and tokens[index][1] != ";":
+                index += 1
+            index += 1
+            continue
+        if natspec:
+            notice = notice_text(natspec)
+            natspec = []
+            if notice:
+                emit(f"/// @notice {notice}")
+                gap = "\n"
+        emit(text)
+        statement_start = text in (";", "{", "}")
+    return "".join(out).strip() + "\n"
+
+
+def _drop_pragma(tokens, index, level):
+    # Level 2 keeps 'pragma solidity ...': the version decides, for example,
+    # whether arithmetic is checked. Other pragmas only matter to the compiler.
+    if level >= 3:
+        return True
+    while index < len(tokens) and tokens[index][0] in TRIVIA_KINDS:
+        index += 1
+    return index == len(tokens) or tokens[index][1] != "solidity"
+
+
+def _needs_space(before, after, level):
+    if WORD_CHAR.match(before) and WORD_CHAR.match(after):
+        return True
+    if level == 2:
+        return True
+    # Keep operators apart so 'a - -b' or 'a / *b' cannot fuse into new tokens
+    return before in OPERATOR_CHARS and after in OPERATOR_CHARS
+
+
+def notice_text(comments):
+    """
+    Extract the @notice text from consecutive NatSpec comments.
+
+    Untagged NatSpec counts as @notice, as it does for the compiler.
+    """
+    lines = []
+    for comment in comments:
+        if comment.startswith("///"):
+            lines.append(comment[3:])
+        else:
+            body = comment[3:-2] if comment.endswith("*/") else comment[3:]
+            lines.extend(re.sub(r"^\s*\*", "", line) for line in body.split("\n"))
+    text = " ".join(lines)
+
+    tags = list(NATSPEC_TAG.finditer(text))
+    notice = [text[:tags[0].start()] if tags else text]
+    for tag, following in zip(tags, tags[1:] + [None]):
+        if tag.group(1) == "notice":
+            notice.append(text[tag.end():following.start() if following else len(text)])
+    return " ".join(" ".join(notice).split())
+
+
+def minify_files(files, level=None, skip=()):
+    """
+    Minify every parsed source file except the paths in skip.
+
+    Returns (files, before_tokens, after_tokens) with estimated token counts
+    of the minified files before and after compaction.
+    """
+    minified, before, after = {}, 0, 0
+    for file_path, content in files.items():
+        if file_path in skip:
+            minified[file_path] = content
+            continue
+        minified[file_path] = minify_source(content, level)
+        before += estimate_tokens(content)
+        after += estimate_tokens(minified[file_path])
+    return minified, before, after
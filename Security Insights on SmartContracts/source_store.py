@@ -0,0 +1,65 @@
+import os
+import json
+import tempfile
+import threading
+
+
+# Verified source never changes for a deployed address, so entries never expire
+DEFAULT_STORE_PATH = os.getenv(
+    "SOURCE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".source_store")
+)
+
+
+class SourceStore:
+    """Sharded on-disk store of verified contract metadata, keyed by network and address."""
+
+    def __init__(self, root=DEFAULT_STORE_PATH, namespace="sepolia"):
+        self.root = os.path.join(root, namespace)
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _path(self, address):
+        address = address.lower()
+        # Shard on the first address byte to keep directories small
+        return os.path.join(self.root, address[2:4], f"{address}.json")
+
+    def get(self, address):
+        """Return stored metadata for address, or None if it has not been fetched yet."""
+        key = address.lower()
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+        try:
+            with open(self._path(address), "r") as file:
+                metadata = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        with self._lock:
+            self._memory[key] = metadata
+        return metadata
+
+    def put(self, address, metadata):
+        """Persist metadata for address atomically."""
+        path = self._path(address)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(metadata, file)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._memory[address.lower()] = metadata
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_source_store():
+    """Return the process-wide source store."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = SourceStore()
+    return _default_store
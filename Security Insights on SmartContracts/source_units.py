@@ -0,0 +1,127 @@
+import hashlib
+
+from explanation_cache import normalize_content
+from solidity_lexer import split_units, block_body, code_tokens
+
+
+# Members explained one by one; everything else (state variables, events,
+# modifiers, structs, ...) stays in the contract-level skeleton
+FUNCTION_KINDS = frozenset(("function", "constructor", "fallback", "receive"))
+CONTAINER_KINDS = frozenset(("contract", "library", "abstract"))
+
+# Parameter tokens that are not part of the type
+_LOCATIONS = frozenset(("memory", "calldata", "storage"))
+
+
+def extract_units(files):
+    """
+    Split parsed source files into function units and a contract-level skeleton.
+
+    Every function, constructor, fallback and receive with a body becomes a
+    unit: a dict with 'id' (contract plus name and parameter types, stable
+    across edits of the body), 'contract', 'label', 'context' (the enclosing
+    contract declaration), 'text' and 'fingerprint'. The skeleton is the
+    source with those bodies replaced by '{ ... }', so it only changes when
+    contract-level code does. Returns (units, skeleton).
+    """
+    units, skeleton = [], []
+    for path, content in files.items():
+        if path:
+            skeleton.append(f"// File: {path}\n")
+        for unit in split_units(content):
+            if unit["kind"] in FUNCTION_KINDS:
+                # Free function at file level
+                skeleton.append(_add_unit(units, unit, None, None))
+            elif unit["kind"] in CONTAINER_KINDS:
+                header, body, footer = block_body(unit["text"])
+                contract = unit["name"] or unit["kind"]
+                skeleton.append(header)
+                for member in split_units(body):
+                    if member["kind"] in FUNCTION_KINDS:
+                        skeleton.append(_add_unit(units, member, contract, header.strip()))
+                    else:
+                        skeleton.append(member["text"])
+                skeleton.append("\n" + footer if body.endswith("\n") else footer)
+            else:
+                skeleton.append(unit["text"])
+        skeleton.append("\n")
+    return units, "".join(skeleton)
+
+
+def _add_unit(units, member, contract, context):
+    """Record member as a unit if it has a body; returns its skeleton text."""
+    header, body, _ = block_body(member["text"])
+    if not body.strip():
+        # Declarations without a body (abstract functions) have nothing to explain
+        return member["text"]
+    label = f"{member['name']}({', '.join(parameter_types(header))})"
+    text = member["text"].strip("\n")
+    units.append({
+        "id": f"{contract}.{label}" if contract else label,
+        "contract": contract,
+        "label": label,
+        "context": context,
+        "text": text,
+        "fingerprint": hashlib.sha256(normalize_content(text).encode("utf-8")).hexdigest(),
+    })
+    return f"{header.rstrip()} ... }}"
+
+
+def parameter_types(header):
+    """Parameter types from a function header, e.g. ['address', 'uint256[]'] (names dropped)."""
+    tokens = [text for _, text, _ in code_tokens(header)]
+    if "(" not in tokens:
+        return []
+    types, current, depth = [], [], 0
+    for text in tokens[tokens.index("(") + 1:]:
+        if text in "([":
+            depth += 1
+        elif text in ")]":
+            if depth == 0:
+                break
+            depth -= 1
+        if text == "," and depth == 0:
+            types.append(current)
+            current = []
+        else:
+            current.append(text)
+    types.append(current)
+    return [_parameter_type(parameter) for parameter in types if parameter]
+
+
+def _parameter_type(tokens):
+    tokens = [token for token in tokens if token not in _LOCATIONS]
+    # "uint256 amount" -> "uint256"; a lone type or "address payable" keeps its last word
+    if len(tokens) > 1 and _is_word(tokens[-1]) and _is_word(tokens[-2]) and tokens[-1] != "payable":
+        tokens = tokens[:-1]
+    elif len(tokens) > 1 and _is_word(tokens[-1]) and tokens[-2] in ("]", ")"):
+        tokens = tokens[:-1]
+    text = ""
+    for token in tokens:
+        text += " " + token if text and _is_word(text[-1]) and _is_word(token) else token
+    return text
+
+
+def _is_word(text):
+    return text[:1].isalnum() or text[:1] in "_$"
+
+
+def diff_units(previous, current):
+    """
+    Compare two unit lists by id and fingerprint.
+
+    Returns a dict of id lists: 'added', 'changed', 'removed' and 'unchanged'
+    (in the order the units appear in current, removed ones in previous).
+    """
+    before = {unit["id"]: unit["fingerprint"] for unit in previous}
+    after = {unit["id"] for unit in current}
+    changes = {"added": [], "changed": [], "removed": [], "unchanged": []}
+    for unit in current:
+        if unit["id"] not in before:
+            changes["added"].append(unit["id"])
+        elif before[unit["id"]] != unit["fingerprint"]:
+            changes["changed"].append(unit["id"])
+        else:
+            changes["unchanged"].append(unit["id"])
+    changes["removed"] = [unit["id"] for unit in previous if unit["id"] not in after]
+    return changes
@@ -1,16 +1,29 @@
 import os
+import time
+import hashlib
 import streamlit as st
 import tempfile
 from dotenv import load_dotenv
 from smart_contract_explainer import (
     analyze_contract_from_address,
     analyze_contract_from_source,
-    is_valid_address
+    is_valid_address,
+    parse_source_files,
+    INCREMENTAL_ANALYSIS,
+    SECTIONED_ANALYSIS
 )
+from contract_facts import extract_facts, format_fact_sheet
+from source_store import get_source_store
+from explanation_cache import get_cache
+from job_queue import JobQueue
+from instrumentation import start_metrics_server
 
 # Load environment variables
 load_dotenv()
 
+# Seconds between reruns while this session has analyses in flight
+JOB_POLL_INTERVAL = 0.5
+
 # page configuration
 st.set_page_config(
     page_title="Smart Contract Explainer",
@@ -77,6 +90,25 @@ def main():
         unsafe_allow_html=True
     )
     
+    with st.sidebar:
+        stream_output = st.checkbox("Show partial output while generating", value=True)
+        show_timings = st.checkbox("Show timing breakdown", value=False)
+        # Off unless enabled, as in the CLI (INCREMENTAL_ANALYSIS / SECTIONED_ANALYSIS).
+        # Function by function, re-analyzing an edited paste only sends the changed functions
+        incremental = st.checkbox("Explain pasted and uploaded code function by function",
+                                  value=INCREMENTAL_ANALYSIS)
+        # Otherwise the sections of the analysis can be requested concurrently
+        sectioned = st.checkbox("Generate analysis sections in parallel (when not function by function)",
+                                value=SECTIONED_ANALYSIS)
+    
+    # Analyses run on the shared background worker pool; this session only
+    # keeps the job IDs, so reruns and tab switches do not lose results
+    queue = get_job_queue()
+    if "job_ids" not in st.session_state:
+        st.session_state.job_ids = []
+    if "job_facts" not in st.session_state:
+        st.session_state.job_facts = {}
+    
     # Input tabs
     tab1, tab2, tab3 = st.tabs(["Contract Address", "Solidity Code", "Upload File"])
     
@@ -91,12 +123,11 @@ def main():
             elif not is_valid_address(address):
                 st.error("Invalid Ethereum address format")
             else:
-                with st.spinner("Analyzing contract..."):
-                    try:
-                        explanation = analyze_contract_from_address(address)
-                        display_output(explanation)
-                    except Exception as e:
-                        st.error(f"Error analyzing contract: {str(e)}")
+                submit_job(
+                    queue, f"Contract {address}",
+                    analyze_contract_from_address, address, stream=stream_output,
+                    key=("address", address.lower(), stream_output)
+                )
     
     with tab2:
         st.markdown('<div class="sub-header">Analyze Solidity Code</div>', unsafe_allow_html=True)
@@ -107,12 +138,14 @@ def main():
             if not code:
                 st.error("Please enter Solidity code")
             else:
-                with st.spinner("Analyzing code..."):
-                    try:
-                        explanation = analyze_contract_from_source(code)
-                        display_output(explanation)
-                    except Exception as e:
-                        st.error(f"Error analyzing code: {str(e)}")
+                submit_job(
+                    queue, "Pasted Solidity code",
+                    analyze_contract_from_source, code, stream=stream_output, incremental=incremental,
+                    sectioned=sectioned,
+                    key=("source", hashlib.sha256(code.encode()).hexdigest(), stream_output, incremental,
+                         sectioned),
+                    source=code
+                )
     
     with tab3:
         st.markdown('<div class="sub-header">Upload Solidity File</div>', unsafe_allow_html=True)
@@ -123,33 +156,126 @@ def main():
             if not uploaded_file:
                 st.error("Please upload a file")
             else:
-                with st.spinner("Analyzing file..."):
-                    try:
-                        # Save the file temporarily
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".sol") as tmp:
-                            tmp.write(uploaded_file.getvalue())
-                            tmp_path = tmp.name
-                        
-                        # Read the file
-                        with open(tmp_path, 'r') as f:
-                            code = f.read()
-                        
-                        # Clean up
-                        os.unlink(tmp_path)
-                        
-                        # Analyze the code
-                        explanation = analyze_contract_from_source(code)
-                        display_output(explanation)
-                    except Exception as e:
-                        st.error(f"Error analyzing file: {str(e)}")
+                try:
+                    # Save the file temporarily
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=".sol") as tmp:
+                        tmp.write(uploaded_file.getvalue())
+                        tmp_path = tmp.name
+                    
+                    # Read the file
+                    with open(tmp_path, 'r') as f:
+                        code = f.read()
+                    
+                    # Clean up
+                    os.unlink(tmp_path)
+                    
+                    # Analyze the code
+                    submit_job(
+                        queue, f"File {uploaded_file.name}",
+                        analyze_contract_from_source, code, stream=stream_output, incremental=incremental,
+                        sectioned=sectioned,
+                        key=("source", hashlib.sha256(code.encode()).hexdigest(), stream_output, incremental,
+                             sectioned),
+                        source=code
+                    )
+                except Exception as e:
+                    st.error(f"Error analyzing file: {str(e)}")
+    
+    pending = display_jobs(queue, show_timings)
+    
+    with st.sidebar:
+        st.header("Analysis Workers")
+        counts = queue.stats()
+        st.caption(f"{counts['running']} running · {counts['queued']} queued · {queue.max_workers} workers")
+    
+    # Cache counters are shared with the CLI through the same on-disk cache
+    with st.sidebar:
+        st.header("Explanation Cache")
+        stats = get_cache().stats()
+        st.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+        st.caption(f"{stats['hits']} hits · {stats['misses']} misses · {stats['entries']} cached analyses")
     
     # Footer
     st.markdown(
         '<div class="footer">Smart Contract Explainer Tool - Created with Streamlit, Web3, and OpenAI</div>',
         unsafe_allow_html=True
     )
+    
+    # Poll until this session's jobs have finished
+    if pending:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+
+@st.cache_resource
+def get_job_queue():
+    """One worker pool per server process, shared by every session."""
+    # Optional Prometheus scrape endpoint for the stage timings
+    if os.getenv("METRICS_PORT"):
+        start_metrics_server(os.getenv("METRICS_PORT"))
+    return JobQueue()
+
+def submit_job(queue, label, fn, *args, key=None, source=None, **kwargs):
+    job_id = queue.submit(label, fn, *args, key=key, **kwargs)
+    if job_id not in st.session_state.job_ids:
+        st.session_state.job_ids.append(job_id)
+    # The structure is extracted locally, so it can be shown before the LLM answers
+    if source is not None and job_id not in st.session_state.job_facts:
+        st.session_state.job_facts[job_id] = extract_facts(parse_source_files(source))
+
+def job_facts(job):
+    """Locally extracted facts for a job, once its source is known."""
+    facts = st.session_state.job_facts.get(job["id"])
+    if facts is None and job["key"] and job["key"][0] == "address":
+        # Address jobs: available once the job has fetched and stored the verified source
+        metadata = get_source_store().get(job["key"][1])
+        if metadata:
+            facts = st.session_state.job_facts[job["id"]] = extract_facts(parse_source_files(metadata["source_code"]))
+    return facts
+
+def display_facts(facts):
+    with st.expander("Contract structure (extracted locally)", expanded=bool(facts["risks"])):
+        for risk in facts["risks"]:
+            location = ".".join(part for part in (risk["contract"], risk["function"]) if part)
+            st.warning(f"{risk['pattern']} in {location} (line {risk['line']})")
+        st.code(format_fact_sheet(facts), language="text")
+
+def display_jobs(queue, show_timings=False):
+    """Show this session's analyses, newest first. Returns True while any are still pending."""
+    pending = False
+    jobs = [queue.get(job_id) for job_id in reversed(st.session_state.job_ids)]
+    jobs = [job for job in jobs if job is not None]
+    for index, job in enumerate(jobs):
+        facts = job_facts(job)
+        # Older finished jobs are collapsed into expanders, which cannot nest
+        if facts and facts["contracts"] and (index == 0 or job["status"] in ("queued", "running")):
+            display_facts(facts)
+        if job["status"] in ("queued", "running"):
+            pending = True
+            st.info(f"{job['label']}: {'waiting for a worker' if job['status'] == 'queued' else 'analyzing'}...")
+            if job["partial"]:
+                st.markdown(job["partial"] + "▌")
+        elif job["status"] == "error":
+            st.error(f"Error analyzing {job['label']}: {job['error']}")
+        elif index == 0:
+            display_output(job["result"], key=job["id"])
+        else:
+            with st.expander(job["label"]):
+                display_output(job["result"], key=job["id"])
+        if show_timings and job["timings"]:
+            display_timings(job)
+    return pending
+
+def display_timings(job):
+    timings = job["timings"]
+    with st.expander(f"Timing: {job['label']} ({timings['wall_ms'] / 1000:.2f}s)"):
+        st.table([
+            {"stage": name, "calls": stage["count"], "total ms": stage["total_ms"]}
+            for name, stage in timings["stages"].items()
+        ])
+        if timings["counters"]:
+            st.caption(" · ".join(f"{name}: {value}" for name, value in sorted(timings["counters"].items())))
 
-def display_output(explanation):
+def display_output(explanation, key=None):
     st.markdown("## Contract Analysis:")
 
 
@@ -167,7 +293,8 @@ def display_output(explanation):
         label="Download Analysis",
         data=explanation,
         file_name="contract_analysis.md",
-        mime="text/markdown"
+        mime="text/markdown",
+        key=f"download_{key}" if key else None
     )
 
 if __name__ == "__main__":
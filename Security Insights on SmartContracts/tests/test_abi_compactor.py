@@ -0,0 +1,64 @@
+from abi_compactor import compact_abi, format_entry, format_type, state_mutability
+
+
+def function(name, mutability="nonpayable", inputs=(), outputs=()):
+    return {"type": "function", "name": name, "stateMutability": mutability,
+            "inputs": list(inputs), "outputs": list(outputs)}
+
+
+def param(kind, name=""):
+    return {"type": kind, "name": name}
+
+
+def test_formats_each_entry_kind():
+    assert format_entry(function("transfer", inputs=[param("address", "to"), param("uint256", "amount")],
+                                 outputs=[param("bool")])) == \
+        "function transfer(address to,uint256 amount) nonpayable returns (bool)"
+    assert format_entry({"type": "event", "name": "Transfer", "anonymous": True, "inputs": [
+        dict(param("address", "from"), indexed=True), dict(param("uint256", "value"), indexed=False)
+    ]}) == "event Transfer(address indexed from,uint256 value) anonymous"
+    assert format_entry({"type": "error", "name": "Denied", "inputs": [param("address", "who")]}) == \
+        "error Denied(address who)"
+    assert format_entry({"type": "constructor", "inputs": [], "stateMutability": "payable"}) == "constructor() payable"
+    assert format_entry({"type": "receive", "stateMutability": "payable"}) == "receive() payable"
+
+
+def test_tuples_expand_into_components():
+    order = {"type": "tuple[]", "name": "orders", "components": [
+        param("address", "maker"), {"type": "tuple", "components": [param("uint128"), param("uint128")]}
+    ]}
+    assert format_type(order) == "(address maker,(uint128,uint128))[]"
+
+
+def test_legacy_mutability_flags():
+    assert state_mutability({"constant": True}) == "view"
+    assert state_mutability({"payable": True}) == "payable"
+    assert state_mutability({}) == "nonpayable"
+
+
+def test_unknown_entries_pass_through_as_json():
+    assert format_entry({"type": "custom", "name": "x"}) == '{"type":"custom","name":"x"}'
+
+
+def test_compact_abi_orders_groups_and_deduplicates():
+    abi = [
+        {"type": "event", "name": "Paused", "inputs": []},
+        function("balanceOf", "view", [param("address")], [param("uint256")]),
+        function("mint", inputs=[param("uint256")]),
+        function("deposit", "payable"),
+        function("mint", inputs=[param("address"), param("uint256")]),
+        {"type": "constructor", "inputs": [], "stateMutability": "nonpayable"},
+        function("balanceOf", "view", [param("address")], [param("uint256")]),
+    ]
+    assert compact_abi(abi).splitlines() == [
+        "constructor() nonpayable",
+        "function deposit() payable",
+        "function mint(uint256) nonpayable",
+        "function mint(address,uint256) nonpayable",
+        "function balanceOf(address) view returns (uint256)",
+        "event Paused()",
+    ]
+
+
+def test_compact_abi_empty():
+    assert compact_abi([]) == ""
@@ -0,0 +1,58 @@
+import pytest
+
+from address_utils import keccak256, to_checksum_address, is_address
+
+
+def test_keccak256_known_vectors():
+    # Ethereum's Keccak-256 differs from NIST SHA3-256 only in its padding
+    assert keccak256(b"").hex() == "c5d2460186f7233c927e7db2dcc703c0e500b653ca82273b7bfad8045d85a470"
+    assert keccak256(b"abc").hex() == "4e03657aea45a94fc7d47ba826c8d667c0d1e6e33a64a036ec44f58fa12d6c45"
+    # First four bytes are the function selector of transfer(address,uint256)
+    assert keccak256(b"transfer(address,uint256)")[:4].hex() == "a9059cbb"
+
+
+def test_keccak256_multi_block_input():
+    assert keccak256(b"a" * 200).hex() == "96ea54061def936c4be90b518992fdc6f12f535068a256229aca54267b4d084d"
+
+
+@pytest.mark.parametrize("length", [0, 1, 134, 135, 136, 137, 271, 272, 273, 1000])
+def test_keccak256_matches_reference_around_block_boundaries(length):
+    # 136-byte rate: padding lands in the same block, fills it, or spills into a new one
+    reference = pytest.importorskip("eth_hash.auto").keccak
+    data = bytes(range(256)) * 4
+    assert keccak256(data[:length]) == reference(data[:length])
+
+
+EIP55_VECTORS = [
+    "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+    "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+    "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+    "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+]
+
+
+@pytest.mark.parametrize("address", EIP55_VECTORS)
+def test_checksum_matches_eip55(address):
+    assert to_checksum_address(address.lower()) == address
+    assert to_checksum_address(address.upper().replace("0X", "0x")) == address
+    assert to_checksum_address(address[2:].lower()) == address
+
+
+@pytest.mark.parametrize("address", EIP55_VECTORS)
+def test_is_address_accepts_checksummed_and_single_case(address):
+    assert is_address(address)
+    assert is_address(address.lower())
+    assert is_address("0x" + address[2:].upper())
+    assert is_address(address[2:])
+
+
+def test_is_address_rejects_bad_checksums_and_malformed_input():
+    address = EIP55_VECTORS[0]
+    bad_checksum = address[:3] + address[3].swapcase() + address[4:]
+    assert not is_address(bad_checksum)
+    assert not is_address(address[:-1])
+    assert not is_address(address + "0")
+    assert not is_address(address + "\n")
+    assert not is_address("0x" + "g" * 40)
+    assert not is_address(None)
+    assert not is_address(b"\x00" * 20)
@@ -0,0 +1,53 @@
+import io
+import json
+import threading
+
+import batch_analyzer
+
+
+class FailingOutput(io.StringIO):
+    """Output that cannot take the line for one input."""
+
+    def write(self, text):
+        if '"input": "unwritable"' in text:
+            raise OSError("disk full")
+        return super().write(text)
+
+
+def passthrough(record):
+    return record
+
+
+def explain(record):
+    if record["input"] == "broken":
+        raise RuntimeError("upstream failed")
+    record["explanation"] = f"explained {record['input']}"
+    return record
+
+
+def run(items, output, monkeypatch):
+    monkeypatch.setattr(batch_analyzer, "_fetch_stage", passthrough)
+    monkeypatch.setattr(batch_analyzer, "_unpack_stage", passthrough)
+    monkeypatch.setattr(batch_analyzer, "_explain_stage", explain)
+    result = []
+    worker = threading.Thread(target=lambda: result.append(batch_analyzer.run_batch(items, output)), daemon=True)
+    worker.start()
+    worker.join(10)
+    assert result, "run_batch did not finish"
+    return result[0]
+
+
+def test_each_item_gets_one_line(monkeypatch):
+    items = [{"input": name, "kind": "source"} for name in ("a", "broken", "b")]
+    output = io.StringIO()
+    assert run(items, output, monkeypatch) == (2, 1)
+    lines = {line["input"]: line for line in map(json.loads, output.getvalue().splitlines())}
+    assert lines["a"]["explanation"] == "explained a"
+    assert lines["broken"] == dict(lines["broken"], status="error", error="upstream failed")
+
+
+def test_failed_write_counts_as_error_and_finishes(monkeypatch):
+    items = [{"input": name, "kind": "source"} for name in ("a", "unwritable", "b")]
+    output = FailingOutput()
+    assert run(items, output, monkeypatch) == (2, 1)
+    assert sorted(json.loads(line)["input"] for line in output.getvalue().splitlines()) == ["a", "b"]
@@ -0,0 +1,75 @@
+import hashlib
+
+from bytecode_index import (
+    BytecodeIndex, strip_metadata, code_hash, to_bytes, minimal_proxy_target, may_delegate, slot_address,
+    MINIMAL_PROXY_PREFIX, MINIMAL_PROXY_SUFFIX
+)
+
+
+RUNTIME = bytes.fromhex("6080604052348015600f57600080fd5b50")
+
+
+def with_metadata(code, ipfs_hash):
+    # a2 64 'ipfs' 58 22 <34-byte multihash> 64 'solc' 43 <3-byte version>, then the length
+    metadata = (bytes.fromhex("a264697066735822") + ipfs_hash + bytes.fromhex("64736f6c6343") + bytes((0, 8, 20)))
+    return code + metadata + len(metadata).to_bytes(2, "big")
+
+
+def test_strip_metadata_removes_the_cbor_trailer():
+    built = with_metadata(RUNTIME, bytes(34))
+    assert strip_metadata(built) == RUNTIME
+
+
+def test_identical_builds_share_a_hash_despite_different_metadata():
+    first = with_metadata(RUNTIME, bytes(34))
+    second = with_metadata(RUNTIME, b"\x12" * 34)
+    assert first != second
+    assert code_hash(first) == code_hash(second) == hashlib.sha256(RUNTIME).hexdigest()
+    assert code_hash(with_metadata(RUNTIME + b"\x00", bytes(34))) != code_hash(first)
+
+
+def test_strip_metadata_leaves_code_without_a_trailer_alone():
+    assert strip_metadata(b"") == b""
+    assert strip_metadata(b"\x01") == b"\x01"
+    # Length pointing before the start of the code
+    assert strip_metadata(RUNTIME + b"\xff\xff") == RUNTIME + b"\xff\xff"
+    # Length in range, but no CBOR map header where the metadata would start
+    assert strip_metadata(RUNTIME + b"\x00\x04") == RUNTIME + b"\x00\x04"
+    # Zero length
+    assert strip_metadata(RUNTIME + b"\x00\x00") == RUNTIME + b"\x00\x00"
+
+
+def test_to_bytes():
+    assert to_bytes("0x6080") == b"\x60\x80"
+    assert to_bytes("6080") == b"\x60\x80"
+    assert to_bytes(bytearray(b"\x60")) == b"\x60"
+
+
+def test_minimal_proxy_target():
+    target = bytes.fromhex("bebebebebebebebebebebebebebebebebebebebe")
+    proxy = MINIMAL_PROXY_PREFIX + target + MINIMAL_PROXY_SUFFIX
+    assert minimal_proxy_target(proxy) == "0x" + target.hex()
+    assert minimal_proxy_target(proxy + b"\x00") is None
+    assert may_delegate(proxy)
+    assert not may_delegate(RUNTIME)
+
+
+def test_slot_address():
+    assert slot_address("0x" + "00" * 12 + "ab" * 20) == "0x" + "ab" * 20
+    assert slot_address("0x") is None
+    assert slot_address("0x" + "00" * 32) is None
+
+
+def test_index_keeps_the_first_address_and_resolutions(tmp_path):
+    index = BytecodeIndex(str(tmp_path / "bytecode.sqlite3"))
+    index.put("hash", "0xAAAA")
+    index.put("hash", "0xBBBB")
+    assert index.get("hash") == "0xaaaa"
+    assert index.get("other") is None
+
+    index.put_resolution("0xProxy", "0xtarget", "hash", ["EIP-1967 proxy"], upgradeable=True)
+    index.put_resolution("0xPlain", "0xplain", None, [], upgradeable=False)
+    assert index.get_resolution("0xproxy") == ("0xtarget", "hash", ["EIP-1967 proxy"], True)
+    assert index.get_resolution("0xPLAIN", max_age=0) == ("0xplain", None, [], False)
+    # Only resolutions through upgradeable proxies expire
+    assert index.get_resolution("0xProxy", max_age=-1) is None
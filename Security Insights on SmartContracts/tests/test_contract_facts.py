@@ -0,0 +1,126 @@
+from contract_facts import extract_facts, format_fact_sheet, key_function_source
+
+
+SOURCE = """
+pragma solidity ^0.8.20;
+
+import "./Ownable.sol";
+
+contract Vault is Ownable, ReentrancyGuard {
+    uint256 public constant FEE = 3;
+    mapping(address => uint256) private balances;
+    address owner;
+
+    event Deposited(address indexed from, uint256 amount);
+    error NotOwner();
+
+    modifier onlyOwner() {
+        require(msg.sender == owner, "not owner");
+        _;
+    }
+
+    function deposit() external payable {
+        balances[msg.sender] += msg.value;
+        emit Deposited(msg.sender, msg.value);
+    }
+
+    function sweep(address to) external onlyOwner {
+        (bool ok, ) = to.call{value: address(this).balance}("");
+        require(ok);
+    }
+
+    function guarded() external {
+        if (owner != msg.sender) revert NotOwner();
+    }
+
+    function claim() public {
+        owner = msg.sender;
+    }
+
+    function balanceOf(address who) external view returns (uint256) {
+        return balances[who];
+    }
+}
+"""
+
+
+def vault():
+    facts = extract_facts({"contracts/Vault.sol": SOURCE})
+    return facts, facts["contracts"][0]
+
+
+def function(contract, name):
+    return next(function for function in contract["functions"] if function["name"] == name)
+
+
+def test_extracts_contract_structure():
+    facts, contract = vault()
+    assert facts["pragmas"] == ["^0.8.20"]
+    assert contract["name"] == "Vault"
+    assert contract["bases"] == ["Ownable", "ReentrancyGuard"]
+    assert [variable["name"] for variable in contract["state"]] == ["FEE", "balances", "owner"]
+    assert contract["state"][0]["specifiers"] == ["public", "constant"]
+    assert contract["events"] == ["Deposited(address indexed from,uint256 amount)"]
+    assert contract["errors"] == ["NotOwner()"]
+    assert [modifier["name"] for modifier in contract["modifiers"]] == ["onlyOwner"]
+
+
+def test_function_signatures():
+    _, contract = vault()
+    sweep = function(contract, "sweep")
+    assert sweep["visibility"] == "external"
+    assert sweep["modifiers"] == ["onlyOwner"]
+    balance_of = function(contract, "balanceOf")
+    assert balance_of["mutability"] == "view"
+    assert balance_of["returns"] == "uint256"
+    assert function(contract, "deposit")["mutability"] == "payable"
+
+
+def test_sender_comparisons_are_detected():
+    _, contract = vault()
+    assert contract["modifiers"][0]["checks_sender"]
+    assert function(contract, "guarded")["checks_sender"]
+    # Assigning or indexing by msg.sender is not a check
+    assert not function(contract, "claim")["checks_sender"]
+    assert not function(contract, "deposit")["checks_sender"]
+
+
+def test_risky_patterns_carry_location():
+    facts, _ = vault()
+    assert [(risk["pattern"], risk["contract"], risk["function"]) for risk in facts["risks"]] == [
+        ("low-level call", "Vault", "sweep")
+    ]
+    assert facts["risks"][0]["line"] == SOURCE.count("\n", 0, SOURCE.index("to.call")) + 1
+
+
+def test_risky_patterns_ignore_comments_and_strings():
+    source = 'contract A { function f() external { // tx.origin delegatecall\n string memory s = "selfdestruct(x)"; } }'
+    assert extract_facts({"A.sol": source})["risks"] == []
+
+
+def test_fact_sheet_lists_guards_and_risks():
+    facts, _ = vault()
+    sheet = format_fact_sheet(facts)
+    assert "contract Vault is Ownable, ReentrancyGuard  (contracts/Vault.sol)" in sheet
+    assert "function guarded() external checks msg.sender" in sheet
+    assert "low-level call in Vault.sweep (line" in sheet
+    assert "(line" not in format_fact_sheet(facts, show_lines=False)
+
+
+def test_outline_keeps_contracts_and_risks_only():
+    facts, _ = vault()
+    outline = format_fact_sheet(facts, show_lines=False, outline=True)
+    assert outline.splitlines() == [
+        "Solidity: ^0.8.20",
+        "Risky patterns:",
+        "  low-level call in Vault.sweep",
+        "contract Vault is Ownable, ReentrancyGuard  (contracts/Vault.sol)",
+    ]
+
+
+def test_key_function_source_skips_views():
+    facts, _ = vault()
+    source = key_function_source(facts)
+    assert "// Vault.onlyOwner" in source
+    assert "// Vault.sweep" in source
+    assert "// Vault.balanceOf" not in source
@@ -0,0 +1,151 @@
+import time
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (
+    RateLimiter, RateLimitedError, TokenBucket, call_with_retries, is_retryable, retry_after_of,
+    request_priority, INTERACTIVE, BATCH, MIN_RATE_SCALE, RATE_RECOVERY_STEP
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+def test_interactive_requests_overtake_queued_batch_work():
+    limiter = RateLimiter("test", requests_per_second=10)
+    limiter.acquire()  # empty the bucket so everyone below has to queue
+    order = []
+
+    def acquire(label, priority):
+        limiter.acquire(priority=priority)
+        order.append(label)
+
+    threads = [threading.Thread(target=acquire, args=(f"batch{index}", BATCH)) for index in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    threads.append(threading.Thread(target=acquire, args=("interactive", INTERACTIVE)))
+    threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["interactive", "batch0", "batch1", "batch2"]
+
+
+def test_priority_comes_from_the_request_context():
+    limiter = RateLimiter("test", requests_per_second=10)
+    limiter.acquire()
+    order = []
+
+    def batch():
+        with request_priority(BATCH):
+            limiter.acquire()
+        order.append("batch")
+
+    worker = threading.Thread(target=batch)
+    worker.start()
+    time.sleep(0.02)
+    limiter.acquire()
+    order.append("interactive")
+    worker.join(5)
+    assert order == ["interactive", "batch"]
+
+
+def test_requests_are_paced_at_the_configured_rate():
+    limiter = RateLimiter("test", requests_per_second=50)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    # The first request goes straight through, the next five wait 20 ms each
+    assert 0.08 <= time.monotonic() - started < 0.5
+
+
+def test_throttling_halves_the_rate_and_successes_recover_it_additively():
+    limiter = RateLimiter("test", requests_per_second=10, tokens_per_second=1000)
+    limiter.throttled()
+    assert limiter.scale == 0.5
+    assert limiter.buckets["requests"].rate == 5
+    assert limiter.buckets["tokens"].rate == 500
+    limiter.succeeded()
+    assert limiter.scale == pytest.approx(0.5 + RATE_RECOVERY_STEP)
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.scale == MIN_RATE_SCALE
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.scale == 1.0
+    assert limiter.buckets["requests"].rate == 10
+
+
+def test_retry_after_pauses_the_queue():
+    limiter = RateLimiter("test", requests_per_second=1000)
+    limiter.throttled(retry_after=0.2)
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_unlimited_limiter_never_waits():
+    limiter = RateLimiter("test")
+    limiter.throttled(retry_after=10)
+    started = time.monotonic()
+    limiter.acquire(tokens=10 ** 9)
+    assert time.monotonic() - started < 0.05
+
+
+def test_token_cost_is_clamped_to_the_bucket_capacity():
+    bucket = TokenBucket(rate=10, capacity=100)
+    bucket.tokens = 0
+    assert bucket.wait_time(10 ** 6) == pytest.approx(10.0)
+
+
+def test_call_with_retries_backs_off_on_429_and_returns(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+    limiter = RateLimiter("test", requests_per_second=1000)
+    answers = [HTTPError(429, {"Retry-After": "0.01"}), RateLimitedError("Max rate limit reached"), "ok"]
+
+    def call():
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    assert call_with_retries(limiter, call) == "ok"
+    # Two 429s halved the rate twice, the success recovered one step
+    assert limiter.scale == pytest.approx(0.25 + RATE_RECOVERY_STEP)
+
+
+def test_call_with_retries_gives_up(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+    limiter = RateLimiter("test")
+    calls = []
+
+    def failing(error):
+        def call():
+            calls.append(error)
+            raise error
+        return call
+
+    with pytest.raises(HTTPError):
+        call_with_retries(limiter, failing(HTTPError(400)))
+    assert len(calls) == 1
+    calls.clear()
+    with pytest.raises(HTTPError):
+        call_with_retries(limiter, failing(HTTPError(503)), attempts=3)
+    assert len(calls) == 3
+
+
+def test_retryable_errors():
+    assert is_retryable(HTTPError(429))
+    assert is_retryable(HTTPError(502))
+    assert not is_retryable(HTTPError(404))
+    assert is_retryable(type("ReadTimeout", (Exception,), {})())
+    assert is_retryable(type("APIConnectionError", (Exception,), {})())
+    assert not is_retryable(ValueError("bad input"))
+    assert retry_after_of(HTTPError(429, {"retry-after": "2"})) == 2.0
+    assert retry_after_of(HTTPError(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
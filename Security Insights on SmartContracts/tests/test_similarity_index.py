@@ -0,0 +1,78 @@
+from similarity_index import SimilarityIndex, signature, estimate_similarity, source_diff
+
+
+def contract(name, functions=20, limit=100, message="too much"):
+    body = "\n".join(
+        f"    function step{index}(uint256 amount) external {{\n"
+        f"        require(amount <= {limit}, \"{message}\");\n"
+        f"        balances[msg.sender] += amount * {index};\n"
+        f"    }}"
+        for index in range(functions)
+    )
+    return f"contract {name} {{\n    mapping(address => uint256) balances;\n{body}\n}}\n"
+
+
+def unrelated(functions=20):
+    body = "\n".join(
+        f"    event Logged{index}(bytes32 indexed id, string note);\n"
+        f"    modifier guard{index}() {{ if (paused) revert Paused(); _; }}"
+        for index in range(functions)
+    )
+    return f"library Other {{\n    error Paused();\n{body}\n}}\n"
+
+
+def test_literals_do_not_change_the_signature():
+    assert signature(contract("A")) == signature(contract("A", limit=5000, message="over the cap"))
+
+
+def test_similarity_tracks_the_size_of_the_edit():
+    base = signature(contract("A"))
+    assert estimate_similarity(base, signature(contract("B"))) > 0.9
+    assert estimate_similarity(base, signature(contract("A", functions=16))) > 0.7
+    assert estimate_similarity(base, signature(unrelated())) < 0.2
+
+
+def test_query_returns_indexed_near_duplicates_most_similar_first(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"))
+    index.add(contract("A", functions=20), "key-20")
+    index.add(contract("A", functions=16), "key-16")
+    index.add(unrelated(), "key-other")
+
+    matches = index.query(contract("A", functions=19), threshold=0.7)
+    assert [match["explanation_key"] for match in matches] == ["key-20", "key-16"]
+    assert matches[0]["source"] == contract("A", functions=20)
+    assert matches[0]["similarity"] >= matches[1]["similarity"]
+    assert index.query(contract("A", functions=19), threshold=0.99) == []
+
+
+def test_each_explanation_key_is_indexed_once(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"))
+    index.add(contract("A"), "key")
+    index.add(contract("B"), "key")
+    assert len(index) == 1
+    assert index.query(contract("A"))[0]["source"] == contract("A")
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "index.sqlite3"), max_entries=2)
+    sources = [contract(f"C{number}", functions=3 + number * 4) for number in range(3)]
+    for number, source in enumerate(sources):
+        index.add(source, f"key{number}")
+    assert len(index) == 2
+    assert [match["explanation_key"] for match in index.query(sources[0], threshold=0.99)] == []
+    assert [match["explanation_key"] for match in index.query(sources[2], threshold=0.99)] == ["key2"]
+
+
+def test_index_persists_across_connections(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    SimilarityIndex(path).add(contract("A"), "key")
+    assert SimilarityIndex(path).query(contract("A"))[0]["explanation_key"] == "key"
+
+
+def test_source_diff_is_truncated():
+    previous = "\n".join(f"line {number}" for number in range(100))
+    current = "\n".join(f"line {number}!" for number in range(100))
+    diff = source_diff(previous, current, max_lines=10).splitlines()
+    assert diff[:2] == ["--- previous", "+++ current"]
+    assert len(diff) == 11
+    assert diff[-1].startswith("... (") and diff[-1].endswith(" more diff lines)")
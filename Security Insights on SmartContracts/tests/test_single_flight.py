@@ -0,0 +1,103 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(flights.do, "key", slow) for _ in range(8)]
+        # Give every caller time to join the leader's flight
+        time.sleep(0.1)
+        release.set()
+        assert [future.result(5) for future in futures] == ["result"] * 8
+    assert calls == [1]
+    assert flights.in_flight() == 0
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+
+
+def test_finished_keys_run_again():
+    flights = SingleFlight("test")
+    calls = []
+    for _ in range(3):
+        flights.do("key", lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_errors_reach_every_waiter_and_release_the_key():
+    flights = SingleFlight("test")
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flights.do, "key", failing) for _ in range(4)]
+        # Give every caller time to join the leader's flight
+        time.sleep(0.1)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="upstream down"):
+                future.result(5)
+    assert flights.do("key", lambda: "recovered") == "recovered"
+
+
+def test_streams_are_shared_from_the_first_fragment():
+    flights = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fragments():
+        calls.append(1)
+        yield "a"
+        started.set()
+        release.wait(5)
+        yield "b"
+        yield "c"
+
+    first = flights.stream("key", fragments)
+    assert next(first) == "a"
+    started.wait(5)
+    # Joins after "a" was produced and still receives it
+    second = flights.stream("key", fragments)
+    release.set()
+    assert list(first) == ["b", "c"]
+    assert list(second) == ["a", "b", "c"]
+    assert calls == [1]
+
+
+def test_stream_finishes_without_readers_and_reraises_errors():
+    flights = SingleFlight("test")
+    done = threading.Event()
+
+    def fragments():
+        yield "partial"
+        done.set()
+        raise RuntimeError("stream cut")
+
+    stream = flights.stream("key", fragments)
+    assert done.wait(5)
+    received = []
+    with pytest.raises(RuntimeError, match="stream cut"):
+        for fragment in stream:
+            received.append(fragment)
+    assert received == ["partial"]
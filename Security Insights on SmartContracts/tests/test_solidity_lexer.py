@@ -0,0 +1,82 @@
+from solidity_lexer import tokenize, code_tokens, split_units, block_body
+
+
+SOURCE = '''// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+/// @notice Holds deposits
+abstract contract Vault {
+    string constant URL = "https://example.com/{id}"; // not a comment: "//"
+    /* block } comment */
+    function f() external {}
+}
+
+interface IVault { function g() external; }
+'''
+
+
+def kinds(source):
+    return [(kind, text) for kind, text, _ in code_tokens(source)]
+
+
+def test_tokens_cover_the_source_exactly():
+    tokens = tokenize(SOURCE)
+    assert "".join(text for _, text, _ in tokens) == SOURCE
+    assert all(SOURCE[offset:offset + len(text)] == text for _, text, offset in tokens)
+
+
+def test_comment_kinds():
+    found = {kind: text for kind, text, _ in tokenize(SOURCE) if "comment" in kind or "natspec" in kind}
+    assert found == {
+        "line_comment": '// not a comment: "//"',
+        "natspec_line": "/// @notice Holds deposits",
+        "block_comment": "/* block } comment */",
+    }
+    assert [kind for kind, _, _ in tokenize("/** @dev x */ /**/")][::2] == ["natspec_block", "block_comment"]
+
+
+def test_comment_markers_inside_strings_stay_strings():
+    assert kinds('s = "a // b /* c";') == [
+        ("identifier", "s"), ("punct", "="), ("string", '"a // b /* c"'), ("punct", ";")
+    ]
+    assert kinds("x = '\\'//';") == [("identifier", "x"), ("punct", "="), ("string", "'\\'//'"), ("punct", ";")]
+
+
+def test_prefixed_string_literals_and_numbers():
+    assert kinds('hex"00ff" unicode"é" 0x1F_ff 1_000 2.5e-3') == [
+        ("string", 'hex"00ff"'), ("string", 'unicode"é"'),
+        ("number", "0x1F_ff"), ("number", "1_000"), ("number", "2.5e-3"),
+    ]
+
+
+def test_operators_are_single_characters():
+    assert [text for _, text, _ in code_tokens("a == b && c != d")] == ["a", "=", "=", "b", "&", "&", "c", "!", "=", "d"]
+
+
+def test_unterminated_block_comment_runs_to_the_end():
+    assert tokenize("x /* open")[-1][:2] == ("block_comment", "/* open")
+
+
+def test_split_units_keeps_leading_comments_and_ignores_braces_in_strings_and_comments():
+    units = split_units(SOURCE)
+    assert [(unit["kind"], unit["name"]) for unit in units] == [
+        ("statement", None), ("contract", "Vault"), ("interface", "IVault")
+    ]
+    assert "".join(unit["text"] for unit in units).strip() == SOURCE.strip()
+    assert units[1]["text"].lstrip().startswith("/// @notice Holds deposits")
+    assert units[1]["text"].rstrip().endswith("function f() external {}\n}")
+
+
+def test_split_units_names_special_functions():
+    units = split_units("constructor() {} receive() external payable {} function (uint) x;")
+    assert [(unit["kind"], unit["name"]) for unit in units] == [
+        ("constructor", "constructor"), ("receive", "receive"), ("function", None)
+    ]
+
+
+def test_block_body():
+    header, body, footer = block_body('contract A { string s = "}"; function f() {} } // tail')
+    assert header == "contract A {"
+    assert body == ' string s = "}"; function f() {} '
+    assert footer == "} // tail"
+    assert block_body("function f() external;") == ("function f() external;", "", "")
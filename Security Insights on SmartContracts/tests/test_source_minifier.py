@@ -0,0 +1,102 @@
+import pytest
+
+from solidity_lexer import code_tokens
+from source_minifier import minify_source, minify_files, notice_text
+
+
+SOURCE = '''// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+pragma abicoder v2;
+
+/**
+ * @title Registry
+ * @notice Stores names.
+ * @dev Internal detail.
+ */
+contract Registry {
+    string public constant URL = "https://example.com/*not-a-comment*/";   // trailing note
+    string greeting = 'say "hi" // twice';
+
+    /// @notice Register a name
+    /// @param name The name
+    function register(string calldata name) external {
+        // old: require(bytes(name).length > 0);
+        uint256 a = 1 - -1;
+        names[msg.sender] = name;
+    }
+}
+'''
+
+
+def code(source):
+    return [text for _, text, _ in code_tokens(source)]
+
+
+def without_pragmas(tokens):
+    kept, skipping = [], False
+    for text in tokens:
+        if text == "pragma":
+            skipping = True
+        if not skipping:
+            kept.append(text)
+        if text == ";":
+            skipping = False
+    return kept
+
+
+def test_level_zero_is_identity():
+    assert minify_source(SOURCE, 0) is SOURCE
+
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_code_tokens_are_unchanged(level):
+    minified = minify_source(SOURCE, level)
+    assert without_pragmas(code(minified)) == without_pragmas(code(SOURCE))
+
+
+@pytest.mark.parametrize("level", [1, 2, 3])
+def test_strings_with_comment_markers_survive(level):
+    minified = minify_source(SOURCE, level)
+    assert '"https://example.com/*not-a-comment*/"' in minified
+    assert "'say \"hi\" // twice'" in minified
+
+
+def test_level_one_drops_comments_but_keeps_natspec():
+    minified = minify_source(SOURCE, 1)
+    assert "SPDX" not in minified
+    assert "trailing note" not in minified
+    assert "old: require" not in minified
+    assert "/// @notice Register a name" in minified
+    assert "@dev Internal detail." in minified
+    assert "\n\n\n" not in minified
+
+
+def test_level_two_keeps_notice_text_and_the_solidity_pragma():
+    minified = minify_source(SOURCE, 2)
+    assert "pragma solidity ^0.8.20;" in minified
+    assert "abicoder" not in minified
+    assert "/// @notice Title Registry" not in minified
+    assert "/// @notice Stores names." in minified
+    assert "/// @notice Register a name" in minified
+    assert "@param" not in minified and "@dev" not in minified
+
+
+def test_level_three_drops_pragmas_and_natspec_and_keeps_operators_apart():
+    minified = minify_source(SOURCE, 3)
+    assert "pragma" not in minified
+    assert "@notice" not in minified
+    assert "1- -1" in minified
+    assert "uint256 a=1- -1;" in minified
+
+
+def test_notice_text():
+    assert notice_text(["/// Untagged line", "/// @param x ignored"]) == "Untagged line"
+    assert notice_text(["/** @dev no\n * @notice yes\n * more */"]) == "yes more"
+
+
+def test_minify_files_skips_and_counts():
+    files = {"A.sol": SOURCE, "lib/B.sol": SOURCE}
+    minified, before, after = minify_files(files, 3, skip={"lib/B.sol"})
+    assert minified["lib/B.sol"] is SOURCE
+    assert minified["A.sol"] == minify_source(SOURCE, 3)
+    assert before > after > 0